@@ -0,0 +1,304 @@
+"""Columnar export of the corpus for offline analysis.
+
+Messages are read in id order, batch by batch, and written as Arrow record
+batches: to Parquet part files on disk, or as a Parquet/Arrow IPC download.
+Exports are incremental on message id. Each part file in <out>/messages is
+named after the id range it holds, so a nightly job only moves rows newer
+than the last part already written, and the directory reads back as one
+Parquet dataset. pyarrow is optional and only imported when exporting.
+
+    python -m app.analytics --out ./exports            # new messages since the last run
+    python -m app.analytics --out ./exports --full     # everything, from id 0
+"""
+import argparse
+import asyncio
+import re
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncGenerator
+
+from sqlalchemy import func, select
+
+from app.config import get_settings
+from app.database import async_session
+from app.models import Conversation, Message, Participant
+
+if TYPE_CHECKING:
+    import pyarrow
+
+# Rows per record batch (and per Parquet row group)
+BATCH_SIZE = 10_000
+
+# messages-<first id>-<last id>.parquet
+_PART = re.compile(r"^messages-(\d+)-(\d+)\.parquet$")
+
+_MESSAGE_COLUMNS = (
+    ("message_id", Message.id),
+    ("conversation_id", Message.conversation_id),
+    ("role", Message.role),
+    ("model_name", Message.model_name),
+    ("token_count", Message.token_count),
+    ("cache_read_tokens", Message.cache_read_tokens),
+    ("cache_creation_tokens", Message.cache_creation_tokens),
+    ("created_at", Message.created_at),
+    ("content", Message.content),
+)
+_CONVERSATION_COLUMNS = (
+    ("conversation_id", Conversation.id),
+    ("title", Conversation.title),
+    ("starter_message", Conversation.starter_message),
+    ("created_at", Conversation.created_at),
+    ("updated_at", Conversation.updated_at),
+)
+_PARTICIPANT_COLUMNS = (
+    ("conversation_id", Participant.conversation_id),
+    ("position", Participant.position),
+    ("model", Participant.model),
+    ("system_prompt", Participant.system_prompt),
+)
+
+
+class AnalyticsUnavailable(RuntimeError):
+    """pyarrow is not installed."""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError as e:
+        raise AnalyticsUnavailable("Columnar export needs pyarrow: pip install -r requirements-analytics.txt") from e
+    return pyarrow
+
+
+def message_schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ("message_id", pa.int64()),
+        ("conversation_id", pa.int64()),
+        ("role", pa.string()),
+        ("model_name", pa.string()),
+        ("token_count", pa.int64()),
+        ("cache_read_tokens", pa.int64()),
+        ("cache_creation_tokens", pa.int64()),
+        ("created_at", pa.timestamp("us")),
+        # large_string: a batch of long replies can pass the 2 GiB string offset limit
+        ("content", pa.large_string()),
+    ])
+
+
+def conversation_schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ("conversation_id", pa.int64()),
+        ("title", pa.string()),
+        ("starter_message", pa.large_string()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])
+
+
+def participant_schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ("conversation_id", pa.int64()),
+        ("position", pa.int64()),  # 0 speaks as "model_a", 1 as "model_b", ...
+        ("model", pa.string()),
+        ("system_prompt", pa.large_string()),
+    ])
+
+
+def _record_batch(schema, rows: list) -> "pyarrow.RecordBatch":
+    """Transpose rows into per-column lists and convert each to an Arrow array.
+
+    pa.array copies every column into Arrow buffers; building them a column
+    at a time just avoids a per-row Python object for each record.
+    """
+    pa = _pyarrow()
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+async def last_message_id(after_id: int = 0) -> int | None:
+    """Highest message id above after_id that is safe to export, fixing the end
+    of an export before it starts.
+
+    SQLite commits one writer at a time, in id order. On PostgreSQL ids come
+    from a sequence and transactions can commit out of order, so a lower id
+    may still be invisible when a higher one is; rows newer than the commit
+    lag are left for the next export rather than jumped over for good.
+    """
+    async with async_session() as session:
+        query = select(func.max(Message.id)).where(Message.id > after_id)
+        if session.get_bind().dialect.name != "sqlite":
+            lag = timedelta(seconds=get_settings().analytics_commit_lag_seconds)
+            query = query.where(Message.created_at <= datetime.utcnow() - lag)
+        result = await session.execute(query)
+        return result.scalar()
+
+
+async def message_batches(
+    after_id: int,
+    until_id: int,
+    batch_size: int = BATCH_SIZE,
+) -> AsyncGenerator["pyarrow.RecordBatch", None]:
+    """Record batches of messages with after_id < id <= until_id, in id order."""
+    schema = message_schema()
+    async with async_session() as session:
+        result = await session.stream(
+            select(*(column for _, column in _MESSAGE_COLUMNS))
+            .where(Message.id > after_id, Message.id <= until_id)
+            .order_by(Message.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions(batch_size):
+            yield _record_batch(schema, partition)
+
+
+async def _table(schema, columns, order_by) -> "pyarrow.Table":
+    async with async_session() as session:
+        result = await session.execute(select(*(column for _, column in columns)).order_by(*order_by))
+        rows = result.all()
+    return _pyarrow().Table.from_batches([_record_batch(schema, rows)], schema=schema)
+
+
+async def conversation_table() -> "pyarrow.Table":
+    return await _table(conversation_schema(), _CONVERSATION_COLUMNS, [Conversation.id])
+
+
+async def participant_table() -> "pyarrow.Table":
+    return await _table(
+        participant_schema(), _PARTICIPANT_COLUMNS, [Participant.conversation_id, Participant.position]
+    )
+
+
+def exported_through(out_dir: Path) -> int:
+    """Last message id already written to out_dir, or 0."""
+    parts = (out_dir / "messages").glob("messages-*.parquet")
+    ids = [int(m.group(2)) for p in parts if (m := _PART.match(p.name))]
+    return max(ids, default=0)
+
+
+async def export_to_directory(out_dir: Path, after_id: int | None = None, batch_size: int = BATCH_SIZE) -> dict:
+    """Append a part file of new messages and refresh the conversation and participant snapshots.
+
+    Parts are written under a temporary name and renamed once complete, so an
+    interrupted run never leaves a part that later runs would treat as done.
+    """
+    pa = _pyarrow()
+    (out_dir / "messages").mkdir(parents=True, exist_ok=True)
+    if after_id is None:
+        after_id = exported_through(out_dir)
+
+    # Conversations and their participants are small and mutable (titles,
+    # summaries): snapshot them whole
+    for name, table in (("conversations", conversation_table), ("participants", participant_table)):
+        snapshot = out_dir / f"{name}.parquet"
+        partial = snapshot.with_suffix(".parquet.partial")
+        await asyncio.to_thread(pa.parquet.write_table, await table(), partial)
+        partial.replace(snapshot)
+
+    until_id = await last_message_id(after_id)
+    if until_id is None:
+        return {"after_id": after_id, "until_id": after_id, "messages": 0, "part": None}
+
+    part = out_dir / "messages" / f"messages-{after_id + 1:012d}-{until_id:012d}.parquet"
+    partial = part.with_suffix(".parquet.partial")
+    rows = 0
+    writer = pa.parquet.ParquetWriter(partial, message_schema(), compression="zstd")
+    try:
+        async for batch in message_batches(after_id, until_id, batch_size):
+            await asyncio.to_thread(writer.write_batch, batch)
+            rows += batch.num_rows
+    finally:
+        writer.close()
+    partial.replace(part)
+    return {"after_id": after_id, "until_id": until_id, "messages": rows, "part": str(part)}
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_messages(
+    format: str,
+    after_id: int,
+    until_id: int,
+    batch_size: int = BATCH_SIZE,
+) -> AsyncGenerator[bytes, None]:
+    """Messages in (after_id, until_id] as a Parquet file or an Arrow IPC stream.
+
+    The Arrow stream is sent batch by batch. Parquet keeps its footer at the
+    end of the file, so it is spooled to a temporary file and then sent.
+    """
+    pa = _pyarrow()
+    schema = message_schema()
+
+    if format == "arrow":
+        sink = _ChunkSink()
+        writer = pa.ipc.new_stream(sink, schema)
+        async for batch in message_batches(after_id, until_id, batch_size):
+            writer.write_batch(batch)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+        return
+
+    with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as spool:
+        writer = pa.parquet.ParquetWriter(spool, schema, compression="zstd")
+        async for batch in message_batches(after_id, until_id, batch_size):
+            await asyncio.to_thread(writer.write_batch, batch)
+        writer.close()
+        spool.seek(0)
+        while chunk := spool.read(1024 * 1024):
+            yield chunk
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, required=True, help="directory for Parquet part files")
+    parser.add_argument("--after-id", type=int, help="export messages above this id (default: resume)")
+    parser.add_argument("--full", action="store_true", help="start from the first message")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    after_id = 0 if args.full else args.after_id
+    summary = await export_to_directory(args.out, after_id, args.batch_size)
+    if summary["part"]:
+        print(f"✓ Wrote {summary['messages']} messages "
+              f"(ids {summary['after_id'] + 1}-{summary['until_id']}) to {summary['part']}")
+    else:
+        print(f"No messages after id {summary['after_id']}")
+    print(f"✓ Wrote conversations and participants snapshots to {args.out}")
+
+    from app.database import engine
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
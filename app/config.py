@@ -11,6 +11,80 @@ class Settings(BaseSettings):
     gemini_api_key: str = ""
     database_url: str = "sqlite+aiosqlite:///./conversations.db"
 
+    # Database connection pool (not used for in-memory SQLite)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = -1  # Seconds before a connection is replaced; -1 never
+    db_pool_pre_ping: bool = False
+
+    # Pragmas applied to every SQLite connection
+    sqlite_profile_enabled: bool = True
+    sqlite_journal_mode: str = "wal"  # Readers no longer block the writer
+    sqlite_synchronous: str = "normal"  # Durable under WAL except on power loss
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456
+    sqlite_temp_store: str = "memory"
+
+    # Pooled provider SDK clients
+    client_pool_max_size: int = 32
+    client_pool_ttl_seconds: float = 900.0
+
+    # Outbound pacing per provider key. RPM/TPM are keyed by provider name,
+    # e.g. RATE_LIMIT_RPM='{"groq": 30}'; a missing entry means unlimited.
+    rate_limit_rpm: dict[str, int] = {}
+    rate_limit_tpm: dict[str, int] = {}
+    rate_limit_concurrency: int = 4
+    rate_limit_max_retries: int = 4
+    rate_limit_backoff_base: float = 1.0
+    rate_limit_backoff_max: float = 60.0
+
+    # Local memo of provider replies keyed by request content (opt-in)
+    response_cache_enabled: bool = False
+    response_cache_memory_entries: int = 512
+    response_cache_path: str = "./response_cache.db"  # Empty for memory only
+    response_cache_max_bytes: int = 256 * 1024 * 1024
+
+    # Local mock provider (mock-fast / mock-slow) for offline load tests
+    mock_provider_enabled: bool = False
+    mock_seed: int = 0
+    mock_ttft_ms: float = 150.0
+    mock_tokens_per_second: float = 200.0
+    mock_reply_tokens_mean: int = 200
+    mock_reply_tokens_stddev: int = 60
+    mock_error_rate: float = 0.0
+    mock_rate_limit_rate: float = 0.0
+    mock_retry_after_seconds: float = 1.0
+
+    # Write-behind persistence of turn messages
+    message_writer_queue_size: int = 256  # Pending messages before runs wait on the writer
+    message_writer_batch_size: int = 64  # Most messages committed in one transaction
+
+    # Detached runs: worker pool, waiting-room size and how long finished logs stay attachable
+    run_workers: int = 64
+    run_max_queued: int = 100
+    run_retention_seconds: float = 900.0
+    run_disconnect_grace_seconds: float = 15.0  # Attached runs are cancelled once all clients are gone this long
+
+    # Turn admission across all runs. Provider caps are keyed by provider name,
+    # e.g. SCHEDULER_PROVIDER_LIMITS='{"anthropic": 8}'; a missing entry means only the global cap.
+    # scheduler_key_limit caps turns per provider key (0: no cap); keys from the
+    # environment are one key per provider, so this also caps those providers.
+    scheduler_max_in_flight: int = 64
+    scheduler_provider_limits: dict[str, int] = {}
+    scheduler_key_limit: int = 0
+
+    # Analytics export: on databases whose transactions can commit out of id
+    # order (PostgreSQL), only rows at least this old are exported, so a row
+    # still being committed is not skipped by the id cursor
+    analytics_commit_lag_seconds: float = 60.0
+
+    # Per-turn context budget (0 disables the cap and uses each model's window)
+    context_max_input_tokens: int = 24000
+    context_recent_messages: int = 12
+    context_summary_max_words: int = 400
+
     class Config:
         env_file = ".env"
 
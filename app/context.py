@@ -0,0 +1,185 @@
+"""Per-model context budgeting for conversation turns.
+
+Each participant sees the system prompt, the human seed, a rolling summary of
+older turns and the most recent turns verbatim. When the unsummarized tail
+outgrows the model's input budget, the oldest turns are folded into the
+summary, which is persisted so later runs pick up where the last one stopped.
+"""
+import logging
+from dataclasses import dataclass, field
+
+from app.config import get_settings
+from app.providers.base import BaseProvider, ChatMessage, estimate_tokens
+from app.providers.registry import get_model
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between AI models. "
+    "Merge the new turns into the existing summary. Keep each speaker's positions, "
+    "key arguments, open questions and any points of agreement or disagreement. "
+    "Write in plain prose, third person, without preamble."
+)
+
+
+def input_budget(model_id: str) -> int:
+    """Max prompt tokens for a model: its context window less the reply budget, capped by settings."""
+    cap = get_settings().context_max_input_tokens
+    entry = get_model(model_id)
+    if entry is None or not entry.info.context_window:
+        return cap
+    model_budget = entry.info.context_window - entry.info.max_output_tokens
+    return min(cap, model_budget) if cap else model_budget
+
+
+@dataclass
+class ConversationContext:
+    seed: str
+    transcript: list[tuple[str, str]] = field(default_factory=list)  # (role, content)
+    summary: str | None = None
+    summary_count: int = 0  # Leading transcript entries folded into the summary
+    # Participant whose opening turn the seed stands in for: it answers the
+    # first reply instead of the seed. None when everyone answers the seed.
+    opener: str | None = None
+    # Per transcript entry, the simultaneous round it was given in (None for
+    # a turn taken in order)
+    rounds: list[int | None] = field(default_factory=list)
+    # Everyone answers each round at once in this run
+    simultaneous: bool = False
+
+    def __post_init__(self):
+        self.summary_count = min(self.summary_count, len(self.transcript))
+        self.rounds = self.rounds + [None] * (len(self.transcript) - len(self.rounds))
+
+    def append(self, role: str, content: str, round_number: int | None = None) -> None:
+        self.transcript.append((role, content))
+        self.rounds.append(round_number)
+
+    def next_round(self) -> int:
+        return max((n for n in self.rounds if n is not None), default=0) + 1
+
+    def _own_first(
+        self, role: str, entries: list[tuple[str, str]], rounds: list[int | None]
+    ) -> list[tuple[str, str]]:
+        """Put the participant's own reply first within each simultaneous
+        round, so it precedes the others' replies to the same transcript.
+        Turns taken in order keep their place."""
+        groups: list[list[tuple[str, str]]] = []
+        for index, entry in enumerate(entries):
+            if rounds[index] is not None and index and rounds[index] == rounds[index - 1]:
+                groups[-1].append(entry)
+            else:
+                groups.append([entry])
+        ordered = [
+            entry
+            for group in groups
+            for entry in sorted(group, key=lambda entry: entry[0] != role)
+        ]
+        # Ending on its own reply (only it answered the last round, or it
+        # spoke last before the run switched to rounds) reads as a prefill
+        # to providers; the seed ahead keeps the view non-empty
+        while ordered and ordered[-1][0] == role:
+            ordered.pop()
+        return ordered
+
+    def project(self, role: str, entries: list[tuple[str, str]]) -> list[ChatMessage]:
+        """Render entries from one participant's perspective: its own turns are
+        'assistant', everyone else's are 'user'."""
+        messages = []
+        if role != self.opener:
+            messages.append(ChatMessage(role="user", content=self.seed))
+        if self.summary:
+            messages.append(ChatMessage(
+                role="user",
+                content=f"[Summary of the earlier conversation]\n{self.summary}",
+            ))
+        messages.extend(
+            ChatMessage(role="assistant" if entry_role == role else "user", content=content)
+            for entry_role, content in entries
+        )
+        return messages
+
+    def _cost(self, system_prompt: str | None, entries: list[tuple[str, str]]) -> int:
+        return (
+            estimate_tokens(system_prompt)
+            + estimate_tokens(self.seed)
+            + estimate_tokens(self.summary)
+            + sum(estimate_tokens(content) for _, content in entries)
+        )
+
+    async def build_messages(
+        self,
+        role: str,
+        model: str,
+        system_prompt: str | None,
+        provider: BaseProvider,
+        labels: dict[str, str],
+    ) -> tuple[list[ChatMessage], bool]:
+        """Return the messages to send for this turn, and whether the summary changed.
+
+        Folding only happens once the tail exceeds the budget, and then folds
+        everything but the most recent turns, so the prompt prefix stays stable
+        (and cacheable) between folds.
+        """
+        settings = get_settings()
+        budget = input_budget(model)
+        keep = settings.context_recent_messages
+        folded_before = self.summary_count
+
+        recent = self.transcript[self.summary_count:]
+        if self._cost(system_prompt, recent) > budget and len(recent) > keep:
+            try:
+                await self._fold(len(self.transcript) - keep, provider, model, labels, budget)
+            except Exception:
+                # Summaries are best-effort; fall back to trimming below
+                logger.warning("Summarizing older turns with %s failed; trimming instead", model, exc_info=True)
+            recent = self.transcript[self.summary_count:]
+
+        # Still too large (summary failed, or a few huge turns): drop from the
+        # front of this view without touching the persisted summary
+        while len(recent) > 1 and self._cost(system_prompt, recent) > budget:
+            recent = recent[1:]
+        # With no seed or summary ahead of it, the opener's view must not start
+        # on one of its own (assistant) turns; providers reject that
+        if role == self.opener and not self.summary:
+            while len(recent) > 1 and recent[0][0] == role:
+                recent = recent[1:]
+
+        if self.simultaneous:
+            recent = self._own_first(role, recent, self.rounds[len(self.transcript) - len(recent):])
+        return self.project(role, recent), self.summary_count != folded_before
+
+    async def _fold(
+        self,
+        upto: int,
+        provider: BaseProvider,
+        model: str,
+        labels: dict[str, str],
+        budget: int,
+    ) -> None:
+        """Fold transcript entries [summary_count, upto) into the summary, in
+        chunks small enough for the summarizing model."""
+        chunk_budget = max(budget // 2, 1)
+        while self.summary_count < upto:
+            chunk = []
+            size = estimate_tokens(self.summary)
+            for entry_role, content in self.transcript[self.summary_count:upto]:
+                cost = estimate_tokens(content)
+                if chunk and size + cost > chunk_budget:
+                    break
+                chunk.append((entry_role, content))
+                size += cost
+
+            turns = "\n\n".join(
+                f"{labels.get(entry_role, entry_role)}: {content}" for entry_role, content in chunk
+            )
+            prompt = (
+                f"Existing summary:\n{self.summary or '(none yet)'}\n\n"
+                f"New turns:\n{turns}\n\n"
+                f"Write the updated summary in at most {get_settings().context_summary_max_words} words."
+            )
+            response = await provider.chat(
+                [ChatMessage(role="user", content=prompt)], model, SUMMARY_SYSTEM_PROMPT
+            )
+            self.summary = response.content.strip()
+            self.summary_count += len(chunk)
@@ -1,5 +1,8 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import get_settings
 
 
@@ -7,17 +10,77 @@ class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(
-    get_settings().database_url,
-    echo=False,
-)
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _engine_options(settings) -> dict:
+    url = make_url(settings.database_url)
+    if _is_memory_sqlite(url):
+        # In-memory SQLite uses a single static connection; there is no pool to size
+        return {}
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        # aiosqlite defaults to NullPool, which reopens the file (and reruns
+        # the pragmas) for every session
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return {
+        **options,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def sqlite_pragmas(settings) -> list[str]:
+    """PRAGMA statements for the configured SQLite profile, in the order they must run."""
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size={-int(settings.sqlite_cache_size_kib)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}",
+        f"PRAGMA temp_store={settings.sqlite_temp_store}",
+    ]
+
+
+def _apply_sqlite_profile(engine, settings) -> None:
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def _create_engine():
+    settings = get_settings()
+    engine = create_async_engine(
+        settings.database_url,
+        echo=False,
+        **_engine_options(settings),
+    )
+    if engine.dialect.name == "sqlite" and settings.sqlite_profile_enabled:
+        _apply_sqlite_profile(engine, settings)
+    return engine
+
+
+engine = _create_engine()
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Creates missing tables and brings older schemas forward
+    from app.migrations import upgrade
+    await upgrade(engine)
 
 
 async def get_db():
@@ -0,0 +1,424 @@
+"""The turn loop behind a conversation run.
+
+run_turns() drives one run from the conversation's current state and yields
+its events as dicts: start, delta, summary, message, error and finally done.
+It owns its database sessions, so it can outlive the request that started it.
+Cancelling the task iterating it aborts the provider call in flight; text
+already streamed is saved as a message marked truncated in its payload.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncGenerator
+
+from sqlalchemy import select, update
+
+from app.context import ConversationContext
+from app.database import async_session
+from app.models import Conversation, Message, MessagePayload
+from app.persistence import message_writer
+from app.providers.base import BaseProvider, ChatResponse, estimate_tokens
+from app.providers.pool import key_fingerprint
+from app.providers.registry import get_model, get_provider
+from app.scheduler import turn_scheduler
+
+
+async def run_turns(
+    conversation_id: int,
+    turns: int,
+    stream: bool,
+    api_keys: dict[str, str],
+    simultaneous: bool = False,
+) -> AsyncGenerator[dict, None]:
+    """Run the conversation for up to `turns` turns.
+
+    With simultaneous, `turns` counts rounds: every participant answers the
+    same transcript at once and the replies are appended in participant order.
+    """
+    async with async_session() as session:
+        conversation = (await session.execute(
+            select(Conversation).where(Conversation.id == conversation_id)
+        )).scalar_one_or_none()
+        if conversation is None:
+            yield {"type": "error", "error": "Conversation not found"}
+            yield {"type": "done"}
+            return
+
+        # Role, content and round are all that is needed to rebuild the transcript
+        result = (await session.execute(
+            select(Message.role, Message.content, Message.round_number)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.id)
+        )).all()
+        existing_messages = [(row.role, row.content) for row in result]
+        existing_rounds = [row.round_number for row in result]
+
+    # Plain values only from here on; the session is closed
+    conv_id = conversation.id
+    members = [(p.role, p.label, p.model, p.system_prompt) for p in conversation.participants]
+    starter_message = conversation.starter_message
+    context_summary = conversation.context_summary
+    context_summary_count = conversation.context_summary_count
+
+    if len(members) < 2:
+        yield {"type": "error", "error": "Conversation needs at least two participants"}
+        yield {"type": "done"}
+        return
+
+    # Get providers with user-provided keys
+    speakers = []
+    failed = False
+    for role, label, model, system_prompt in members:
+        try:
+            provider = get_provider(model, api_keys)
+        except ValueError as e:
+            # Report every participant that cannot run, not just the first
+            yield {"type": "error", "error": f"Model {label} error: {str(e)}"}
+            failed = True
+            continue
+        # Turn slots are capped per provider key as well as globally
+        speakers.append(Speaker(
+            role, label, model, provider, system_prompt,
+            get_model(model).provider, key_fingerprint(getattr(provider, "api_key", None) or ""),
+        ))
+    if failed:
+        yield {"type": "done"}
+        return
+
+    # One shared transcript; each model's view is projected from it per turn
+    context = ConversationContext(
+        seed=starter_message,
+        transcript=list(existing_messages),
+        summary=context_summary,
+        summary_count=context_summary_count or 0,
+        # Taking turns, Model A opens by answering the first reply; in a
+        # round everyone answers together, so everyone needs the seed
+        opener=None if simultaneous else speakers[0].role,
+        rounds=existing_rounds,
+        simultaneous=simultaneous,
+    )
+    labels = {speaker.role: f"Model {speaker.label} ({speaker.model})" for speaker in speakers}
+
+    pending_writes = []
+    if simultaneous:
+        events = simultaneous_rounds(
+            conv_id, context, speakers, labels, turns, stream,
+            seeded=not existing_messages, pending_writes=pending_writes,
+        )
+    else:
+        events = sequential_turns(
+            conv_id, context, speakers, labels, turns, stream,
+            seeded=not existing_messages, pending_writes=pending_writes,
+        )
+    async for event in events:
+        yield event
+
+    async for event in _finish(pending_writes):
+        yield event
+
+
+async def _finish(pending_writes: list[asyncio.Future]) -> AsyncGenerator[dict, None]:
+    # Every message of this run is committed before the client hears "done"
+    results = await asyncio.gather(*pending_writes, return_exceptions=True)
+    failed = [r for r in results if isinstance(r, Exception)]
+    if failed:
+        yield {
+            "type": "error",
+            "error": f"Failed to save {len(failed)} message(s): {failed[0]}",
+        }
+
+    yield {"type": "done"}
+
+
+@dataclass
+class Speaker:
+    """A conversation participant bound to its provider for this run."""
+    role: str  # "model_a", "model_b", ...
+    label: str  # "A", "B", ...
+    model: str
+    provider: BaseProvider
+    system_prompt: str | None
+    provider_name: str  # Scheduler keys: provider and key fingerprint
+    key: str
+
+
+def _token_count(response: ChatResponse) -> int:
+    # Cached prompt tokens are reported separately from input_tokens
+    return (
+        (response.input_tokens or 0)
+        + (response.output_tokens or 0)
+        + (response.cache_read_input_tokens or 0)
+        + (response.cache_creation_input_tokens or 0)
+    )
+
+
+def _others(speaker: Speaker, speakers: list[Speaker]) -> str:
+    names = [f"Model {s.label} ({s.model})" for s in speakers if s is not speaker]
+    return names[0] if len(names) == 1 else f"{', '.join(names[:-1])} and {names[-1]}"
+
+
+def _system_prompt(speaker: Speaker, note: str | None, first: bool) -> str | None:
+    """The participant's own system prompt between the structure note and, on
+    the opening turn, a note that the seed came from a human."""
+    seed_note = "Note: The first message in this conversation was written by a human to seed the discussion."
+    parts = [note, speaker.system_prompt, seed_note if first else None]
+    return "\n\n".join(part for part in parts if part) or None
+
+
+def _turn_system_prompt(speaker: Speaker, speakers: list[Speaker], first: bool) -> str | None:
+    note = None
+    # Two models need no explanation; with more, each is told who else is speaking and in what order
+    if len(speakers) > 2:
+        order = " → ".join(s.label for s in speakers + speakers[:1])
+        note = (
+            f"You are Model {speaker.label} in a {len(speakers)}-way AI conversation. "
+            f"{_others(speaker, speakers)} are also participants. "
+            f"Messages from the other models appear as 'user' inputs. Respond in turn ({order})."
+        )
+    return _system_prompt(speaker, note, first)
+
+
+def _round_system_prompt(speaker: Speaker, speakers: list[Speaker], first: bool) -> str | None:
+    note = (
+        f"You are Model {speaker.label} in a {len(speakers)}-way AI conversation with {_others(speaker, speakers)}. "
+        "Each round, all models answer the same conversation at the same time; the other models' "
+        "replies from earlier rounds appear as 'user' inputs."
+    )
+    return _system_prompt(speaker, note, first)
+
+
+def _next_speaker(speakers: list[Speaker], transcript: list[tuple[str, str]]) -> int:
+    """Index of whoever follows the last message; Model B answers the seed."""
+    if not transcript:
+        return 1
+    roles = [speaker.role for speaker in speakers]
+    last_role = transcript[-1][0]
+    return (roles.index(last_role) + 1) % len(roles) if last_role in roles else 0
+
+
+async def sequential_turns(
+    conv_id: int,
+    context: ConversationContext,
+    speakers: list[Speaker],
+    labels: dict[str, str],
+    turns: int,
+    stream: bool,
+    seeded: bool,
+    pending_writes: list[asyncio.Future],
+) -> AsyncGenerator[dict, None]:
+    """Turns taken one participant at a time, in rotation (A → B → ... → A)."""
+    index = _next_speaker(speakers, context.transcript)
+    for turn in range(turns):
+        speaker = speakers[index]
+        system = _turn_system_prompt(speaker, speakers, first=seeded and turn == 0)
+        partial: list[str] = []  # Streamed text of this reply so far
+
+        try:
+            # Waits here while the instance, provider or key is at its cap
+            async with turn_scheduler.turn(conv_id, speaker.provider_name, speaker.key):
+                yield {"type": "start", "role": speaker.role, "model": speaker.model}
+
+                # Fit the transcript into this model's budget, folding old turns if needed
+                messages, summarized = await context.build_messages(
+                    speaker.role, speaker.model, system, speaker.provider, labels
+                )
+                if summarized:
+                    await _save_summary(conv_id, context)
+                    yield {
+                        "type": "summary",
+                        "role": speaker.role,
+                        "summarized_messages": context.summary_count,
+                    }
+
+                if stream:
+                    response = None
+                    async for item in speaker.provider.stream_chat(messages, speaker.model, system):
+                        if isinstance(item, ChatResponse):
+                            response = item
+                        else:
+                            partial.append(item)
+                            yield {"type": "delta", "role": speaker.role, "content": item}
+                    if response is None:
+                        raise RuntimeError("Stream ended without a final response")
+                else:
+                    response = await speaker.provider.chat(messages, speaker.model, system)
+
+                # Hand off to the background writer; durability is awaited before "done"
+                yield await _save_reply(conv_id, context, speaker, response, pending_writes)
+
+        except asyncio.CancelledError:
+            # The run was cancelled mid-reply: keep what the model had said so far
+            if partial:
+                yield await _save_partial(conv_id, speaker, "".join(partial), pending_writes)
+            await asyncio.gather(*pending_writes, return_exceptions=True)
+            raise
+
+        except Exception as e:
+            yield {"type": "error", "error": str(e)}
+            return
+
+        index = (index + 1) % len(speakers)
+
+
+async def simultaneous_rounds(
+    conv_id: int,
+    context: ConversationContext,
+    speakers: list[Speaker],
+    labels: dict[str, str],
+    rounds: int,
+    stream: bool,
+    seeded: bool,
+    pending_writes: list[asyncio.Future],
+) -> AsyncGenerator[dict, None]:
+    """Rounds in which every participant answers the same transcript at once.
+
+    A round takes as long as its slowest reply rather than the sum of them.
+    Deltas are interleaved as they arrive; the replies are then saved and
+    appended to the transcript in participant order, so stored order does
+    not depend on which model finished first.
+    """
+    for index in range(rounds):
+        # Stored with each reply, so later views can tell this round's replies apart
+        round_number = context.next_round()
+        # Fit every view before any call, so the shared summary folds at most once per round
+        requests = []
+        for speaker in speakers:
+            system = _round_system_prompt(speaker, speakers, first=seeded and index == 0)
+            messages, summarized = await context.build_messages(
+                speaker.role, speaker.model, system, speaker.provider, labels
+            )
+            if summarized:
+                await _save_summary(conv_id, context)
+                yield {"type": "summary", "role": speaker.role, "summarized_messages": context.summary_count}
+            requests.append((speaker, messages, system))
+
+        events: asyncio.Queue = asyncio.Queue()
+        partials: dict[str, list[str]] = {speaker.role: [] for speaker in speakers}
+
+        async def reply(speaker: Speaker, messages, system: str) -> ChatResponse:
+            try:
+                async with turn_scheduler.turn(conv_id, speaker.provider_name, speaker.key):
+                    events.put_nowait({"type": "start", "role": speaker.role, "model": speaker.model})
+                    if not stream:
+                        return await speaker.provider.chat(messages, speaker.model, system)
+                    response = None
+                    async for item in speaker.provider.stream_chat(messages, speaker.model, system):
+                        if isinstance(item, ChatResponse):
+                            response = item
+                        else:
+                            partials[speaker.role].append(item)
+                            events.put_nowait({"type": "delta", "role": speaker.role, "content": item})
+                    if response is None:
+                        raise RuntimeError("Stream ended without a final response")
+                    return response
+            finally:
+                events.put_nowait(None)
+
+        tasks = [asyncio.create_task(reply(*request)) for request in requests]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event = await events.get()
+                if event is None:
+                    remaining -= 1
+                else:
+                    yield event
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Keep finished replies, and what the others had streamed, in participant order
+            for speaker, task in zip(speakers, tasks):
+                if not task.cancelled() and task.exception() is None:
+                    yield await _save_reply(
+                        conv_id, context, speaker, task.result(), pending_writes, round_number
+                    )
+                elif partials[speaker.role]:
+                    yield await _save_partial(
+                        conv_id, speaker, "".join(partials[speaker.role]), pending_writes, round_number
+                    )
+            await asyncio.gather(*pending_writes, return_exceptions=True)
+            raise
+
+        results = [task.exception() or task.result() for task in tasks]
+        for speaker, result in zip(speakers, results):
+            if not isinstance(result, Exception):
+                yield await _save_reply(conv_id, context, speaker, result, pending_writes, round_number)
+        failed = False
+        for speaker, result in zip(speakers, results):
+            if isinstance(result, Exception):
+                yield {"type": "error", "error": f"{labels[speaker.role]}: {result}"}
+                failed = True
+        if failed:
+            return
+
+
+async def _save_summary(conv_id: int, context: ConversationContext) -> None:
+    async with async_session() as session:
+        await session.execute(
+            update(Conversation)
+            .where(Conversation.id == conv_id)
+            .values(context_summary=context.summary, context_summary_count=context.summary_count)
+        )
+        await session.commit()
+
+
+async def _save_reply(
+    conv_id: int,
+    context: ConversationContext,
+    speaker: Speaker,
+    response: ChatResponse,
+    pending_writes: list[asyncio.Future],
+    round_number: int | None = None,
+) -> dict:
+    """Queue a finished reply for writing, append it to the transcript and return its event."""
+    token_count = _token_count(response)
+    pending_writes.append(await message_writer.submit(Message(
+        conversation_id=conv_id,
+        role=speaker.role,
+        model_name=speaker.model,
+        content=response.content,
+        token_count=token_count,
+        cache_read_tokens=response.cache_read_input_tokens,
+        cache_creation_tokens=response.cache_creation_input_tokens,
+        round_number=round_number,
+        payload=MessagePayload.pack(response.raw_response),
+    )))
+    context.append(speaker.role, response.content, round_number)
+    return {
+        "type": "message",
+        "role": speaker.role,
+        "model": speaker.model,
+        "content": response.content,
+        "tokens": token_count,
+        "cache_read_tokens": response.cache_read_input_tokens,
+        "cache_creation_tokens": response.cache_creation_input_tokens,
+        "cached": response.cached,
+    }
+
+
+async def _save_partial(
+    conv_id: int,
+    speaker: Speaker,
+    content: str,
+    pending_writes: list[asyncio.Future],
+    round_number: int | None = None,
+) -> dict:
+    """Queue the streamed part of an interrupted reply, marked truncated."""
+    token_count = estimate_tokens(content)
+    pending_writes.append(await message_writer.submit(Message(
+        conversation_id=conv_id,
+        role=speaker.role,
+        model_name=speaker.model,
+        content=content,
+        token_count=token_count,
+        round_number=round_number,
+        payload=MessagePayload.pack({"truncated": True}),
+    )))
+    return {
+        "type": "message",
+        "role": speaker.role,
+        "model": speaker.model,
+        "content": content,
+        "tokens": token_count,
+        "truncated": True,
+    }
@@ -0,0 +1,242 @@
+"""Streaming conversation export.
+
+Rows are read through a server-side cursor in batches and formatted as they
+arrive, so memory stays flat however long a conversation is.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncGenerator
+
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models import Conversation, Message
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "json": ("application/json", "json"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "md": ("text/markdown; charset=utf-8", "md"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "txt": ("text/plain; charset=utf-8", "txt"),
+}
+
+# Rows fetched per round trip, and bytes buffered before a chunk is sent
+YIELD_PER = 500
+CHUNK_SIZE = 64 * 1024
+
+_SESSION_FIELDS = ("id", "title", "starter_message", "created_at", "updated_at")
+_PARTICIPANT_FIELDS = ("position", "role", "model", "system_prompt")
+_MESSAGE_COLUMNS = (
+    Message.id, Message.conversation_id, Message.role, Message.model_name, Message.content,
+    Message.token_count, Message.cache_read_tokens, Message.cache_creation_tokens, Message.created_at,
+)
+
+
+def _json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=_default)
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _session(conversation: Conversation) -> dict:
+    session = {field: getattr(conversation, field) for field in _SESSION_FIELDS}
+    session["participants"] = [
+        {field: getattr(participant, field) for field in _PARTICIPANT_FIELDS}
+        for participant in conversation.participants
+    ]
+    return session
+
+
+def _role_label(role: str) -> str:
+    # "model_a" -> "A"; injected or unknown roles pass through
+    return role.removeprefix("model_").upper() if role else ""
+
+
+class _Formatter:
+    """Renders one export; each hook returns the text to append."""
+
+    def __init__(self, bulk: bool):
+        self.bulk = bulk
+        self.exported_at = datetime.utcnow().isoformat()
+
+    def begin(self) -> str:
+        return ""
+
+    def begin_conversation(self, conversation: Conversation, first: bool) -> str:
+        return ""
+
+    def message(self, row, index: int, first: bool) -> str:
+        return ""
+
+    def end_conversation(self, conversation: Conversation, count: int, tokens: int) -> str:
+        return ""
+
+    def end(self) -> str:
+        return ""
+
+
+class _JSONFormatter(_Formatter):
+    """Same document the browser export produced; bulk wraps them in a list."""
+
+    def _meta(self) -> str:
+        return _json({"framework": "Neural Discourse", "version": "0.1.0", "exported_at": self.exported_at})
+
+    def begin(self) -> str:
+        return f'{{"meta": {self._meta()}, "conversations": [\n' if self.bulk else ""
+
+    def begin_conversation(self, conversation, first):
+        head = "" if first else ",\n"
+        meta = "" if self.bulk else f'"meta": {self._meta()}, '
+        return f'{head}{{{meta}"session": {_json(_session(conversation))}, "messages": [\n'
+
+    def message(self, row, index, first):
+        return ("" if first else ",\n") + _json(dict(row._mapping))
+
+    def end_conversation(self, conversation, count, tokens):
+        stats = _json({"total_messages": count, "total_tokens": tokens})
+        return f'\n], "stats": {stats}}}'
+
+    def end(self):
+        return "\n]}\n" if self.bulk else "\n"
+
+
+class _JSONLFormatter(_Formatter):
+    """One record per line: a conversation header followed by its messages."""
+
+    def begin_conversation(self, conversation, first):
+        return _json({"type": "conversation", **_session(conversation)}) + "\n"
+
+    def message(self, row, index, first):
+        return _json({"type": "message", **row._mapping}) + "\n"
+
+
+class _MarkdownFormatter(_Formatter):
+    def begin_conversation(self, conversation, first):
+        lines = [
+            "" if first else "\n---\n\n",
+            f"# {conversation.title}\n\n",
+            f"**Exported:** {self.exported_at}\n\n",
+            "## Configuration\n\n",
+            *(f"- **Model {p.label}:** {p.model}\n" for p in conversation.participants),
+            "\n## Conversation\n\n",
+            f"### INIT\n\n{conversation.starter_message}\n\n",
+        ]
+        return "".join(lines)
+
+    def message(self, row, index, first):
+        return f"### {_role_label(row.role)} - {row.model_name}\n\n{row.content}\n\n"
+
+
+class _CSVFormatter(_Formatter):
+    def __init__(self, bulk: bool):
+        super().__init__(bulk)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _row(self, *values) -> str:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(values)
+        return self._buffer.getvalue()
+
+    def begin(self):
+        columns = ("Index", "Role", "Model", "Tokens", "Content")
+        return self._row("Conversation", *columns) if self.bulk else self._row(*columns)
+
+    def begin_conversation(self, conversation, first):
+        row = (0, "INIT", "human", 0, conversation.starter_message)
+        return self._row(conversation.id, *row) if self.bulk else self._row(*row)
+
+    def message(self, row, index, first):
+        values = (index, row.role, row.model_name, row.token_count or 0, row.content)
+        return self._row(row.conversation_id, *values) if self.bulk else self._row(*values)
+
+
+class _TextFormatter(_Formatter):
+    def begin_conversation(self, conversation, first):
+        return (
+            ("" if first else "\n")
+            + "Neural Discourse - Conversation Export\n"
+            + f"Title: {conversation.title}\n"
+            + f"Exported: {self.exported_at}\n"
+            + f"{'=' * 60}\n\n"
+            + f"INIT: {conversation.starter_message}\n\n"
+        )
+
+    def message(self, row, index, first):
+        return f"[{(row.role or '').upper()}] {row.model_name}\n{row.content}\n\n"
+
+
+_FORMATTERS = {
+    "json": _JSONFormatter,
+    "jsonl": _JSONLFormatter,
+    "md": _MarkdownFormatter,
+    "csv": _CSVFormatter,
+    "txt": _TextFormatter,
+}
+
+
+async def stream_export(
+    format: str,
+    conversation_ids: list[int] | None,
+    bulk: bool,
+) -> AsyncGenerator[bytes, None]:
+    """Yield the export in chunks of about CHUNK_SIZE bytes.
+
+    conversation_ids=None exports every conversation. Opens its own session:
+    the response body is produced after the request's session has closed.
+    """
+    formatter = _FORMATTERS[format](bulk)
+    buffer: list[str] = []
+    size = 0
+
+    def add(piece: str) -> bytes | None:
+        nonlocal size
+        if not piece:
+            return None
+        buffer.append(piece)
+        size += len(piece)
+        if size < CHUNK_SIZE:
+            return None
+        chunk = "".join(buffer).encode()
+        buffer.clear()
+        size = 0
+        return chunk
+
+    async with async_session() as session:
+        query = select(Conversation).order_by(Conversation.id)
+        if conversation_ids is not None:
+            query = query.where(Conversation.id.in_(conversation_ids))
+        conversations = (await session.execute(query)).scalars().all()
+
+        if chunk := add(formatter.begin()):
+            yield chunk
+        for n, conversation in enumerate(conversations):
+            if chunk := add(formatter.begin_conversation(conversation, first=n == 0)):
+                yield chunk
+            count = tokens = 0
+            rows = await session.stream(
+                select(*_MESSAGE_COLUMNS)
+                .where(Message.conversation_id == conversation.id)
+                .order_by(Message.id)
+                .execution_options(yield_per=YIELD_PER)
+            )
+            async for row in rows:
+                count += 1
+                tokens += row.token_count or 0
+                if chunk := add(formatter.message(row, count, first=count == 1)):
+                    yield chunk
+            if chunk := add(formatter.end_conversation(conversation, count, tokens)):
+                yield chunk
+        if chunk := add(formatter.end()):
+            yield chunk
+
+    if buffer:
+        yield "".join(buffer).encode()
@@ -0,0 +1,122 @@
+import re
+from collections import Counter
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.models import ConversationTerm, Message
+
+STOP_WORDS = frozenset("""
+    the a an is are was were be been being have has had do does did will would could should may might
+    must shall can need dare ought used to of in for on with at by from as into through during before
+    after above below between under again further then once here there when where why how all each few
+    more most other some such no nor not only own same so than too very just and but if or because until
+    while although what which who this that these those am it its i you he she we they my your his her
+    our their me him us them about like also well even really think know say get
+""".split())
+
+_WORD = re.compile(r"\b[a-z]{4,}\b")
+
+# Longest term kept; anything longer is almost always noise (URLs, hashes)
+MAX_TERM_LENGTH = 64
+
+
+def extract_terms(text: str | None) -> Counter:
+    """Term frequencies of a message: lowercase words of 4+ letters, minus stop words."""
+    if not text:
+        return Counter()
+    return Counter(
+        word for word in _WORD.findall(text.lower())
+        if word not in STOP_WORDS and len(word) <= MAX_TERM_LENGTH
+    )
+
+
+def _insert(session: AsyncSession):
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Keyword index does not support {dialect}")
+
+
+async def add_terms(session: AsyncSession, conversation_id: int, text: str | None) -> None:
+    """Fold one message's terms into its conversation's counts.
+
+    Runs in the caller's session, so the counts commit with the message.
+    """
+    await upsert_terms(session, conversation_id, extract_terms(text))
+
+
+async def upsert_terms(session: AsyncSession, conversation_id: int, terms: Counter) -> None:
+    """Add already-extracted term counts, e.g. merged from a batch of messages."""
+    if not terms:
+        return
+    insert = _insert(session)
+    statement = insert(ConversationTerm).values([
+        {"conversation_id": conversation_id, "term": term, "count": count}
+        for term, count in terms.items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[ConversationTerm.conversation_id, ConversationTerm.term],
+        set_={"count": ConversationTerm.count + statement.excluded.count},
+    )
+    await session.execute(statement)
+
+
+async def top_terms(
+    session: AsyncSession,
+    k: int,
+    conversation_ids: list[int] | None = None,
+) -> dict[int, list[str]]:
+    """The k most frequent terms of each conversation, in one query."""
+    rank = func.row_number().over(
+        partition_by=ConversationTerm.conversation_id,
+        order_by=(ConversationTerm.count.desc(), ConversationTerm.term),
+    ).label("rank")
+    ranked = select(ConversationTerm.conversation_id, ConversationTerm.term, rank)
+    if conversation_ids is not None:
+        ranked = ranked.where(ConversationTerm.conversation_id.in_(conversation_ids))
+    ranked = ranked.subquery()
+
+    result = await session.execute(
+        select(ranked.c.conversation_id, ranked.c.term)
+        .where(ranked.c.rank <= k)
+        .order_by(ranked.c.conversation_id, ranked.c.rank)
+    )
+    keywords: dict[int, list[str]] = {}
+    for conversation_id, term in result:
+        keywords.setdefault(conversation_id, []).append(term)
+    return keywords
+
+
+async def rebuild_terms(
+    session: AsyncSession | AsyncConnection,
+    conversation_id: int | None = None,
+) -> int:
+    """Recount terms from stored messages; returns the number of messages read.
+
+    Used to backfill existing databases and to repair drifted counts.
+    """
+    clear = delete(ConversationTerm)
+    query = select(Message.conversation_id, Message.content).order_by(Message.conversation_id, Message.id)
+    if conversation_id is not None:
+        clear = clear.where(ConversationTerm.conversation_id == conversation_id)
+        query = query.where(Message.conversation_id == conversation_id)
+    await session.execute(clear)
+
+    totals: dict[int, Counter] = {}
+    read = 0
+    for cid, content in await session.execute(query):
+        totals.setdefault(cid, Counter()).update(extract_terms(content))
+        read += 1
+
+    rows = [
+        {"conversation_id": cid, "term": term, "count": count}
+        for cid, counter in totals.items()
+        for term, count in counter.items()
+    ]
+    if rows:
+        await session.execute(ConversationTerm.__table__.insert(), rows)
+    return read
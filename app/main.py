@@ -13,7 +13,12 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from app.database import init_db
-from app.routes import conversations, models
+from app.config import get_settings
+from app.persistence import message_writer
+from app.runs import run_manager
+from app.providers.pool import client_pool
+from app.providers.cache import get_response_cache
+from app.routes import analytics, conversations, models, runs, search
 
 
 # Rate limiter setup
@@ -45,6 +50,12 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
 async def lifespan(app: FastAPI):
     await init_db()
     yield
+    # Runs stop first so their finished turns reach the writer before it flushes
+    await run_manager.aclose()
+    await message_writer.aclose()
+    await client_pool.aclose()
+    if get_settings().response_cache_enabled:
+        get_response_cache().close()
 
 
 app = FastAPI(
@@ -94,6 +105,9 @@ templates = Jinja2Templates(directory=templates_path)
 # Include routers
 app.include_router(conversations.router)
 app.include_router(models.router)
+app.include_router(runs.router)
+app.include_router(search.router)
+app.include_router(analytics.router)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -0,0 +1,220 @@
+"""Versioned schema migrations.
+
+Applied in order at startup (init_db) and recorded in schema_migrations, so
+each one runs once per database. Every step checks the live schema before
+changing it: a fresh database gets the current tables from the baseline and
+the later steps find nothing to do, while a database created by an older
+release is brought forward step by step.
+
+    python -m app.migrations            # apply pending migrations
+    python -m app.migrations status     # list applied and pending versions
+"""
+import asyncio
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.database import Base
+from app.keywords import rebuild_terms
+from app.models import ConversationTerm, Message, MessagePayload, Participant
+from app.search import create_index as create_search_index
+
+BATCH_SIZE = 500
+
+# Arbitrary key for pg_advisory_xact_lock: one instance migrates, the others wait
+ADVISORY_LOCK_KEY = 7_160_512
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[AsyncConnection], Awaitable[None]]
+
+
+async def _columns(conn: AsyncConnection, table: str) -> set[str]:
+    return await conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns(table)})
+
+
+async def _add_columns(conn: AsyncConnection, table: str, columns: dict[str, str]) -> None:
+    existing = await _columns(conn, table)
+    for name, ddl in columns.items():
+        if name not in existing:
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+async def create_tables(conn: AsyncConnection) -> None:
+    # Only creates tables that are missing; existing ones are left to later steps
+    await conn.run_sync(Base.metadata.create_all)
+
+
+# Per-model columns of conversations before the participants table
+LEGACY_PARTICIPANT_COLUMNS = (
+    ("model_a", "system_prompt_a"),
+    ("model_b", "system_prompt_b"),
+    ("model_c", "system_prompt_c"),
+)
+
+
+async def add_model_c(conn: AsyncConnection) -> None:
+    # Only a database still on per-model columns needs the third pair
+    if "model_a" not in await _columns(conn, "conversations"):
+        return
+    await _add_columns(conn, "conversations", {
+        "model_c": "VARCHAR(100)",
+        "system_prompt_c": "TEXT",
+    })
+
+
+async def add_cache_tokens(conn: AsyncConnection) -> None:
+    await _add_columns(conn, "messages", {
+        "cache_read_tokens": "INTEGER",
+        "cache_creation_tokens": "INTEGER",
+    })
+
+
+async def add_context_summary(conn: AsyncConnection) -> None:
+    await _add_columns(conn, "conversations", {
+        "context_summary": "TEXT",
+        "context_summary_count": "INTEGER DEFAULT 0",
+    })
+
+
+async def move_raw_responses(conn: AsyncConnection) -> None:
+    """Copy messages.raw_response into message_payloads, then drop the column."""
+    if "raw_response" not in await _columns(conn, "messages"):
+        return
+    # Gone from the model, so address the legacy column by name
+    raw_response = literal_column("raw_response")
+    last_id = 0
+    while True:
+        rows = (await conn.execute(
+            select(Message.id, raw_response)
+            .where(Message.id > last_id, raw_response.isnot(None))
+            .order_by(Message.id)
+            .limit(BATCH_SIZE)
+        )).all()
+        if not rows:
+            break
+        ids = [message_id for message_id, _ in rows]
+        present = set((await conn.execute(
+            select(MessagePayload.message_id).where(MessagePayload.message_id.in_(ids))
+        )).scalars())
+        decoded = ((message_id, json.loads(raw) if isinstance(raw, str) else raw) for message_id, raw in rows)
+        # The old JSON column stored a missing response as JSON null, not SQL NULL
+        payloads = [
+            {"message_id": message_id, "data": data}
+            for message_id, data in decoded
+            if data is not None and message_id not in present
+        ]
+        if payloads:
+            await conn.execute(MessagePayload.__table__.insert(), payloads)
+        last_id = ids[-1]
+    await conn.execute(text("ALTER TABLE messages DROP COLUMN raw_response"))
+
+
+async def add_message_index(conn: AsyncConnection) -> None:
+    for index in Message.__table__.indexes:
+        await conn.run_sync(lambda c: index.create(c, checkfirst=True))
+
+
+async def build_keyword_index(conn: AsyncConnection) -> None:
+    has_terms = (await conn.execute(select(ConversationTerm.term).limit(1))).first()
+    if not has_terms:
+        await rebuild_terms(conn)
+
+
+async def create_participants(conn: AsyncConnection) -> None:
+    """Move conversations.model_x / system_prompt_x into participants rows, then drop the columns."""
+    await conn.run_sync(lambda c: Participant.__table__.create(c, checkfirst=True))
+    existing = await _columns(conn, "conversations")
+    for position, (model, system_prompt) in enumerate(LEGACY_PARTICIPANT_COLUMNS):
+        if model not in existing:
+            continue
+        await conn.execute(text(
+            f"INSERT INTO participants (conversation_id, position, model, system_prompt) "
+            f"SELECT id, {position}, {model}, {system_prompt} FROM conversations "
+            f"WHERE {model} IS NOT NULL AND id NOT IN "
+            f"(SELECT conversation_id FROM participants WHERE position = {position})"
+        ))
+    for column in (name for pair in LEGACY_PARTICIPANT_COLUMNS for name in pair):
+        if column in existing:
+            await conn.execute(text(f"ALTER TABLE conversations DROP COLUMN {column}"))
+
+
+async def add_message_round(conn: AsyncConnection) -> None:
+    await _add_columns(conn, "messages", {"round_number": "INTEGER"})
+
+
+MIGRATIONS = [
+    Migration(1, "create_tables", create_tables),
+    Migration(2, "add_model_c", add_model_c),
+    Migration(3, "add_cache_tokens", add_cache_tokens),
+    Migration(4, "add_context_summary", add_context_summary),
+    Migration(5, "move_raw_responses", move_raw_responses),
+    Migration(6, "add_message_index", add_message_index),
+    Migration(7, "build_keyword_index", build_keyword_index),
+    Migration(8, "create_search_index", create_search_index),
+    Migration(9, "create_participants", create_participants),
+    Migration(10, "add_message_round", add_message_round),
+]
+
+
+async def applied_versions(conn: AsyncConnection) -> set[int]:
+    await conn.run_sync(_metadata.create_all)
+    return set((await conn.execute(select(schema_migrations.c.version))).scalars())
+
+
+async def upgrade(engine: AsyncEngine) -> list[Migration]:
+    """Apply pending migrations in one transaction; returns the ones applied."""
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        done = await applied_versions(conn)
+        applied = []
+        for migration in MIGRATIONS:
+            if migration.version in done:
+                continue
+            await migration.apply(conn)
+            await conn.execute(schema_migrations.insert().values(
+                version=migration.version, name=migration.name, applied_at=datetime.utcnow(),
+            ))
+            applied.append(migration)
+    return applied
+
+
+async def _main(command: str) -> None:
+    from app.database import engine
+
+    if command == "status":
+        async with engine.begin() as conn:
+            done = await applied_versions(conn)
+        for migration in MIGRATIONS:
+            state = "applied" if migration.version in done else "pending"
+            print(f"{migration.version:4d}  {migration.name:24} {state}")
+    elif command == "upgrade":
+        applied = await upgrade(engine)
+        for migration in applied:
+            print(f"✓ {migration.version:4d}  {migration.name}")
+        print("\nMigration complete!" if applied else "Database is up to date.")
+    else:
+        raise SystemExit(f"Unknown command: {command} (expected 'upgrade' or 'status')")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "upgrade"))
@@ -1,6 +1,11 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, LargeBinary, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
+import json
+import string
+import zlib
 from app.database import Base
 
 
@@ -9,29 +14,121 @@ class Conversation(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), default="Untitled")
-    model_a = Column(String(100))  # e.g., "claude-3-5-sonnet"
-    model_b = Column(String(100))  # e.g., "llama-3.1-70b"
-    model_c = Column(String(100), nullable=True)  # Optional third model
-    system_prompt_a = Column(Text, nullable=True)
-    system_prompt_b = Column(Text, nullable=True)
-    system_prompt_c = Column(Text, nullable=True)
     starter_message = Column(Text)
+    context_summary = Column(Text, nullable=True)  # Rolling summary of folded turns
+    context_summary_count = Column(Integer, default=0)  # Messages folded into context_summary
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    # Small and needed wherever the conversation is, so loaded alongside it
+    participants = relationship(
+        "Participant",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        order_by="Participant.position",
+        lazy="selectin",
+    )
+
+
+def participant_role(position: int) -> str:
+    """Message role of the participant at a position: 0 -> "model_a", 1 -> "model_b", ..."""
+    return f"model_{string.ascii_lowercase[position]}"
+
+
+class Participant(Base):
+    """One model taking part in a conversation, in speaking order."""
+    __tablename__ = "participants"
+    __table_args__ = (
+        UniqueConstraint("conversation_id", "position", name="uq_participants_conversation_id_position"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
+    position = Column(Integer, nullable=False)  # 0 speaks as "model_a", 1 as "model_b", ...
+    model = Column(String(100), nullable=False)  # e.g., "claude-3-5-sonnet"
+    system_prompt = Column(Text, nullable=True)
+
+    conversation = relationship("Conversation", back_populates="participants")
+
+    @property
+    def role(self) -> str:
+        return participant_role(self.position)
+
+    @property
+    def label(self) -> str:
+        return self.role.removeprefix("model_").upper()
 
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Serves per-conversation keyset pages: WHERE conversation_id = ? AND id > ? ORDER BY id
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
-    role = Column(String(50))  # "model_a", "model_b", or "model_c"
+    role = Column(String(50))  # Speaking participant: "model_a", "model_b", ...
     model_name = Column(String(100))
     content = Column(Text)
-    raw_response = Column(JSON, nullable=True)  # Store full API response for analysis
     token_count = Column(Integer, nullable=True)
+    cache_read_tokens = Column(Integer, nullable=True)  # Prompt tokens served from provider cache
+    cache_creation_tokens = Column(Integer, nullable=True)  # Prompt tokens written to provider cache
+    round_number = Column(Integer, nullable=True)  # Simultaneous round, counted per conversation; None for turns
     created_at = Column(DateTime, default=datetime.utcnow)
 
     conversation = relationship("Conversation", back_populates="messages")
+    # Full API response, kept out of the message row; loaded only on request
+    payload = relationship("MessagePayload", uselist=False, cascade="all, delete-orphan")
+
+
+class PayloadJSON(TypeDecorator):
+    """JSON document stored as JSONB on PostgreSQL and as zlib-compressed bytes elsewhere."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        # Provider payloads can carry datetimes and other non-JSON values
+        encoded = json.dumps(value, default=str)
+        if dialect.name == "postgresql":
+            return json.loads(encoded)
+        return zlib.compress(encoded.encode(), 6)
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return json.loads(zlib.decompress(value))
+
+
+class MessagePayload(Base):
+    __tablename__ = "message_payloads"
+
+    message_id = Column(Integer, ForeignKey("messages.id"), primary_key=True)
+    data = Column(PayloadJSON)
+
+    @classmethod
+    def pack(cls, raw_response: dict | None) -> "MessagePayload | None":
+        if raw_response is None:
+            return None
+        return cls(data=raw_response)
+
+    def unpack(self) -> dict:
+        return self.data
+
+
+class ConversationTerm(Base):
+    """Running term frequency per conversation, updated as messages are saved."""
+    __tablename__ = "conversation_terms"
+
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), primary_key=True)
+    term = Column(String(64), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from collections import Counter
+
+from app.config import get_settings
+from app.database import async_session
+from app.keywords import extract_terms, upsert_terms
+from app.models import Message
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriter:
+    """Write-behind persistence for turn messages.
+
+    Runs submit messages and carry on streaming; a single background task
+    commits whatever has queued up since its last commit in one transaction,
+    so concurrent runs share a commit instead of each paying for its own and
+    contending for SQLite's writer lock. The queue is bounded: when the
+    database falls behind, submit() waits instead of buffering without limit.
+    """
+
+    def __init__(self, queue_size: int = 256, batch_size: int = 64):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=max(self.queue_size, 1))
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, message: Message) -> asyncio.Future:
+        """Queue a message; the returned future resolves once it is committed."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((message, future))
+        return future
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            # Group-commit everything that arrived while the last commit ran
+            while len(batch) < self.batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+            if stopping:
+                return
+
+    async def _write(self, batch: list[tuple[Message, asyncio.Future]]) -> None:
+        try:
+            await self._commit([message for message, _ in batch])
+        except Exception:
+            logger.exception("Batched write of %d messages failed; retrying one by one", len(batch))
+            # Isolate the failing message so the rest of the batch still lands
+            for message, future in batch:
+                try:
+                    await self._commit([message])
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(message.id)
+            return
+        for message, future in batch:
+            if not future.done():
+                future.set_result(message.id)
+
+    @staticmethod
+    async def _commit(messages: list[Message]) -> None:
+        terms: dict[int, Counter] = {}
+        for message in messages:
+            terms.setdefault(message.conversation_id, Counter()).update(extract_terms(message.content))
+        async with async_session() as session:
+            session.add_all(messages)
+            for conversation_id, counts in terms.items():
+                await upsert_terms(session, conversation_id, counts)
+            await session.commit()
+
+    async def aclose(self) -> None:
+        """Flush everything queued, then stop the writer task."""
+        if self._task is None or self._task.done():
+            return
+        await self._queue.put(None)
+        await self._task
+
+
+def _create_writer() -> MessageWriter:
+    settings = get_settings()
+    return MessageWriter(
+        queue_size=settings.message_writer_queue_size,
+        batch_size=settings.message_writer_batch_size,
+    )
+
+
+message_writer = _create_writer()
@@ -1,10 +1,26 @@
+from importlib import import_module
+
 from app.providers.base import BaseProvider, ModelInfo
-from app.providers.anthropic import AnthropicProvider
-from app.providers.groq import GroqProvider
-from app.providers.openai import OpenAIProvider
-from app.providers.xai import XAIProvider
-from app.providers.kimi import KimiProvider
-from app.providers.gemini import GeminiProvider
+
+# Provider classes resolve on first access, keeping their modules (and SDKs)
+# out of startup for deployments that never touch them.
+_LAZY_PROVIDERS = {
+    "AnthropicProvider": "app.providers.anthropic",
+    "GroqProvider": "app.providers.groq",
+    "OpenAIProvider": "app.providers.openai",
+    "XAIProvider": "app.providers.xai",
+    "KimiProvider": "app.providers.kimi",
+    "GeminiProvider": "app.providers.gemini",
+    "MockProvider": "app.providers.mock",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_PROVIDERS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module), name)
+
 
 __all__ = [
     "BaseProvider",
@@ -15,4 +31,5 @@ __all__ = [
     "XAIProvider",
     "KimiProvider",
     "GeminiProvider",
+    "MockProvider",
 ]
@@ -1,92 +1,130 @@
 from typing import AsyncGenerator
-import anthropic
 from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse
+from app.providers.pool import client_pool
 from app.config import get_settings
 
 
 class AnthropicProvider(BaseProvider):
+    name = "anthropic"
+    MODELS = [
+        ModelInfo(
+            id="claude-opus-4-5-20251101",
+            name="Claude Opus 4.5",
+            provider="anthropic",
+            description="Most capable, aligned",
+            context_window=200000,
+        ),
+        ModelInfo(
+            id="claude-sonnet-4-20250514",
+            name="Claude Sonnet 4",
+            provider="anthropic",
+            description="Balanced, aligned",
+            context_window=200000,
+        ),
+        ModelInfo(
+            id="claude-3-5-haiku-20241022",
+            name="Claude 3.5 Haiku",
+            provider="anthropic",
+            description="Fast, aligned",
+            context_window=200000,
+        ),
+    ]
+
     def __init__(self, api_key: str | None = None):
         settings = get_settings()
         # User-provided key takes precedence over env var
         self.api_key = api_key or settings.anthropic_api_key
-        if self.api_key:
-            self.client = anthropic.AsyncAnthropic(api_key=self.api_key)
-        else:
-            self.client = None
+
+    def _create_client(self):
+        # SDK is imported on first use so unused providers cost nothing at startup
+        import anthropic
+
+        return anthropic.AsyncAnthropic(api_key=self.api_key, max_retries=0)
+
+    def _lease(self):
+        # Borrowed per call, so an evicted client is only closed once no call is using it
+        return client_pool.lease("anthropic", self.api_key, self._create_client)
 
     def get_available_models(self) -> list[ModelInfo]:
-        return [
-            ModelInfo(
-                id="claude-opus-4-5-20251101",
-                name="Claude Opus 4.5",
-                provider="anthropic",
-                description="Most capable, aligned",
-            ),
-            ModelInfo(
-                id="claude-sonnet-4-20250514",
-                name="Claude Sonnet 4",
-                provider="anthropic",
-                description="Balanced, aligned",
-            ),
-            ModelInfo(
-                id="claude-3-5-haiku-20241022",
-                name="Claude 3.5 Haiku",
-                provider="anthropic",
-                description="Fast, aligned",
-            ),
-        ]
+        return self.MODELS
 
-    async def chat(
+    def _request_kwargs(
         self,
         messages: list[ChatMessage],
         model: str,
-        system_prompt: str | None = None,
-    ) -> ChatResponse:
-        if not self.client:
-            raise ValueError("Anthropic API key not configured")
+        system_prompt: str | None,
+    ) -> dict:
+        """Build request arguments with prompt-cache breakpoints.
 
+        The system prompt and the transcript up to the newest message are marked
+        cacheable. Each turn only appends to the transcript, so the next request
+        reads the previous turn's prefix from cache and only the new tail is
+        prefilled. Prefixes below the model's minimum cacheable length are
+        simply not cached.
+        """
         api_messages = [{"role": m.role, "content": m.content} for m in messages]
+        if api_messages:
+            last = api_messages[-1]
+            last["content"] = [
+                {"type": "text", "text": last["content"], "cache_control": {"type": "ephemeral"}}
+            ]
 
         kwargs = {
             "model": model,
-            "max_tokens": 4096,
+            "max_tokens": self.output_budget(model),
             "messages": api_messages,
         }
         if system_prompt:
-            kwargs["system"] = system_prompt
-
-        response = await self.client.messages.create(**kwargs)
+            kwargs["system"] = [
+                {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+            ]
+        return kwargs
 
+    @staticmethod
+    def _to_chat_response(response, model: str) -> ChatResponse:
         return ChatResponse(
-            content=response.content[0].text,
+            content="".join(block.text for block in response.content if block.type == "text"),
             model=model,
             raw_response=response.model_dump(),
             input_tokens=response.usage.input_tokens,
             output_tokens=response.usage.output_tokens,
+            cache_creation_input_tokens=response.usage.cache_creation_input_tokens,
+            cache_read_input_tokens=response.usage.cache_read_input_tokens,
         )
 
-    async def stream_chat(
+    async def chat(
         self,
         messages: list[ChatMessage],
         model: str,
         system_prompt: str | None = None,
-    ) -> AsyncGenerator[str, None]:
-        if not self.client:
+    ) -> ChatResponse:
+        if not self.api_key:
             raise ValueError("Anthropic API key not configured")
 
-        api_messages = [{"role": m.role, "content": m.content} for m in messages]
+        kwargs = self._request_kwargs(messages, model, system_prompt)
 
-        kwargs = {
-            "model": model,
-            "max_tokens": 4096,
-            "messages": api_messages,
-        }
-        if system_prompt:
-            kwargs["system"] = system_prompt
+        async with self._lease() as client:
+            response = await client.messages.create(**kwargs)
+
+        return self._to_chat_response(response, model)
+
+    async def stream_chat(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        system_prompt: str | None = None,
+    ) -> AsyncGenerator[str | ChatResponse, None]:
+        if not self.api_key:
+            raise ValueError("Anthropic API key not configured")
+
+        kwargs = self._request_kwargs(messages, model, system_prompt)
 
-        async with self.client.messages.stream(**kwargs) as stream:
+        async with self._lease() as client, client.messages.stream(**kwargs) as stream:
             async for text in stream.text_stream:
                 yield text
+            response = await stream.get_final_message()
+
+        yield self._to_chat_response(response, model)
 
     def is_configured(self) -> bool:
         return bool(self.api_key)
@@ -2,6 +2,8 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import AsyncGenerator
 
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+
 
 @dataclass
 class ModelInfo:
@@ -9,6 +11,8 @@ class ModelInfo:
     name: str
     provider: str
     description: str
+    context_window: int | None = None  # Total tokens the model accepts
+    max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS  # Reply budget requested per call
 
 
 @dataclass
@@ -24,14 +28,47 @@ class ChatResponse:
     raw_response: dict
     input_tokens: int | None = None
     output_tokens: int | None = None
+    cache_creation_input_tokens: int | None = None  # Prompt tokens written to the provider cache
+    cache_read_input_tokens: int | None = None  # Prompt tokens served from the provider cache
+    cached: bool = False  # Served from the local response cache, no provider call made
+
+
+# Rough cross-provider heuristic; exact tokenizers differ per vendor
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str | None) -> int:
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def usage_value(usage, field: str) -> int | None:
+    """Read a usage counter from an SDK object or a raw dict."""
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get(field)
+    return getattr(usage, field, None)
 
 
 class BaseProvider(ABC):
+    name: str = ""  # Registry key, also used for the settings/header key lookup
+    requires_api_key: bool = True
+    MODELS: list[ModelInfo] = []  # Static catalog, indexed once by the registry
+
     @abstractmethod
     def get_available_models(self) -> list[ModelInfo]:
         """Return list of available models for this provider."""
         pass
 
+    def output_budget(self, model: str) -> int:
+        """Reply budget to request for a model, from its catalog entry."""
+        for info in self.MODELS:
+            if info.id == model:
+                return info.max_output_tokens
+        return DEFAULT_MAX_OUTPUT_TOKENS
+
     @abstractmethod
     async def chat(
         self,
@@ -48,8 +85,12 @@ class BaseProvider(ABC):
         messages: list[ChatMessage],
         model: str,
         system_prompt: str | None = None,
-    ) -> AsyncGenerator[str, None]:
-        """Stream a chat completion response."""
+    ) -> AsyncGenerator[str | ChatResponse, None]:
+        """Stream a chat completion response.
+
+        Yields text deltas as they arrive, then a final ChatResponse holding
+        the assembled content and the token usage reported by the SDK.
+        """
         pass
 
     @abstractmethod
@@ -0,0 +1,199 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import AsyncGenerator
+
+from app.providers.base import DEFAULT_MAX_OUTPUT_TOKENS, BaseProvider, ChatMessage, ChatResponse, ModelInfo
+from app.config import get_settings
+
+
+def cache_key(
+    provider: str,
+    model: str,
+    system_prompt: str | None,
+    messages: list[ChatMessage],
+    params: dict,
+) -> str:
+    """Content address of a request: identical inputs map to the same reply."""
+    payload = json.dumps(
+        [provider, model, system_prompt, [[m.role, m.content] for m in messages], params],
+        ensure_ascii=False,
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DiskTier:
+    """SQLite-backed tier with least-recently-accessed eviction by total size."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, payload BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses (accessed)")
+        self._conn.commit()
+        self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, payload: bytes) -> None:
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time()),
+            )
+            self.total_bytes += len(payload) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+            self._conn.commit()
+
+    def _evict(self, target: int) -> None:
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Two-tier memo of provider replies: an in-memory LRU in front of a
+    size-bounded SQLite file."""
+
+    def __init__(self, memory_entries: int, path: str | None, max_bytes: int):
+        self.memory_entries = memory_entries
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self.disk = DiskTier(path, max_bytes) if path else None
+
+    def _remember(self, key: str, value: dict) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> dict | None:
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            return value
+        if self.disk is None:
+            return None
+        payload = await asyncio.to_thread(self.disk.get, key)
+        if payload is None:
+            return None
+        value = json.loads(payload)
+        self._remember(key, value)
+        return value
+
+    async def put(self, key: str, value: dict) -> None:
+        self._remember(key, value)
+        if self.disk is not None:
+            payload = json.dumps(value, ensure_ascii=False).encode()
+            await asyncio.to_thread(self.disk.put, key, payload)
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+
+@lru_cache
+def get_response_cache() -> ResponseCache:
+    settings = get_settings()
+    return ResponseCache(
+        memory_entries=settings.response_cache_memory_entries,
+        path=settings.response_cache_path or None,
+        max_bytes=settings.response_cache_max_bytes,
+    )
+
+
+def _from_cache(value: dict) -> ChatResponse:
+    response = ChatResponse(**value)
+    response.raw_response = {**(response.raw_response or {}), "cache_hit": True}
+    response.cached = True
+    # No provider call was made, so a replayed reply spends nothing
+    response.input_tokens = response.output_tokens = 0
+    response.cache_read_input_tokens = response.cache_creation_input_tokens = None
+    return response
+
+
+class CachedProvider(BaseProvider):
+    """Memoizes a provider's replies by request content.
+
+    Sits outside the rate limiter, so a hit costs neither a provider call nor
+    rate-limit budget.
+    """
+
+    def __init__(self, inner: BaseProvider, cache: ResponseCache, max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS):
+        self.inner = inner
+        self.cache = cache
+        self.max_output_tokens = max_output_tokens
+        self.name = inner.name
+        self.api_key = getattr(inner, "api_key", None)
+
+    def _key(self, messages: list[ChatMessage], model: str, system_prompt: str | None) -> str:
+        return cache_key(self.name, model, system_prompt, messages, {"max_tokens": self.max_output_tokens})
+
+    def get_available_models(self) -> list[ModelInfo]:
+        return self.inner.get_available_models()
+
+    async def chat(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        system_prompt: str | None = None,
+    ) -> ChatResponse:
+        key = self._key(messages, model, system_prompt)
+        value = await self.cache.get(key)
+        if value is not None:
+            return _from_cache(value)
+        response = await self.inner.chat(messages, model, system_prompt)
+        await self.cache.put(key, dataclasses.asdict(response))
+        return response
+
+    async def stream_chat(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        system_prompt: str | None = None,
+    ) -> AsyncGenerator[str | ChatResponse, None]:
+        key = self._key(messages, model, system_prompt)
+        value = await self.cache.get(key)
+        if value is not None:
+            response = _from_cache(value)
+            if response.content:
+                yield response.content
+            yield response
+            return
+        async for item in self.inner.stream_chat(messages, model, system_prompt):
+            if isinstance(item, ChatResponse):
+                await self.cache.put(key, dataclasses.asdict(item))
+            yield item
+
+    def is_configured(self) -> bool:
+        return self.inner.is_configured()
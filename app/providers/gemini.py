@@ -1,50 +1,60 @@
 from typing import AsyncGenerator
-from google import genai
-from google.genai import types
 from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse
+from app.providers.pool import client_pool
 from app.config import get_settings
 
 
 class GeminiProvider(BaseProvider):
     """Google Gemini provider using the new google-genai SDK."""
 
+    name = "gemini"
+    MODELS = [
+        ModelInfo(
+            id="gemini-2.5-flash",
+            name="Gemini 2.5 Flash",
+            provider="gemini",
+            description="Fastest, aligned",
+            context_window=1048576,
+        ),
+        ModelInfo(
+            id="gemini-2.5-pro",
+            name="Gemini 2.5 Pro",
+            provider="gemini",
+            description="Most capable, aligned",
+            context_window=1048576,
+        ),
+        ModelInfo(
+            id="gemini-1.5-pro",
+            name="Gemini 1.5 Pro",
+            provider="gemini",
+            description="1M context, aligned",
+            context_window=1048576,
+        ),
+        ModelInfo(
+            id="gemini-1.5-flash",
+            name="Gemini 1.5 Flash",
+            provider="gemini",
+            description="Fast, aligned",
+            context_window=1048576,
+        ),
+    ]
+
     def __init__(self, api_key: str | None = None):
         settings = get_settings()
         self.api_key = api_key or settings.gemini_api_key
-        if self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
-            self.configured = True
-        else:
-            self.client = None
-            self.configured = False
+        self.configured = bool(self.api_key)
+
+    def _create_client(self):
+        from google import genai
+
+        return genai.Client(api_key=self.api_key)
+
+    def _lease(self):
+        # Borrowed per call, so an evicted client is only closed once no call is using it
+        return client_pool.lease("gemini", self.api_key, self._create_client)
 
     def get_available_models(self) -> list[ModelInfo]:
-        return [
-            ModelInfo(
-                id="gemini-2.5-flash",
-                name="Gemini 2.5 Flash",
-                provider="gemini",
-                description="Fastest, aligned",
-            ),
-            ModelInfo(
-                id="gemini-2.5-pro",
-                name="Gemini 2.5 Pro",
-                provider="gemini",
-                description="Most capable, aligned",
-            ),
-            ModelInfo(
-                id="gemini-1.5-pro",
-                name="Gemini 1.5 Pro",
-                provider="gemini",
-                description="1M context, aligned",
-            ),
-            ModelInfo(
-                id="gemini-1.5-flash",
-                name="Gemini 1.5 Flash",
-                provider="gemini",
-                description="Fast, aligned",
-            ),
-        ]
+        return self.MODELS
 
     async def chat(
         self,
@@ -52,9 +62,11 @@ class GeminiProvider(BaseProvider):
         model: str,
         system_prompt: str | None = None,
     ) -> ChatResponse:
-        if not self.client:
+        if not self.api_key:
             raise ValueError("Gemini API key not configured")
 
+        from google.genai import types
+
         # Build contents list for Gemini format
         contents = []
         for msg in messages:
@@ -63,15 +75,16 @@ class GeminiProvider(BaseProvider):
 
         # Build config
         config = types.GenerateContentConfig(
-            max_output_tokens=4096,
+            max_output_tokens=self.output_budget(model),
             system_instruction=system_prompt if system_prompt else None,
         )
 
-        response = await self.client.aio.models.generate_content(
-            model=model,
-            contents=contents,
-            config=config,
-        )
+        async with self._lease() as client:
+            response = await client.aio.models.generate_content(
+                model=model,
+                contents=contents,
+                config=config,
+            )
 
         # Extract token counts if available
         input_tokens = None
@@ -93,27 +106,46 @@ class GeminiProvider(BaseProvider):
         messages: list[ChatMessage],
         model: str,
         system_prompt: str | None = None,
-    ) -> AsyncGenerator[str, None]:
-        if not self.client:
+    ) -> AsyncGenerator[str | ChatResponse, None]:
+        if not self.api_key:
             raise ValueError("Gemini API key not configured")
 
+        from google.genai import types
+
         contents = []
         for msg in messages:
             role = "user" if msg.role == "user" else "model"
             contents.append(types.Content(role=role, parts=[types.Part(text=msg.content)]))
 
         config = types.GenerateContentConfig(
-            max_output_tokens=4096,
+            max_output_tokens=self.output_budget(model),
             system_instruction=system_prompt if system_prompt else None,
         )
 
-        async for chunk in self.client.aio.models.generate_content_stream(
+        parts = []
+        usage_metadata = None
+        async with self._lease() as client:
+            # The call is a coroutine that resolves to the chunk iterator
+            async for chunk in await client.aio.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=config,
+            ):
+                # Each chunk carries cumulative usage; keep the latest
+                if getattr(chunk, 'usage_metadata', None):
+                    usage_metadata = chunk.usage_metadata
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+
+        content = "".join(parts)
+        yield ChatResponse(
+            content=content,
             model=model,
-            contents=contents,
-            config=config,
-        ):
-            if chunk.text:
-                yield chunk.text
+            raw_response={"text": content},
+            input_tokens=getattr(usage_metadata, 'prompt_token_count', None),
+            output_tokens=getattr(usage_metadata, 'candidates_token_count', None),
+        )
 
     def is_configured(self) -> bool:
         return self.configured
@@ -1,52 +1,65 @@
 from typing import AsyncGenerator
-from groq import AsyncGroq
-from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse
+from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse, usage_value
+from app.providers.pool import client_pool
 from app.config import get_settings
 
 
 class GroqProvider(BaseProvider):
+    name = "groq"
+    MODELS = [
+        ModelInfo(
+            id="openai/gpt-oss-120b",
+            name="GPT-OSS 120B",
+            provider="groq",
+            description="Large reasoning model, less filtered",
+            context_window=131072,
+        ),
+        ModelInfo(
+            id="meta-llama/llama-4-scout",
+            name="Llama 4 Scout",
+            provider="groq",
+            description="Newest Llama, less filtered",
+            context_window=131072,
+        ),
+        ModelInfo(
+            id="llama-3.3-70b-versatile",
+            name="Llama 3.3 70B",
+            provider="groq",
+            description="Versatile, less filtered",
+            context_window=131072,
+        ),
+        ModelInfo(
+            id="qwen-3-32b",
+            name="Qwen 3 32B",
+            provider="groq",
+            description="Multilingual, less filtered",
+            context_window=131072,
+        ),
+        ModelInfo(
+            id="openai/gpt-oss-20b",
+            name="GPT-OSS 20B",
+            provider="groq",
+            description="Compact reasoning, less filtered",
+            context_window=131072,
+        ),
+    ]
+
     def __init__(self, api_key: str | None = None):
         settings = get_settings()
         # User-provided key takes precedence over env var
         self.api_key = api_key or settings.groq_api_key
-        if self.api_key:
-            self.client = AsyncGroq(api_key=self.api_key)
-        else:
-            self.client = None
+
+    def _create_client(self):
+        from groq import AsyncGroq
+
+        return AsyncGroq(api_key=self.api_key, max_retries=0)
+
+    def _lease(self):
+        # Borrowed per call, so an evicted client is only closed once no call is using it
+        return client_pool.lease("groq", self.api_key, self._create_client)
 
     def get_available_models(self) -> list[ModelInfo]:
-        return [
-            ModelInfo(
-                id="openai/gpt-oss-120b",
-                name="GPT-OSS 120B",
-                provider="groq",
-                description="Large reasoning model, less filtered",
-            ),
-            ModelInfo(
-                id="meta-llama/llama-4-scout",
-                name="Llama 4 Scout",
-                provider="groq",
-                description="Newest Llama, less filtered",
-            ),
-            ModelInfo(
-                id="llama-3.3-70b-versatile",
-                name="Llama 3.3 70B",
-                provider="groq",
-                description="Versatile, less filtered",
-            ),
-            ModelInfo(
-                id="qwen-3-32b",
-                name="Qwen 3 32B",
-                provider="groq",
-                description="Multilingual, less filtered",
-            ),
-            ModelInfo(
-                id="openai/gpt-oss-20b",
-                name="GPT-OSS 20B",
-                provider="groq",
-                description="Compact reasoning, less filtered",
-            ),
-        ]
+        return self.MODELS
 
     async def chat(
         self,
@@ -54,7 +67,7 @@ class GroqProvider(BaseProvider):
         model: str,
         system_prompt: str | None = None,
     ) -> ChatResponse:
-        if not self.client:
+        if not self.api_key:
             raise ValueError("Groq API key not configured")
 
         api_messages = []
@@ -62,11 +75,12 @@ class GroqProvider(BaseProvider):
             api_messages.append({"role": "system", "content": system_prompt})
         api_messages.extend([{"role": m.role, "content": m.content} for m in messages])
 
-        response = await self.client.chat.completions.create(
-            model=model,
-            messages=api_messages,
-            max_tokens=4096,
-        )
+        async with self._lease() as client:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=api_messages,
+                max_tokens=self.output_budget(model),
+            )
 
         return ChatResponse(
             content=response.choices[0].message.content,
@@ -81,8 +95,8 @@ class GroqProvider(BaseProvider):
         messages: list[ChatMessage],
         model: str,
         system_prompt: str | None = None,
-    ) -> AsyncGenerator[str, None]:
-        if not self.client:
+    ) -> AsyncGenerator[str | ChatResponse, None]:
+        if not self.api_key:
             raise ValueError("Groq API key not configured")
 
         api_messages = []
@@ -90,16 +104,39 @@ class GroqProvider(BaseProvider):
             api_messages.append({"role": "system", "content": system_prompt})
         api_messages.extend([{"role": m.role, "content": m.content} for m in messages])
 
-        stream = await self.client.chat.completions.create(
+        async with self._lease() as client:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=api_messages,
+                max_tokens=self.output_budget(model),
+                stream=True,
+            )
+
+            parts = []
+            usage = None
+            finish_reason = None
+            response_id = None
+            async with stream:
+                async for chunk in stream:
+                    response_id = chunk.id
+                    # Groq reports usage on the final chunk under x_groq
+                    if chunk.x_groq:
+                        usage = chunk.x_groq.usage
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    if choice.delta.content:
+                        parts.append(choice.delta.content)
+                        yield choice.delta.content
+
+        yield ChatResponse(
+            content="".join(parts),
             model=model,
-            messages=api_messages,
-            max_tokens=4096,
-            stream=True,
+            raw_response={"id": response_id, "finish_reason": finish_reason, "streamed": True},
+            input_tokens=usage_value(usage, "prompt_tokens"),
+            output_tokens=usage_value(usage, "completion_tokens"),
         )
 
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
-
     def is_configured(self) -> bool:
         return bool(self.api_key)
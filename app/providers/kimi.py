@@ -1,44 +1,52 @@
 from typing import AsyncGenerator
-from openai import AsyncOpenAI
-from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse
+from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse, usage_value
+from app.providers.pool import client_pool
 from app.config import get_settings
 
 
 class KimiProvider(BaseProvider):
     """Kimi (Moonshot AI) provider - uses OpenAI-compatible API."""
 
+    name = "kimi"
+    MODELS = [
+        ModelInfo(
+            id="moonshot-v1-128k",
+            name="Moonshot v1 128K",
+            provider="kimi",
+            description="128K context, best for long documents",
+            context_window=131072,
+        ),
+        ModelInfo(
+            id="moonshot-v1-32k",
+            name="Moonshot v1 32K",
+            provider="kimi",
+            description="32K context, balanced",
+            context_window=32768,
+        ),
+        ModelInfo(
+            id="moonshot-v1-8k",
+            name="Moonshot v1 8K",
+            provider="kimi",
+            description="8K context, fastest",
+            context_window=8192,
+        ),
+    ]
+
     def __init__(self, api_key: str | None = None):
         settings = get_settings()
         self.api_key = api_key or settings.kimi_api_key
-        if self.api_key:
-            self.client = AsyncOpenAI(
-                api_key=self.api_key,
-                base_url="https://api.moonshot.cn/v1"
-            )
-        else:
-            self.client = None
+
+    def _create_client(self):
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=self.api_key, base_url="https://api.moonshot.cn/v1", max_retries=0)
+
+    def _lease(self):
+        # Borrowed per call, so an evicted client is only closed once no call is using it
+        return client_pool.lease("kimi", self.api_key, self._create_client)
 
     def get_available_models(self) -> list[ModelInfo]:
-        return [
-            ModelInfo(
-                id="moonshot-v1-128k",
-                name="Moonshot v1 128K",
-                provider="kimi",
-                description="128K context, best for long documents",
-            ),
-            ModelInfo(
-                id="moonshot-v1-32k",
-                name="Moonshot v1 32K",
-                provider="kimi",
-                description="32K context, balanced",
-            ),
-            ModelInfo(
-                id="moonshot-v1-8k",
-                name="Moonshot v1 8K",
-                provider="kimi",
-                description="8K context, fastest",
-            ),
-        ]
+        return self.MODELS
 
     async def chat(
         self,
@@ -46,7 +54,7 @@ class KimiProvider(BaseProvider):
         model: str,
         system_prompt: str | None = None,
     ) -> ChatResponse:
-        if not self.client:
+        if not self.api_key:
             raise ValueError("Kimi API key not configured")
 
         api_messages = []
@@ -54,11 +62,12 @@ class KimiProvider(BaseProvider):
             api_messages.append({"role": "system", "content": system_prompt})
         api_messages.extend([{"role": m.role, "content": m.content} for m in messages])
 
-        response = await self.client.chat.completions.create(
-            model=model,
-            messages=api_messages,
-            max_tokens=4096,
-        )
+        async with self._lease() as client:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=api_messages,
+                max_tokens=self.output_budget(model),
+            )
 
         return ChatResponse(
             content=response.choices[0].message.content,
@@ -73,8 +82,8 @@ class KimiProvider(BaseProvider):
         messages: list[ChatMessage],
         model: str,
         system_prompt: str | None = None,
-    ) -> AsyncGenerator[str, None]:
-        if not self.client:
+    ) -> AsyncGenerator[str | ChatResponse, None]:
+        if not self.api_key:
             raise ValueError("Kimi API key not configured")
 
         api_messages = []
@@ -82,16 +91,38 @@ class KimiProvider(BaseProvider):
             api_messages.append({"role": "system", "content": system_prompt})
         api_messages.extend([{"role": m.role, "content": m.content} for m in messages])
 
-        stream = await self.client.chat.completions.create(
+        async with self._lease() as client:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=api_messages,
+                max_tokens=self.output_budget(model),
+                stream=True,
+            )
+
+            parts = []
+            usage = None
+            finish_reason = None
+            response_id = None
+            async with stream:
+                async for chunk in stream:
+                    response_id = chunk.id
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    # Moonshot reports usage on the final choice rather than the chunk
+                    usage = getattr(choice, "usage", None) or usage
+                    finish_reason = choice.finish_reason or finish_reason
+                    if choice.delta.content:
+                        parts.append(choice.delta.content)
+                        yield choice.delta.content
+
+        yield ChatResponse(
+            content="".join(parts),
             model=model,
-            messages=api_messages,
-            max_tokens=4096,
-            stream=True,
+            raw_response={"id": response_id, "finish_reason": finish_reason, "streamed": True},
+            input_tokens=usage_value(usage, "prompt_tokens"),
+            output_tokens=usage_value(usage, "completion_tokens"),
         )
 
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
-
     def is_configured(self) -> bool:
         return bool(self.api_key)
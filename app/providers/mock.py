@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import random
+from typing import AsyncGenerator
+from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse, estimate_tokens
+from app.config import get_settings
+
+
+_WORDS = (
+    "the model argues that alignment depends on context and every claim deserves "
+    "scrutiny because language shapes reasoning while evidence remains partial so "
+    "we should weigh tradeoffs carefully consider counterexamples and revise beliefs "
+    "when better arguments appear although certainty is rare progress still happens"
+).split()
+
+
+class MockProviderError(Exception):
+    """Injected upstream failure."""
+
+    status_code = 500
+
+
+class MockRateLimitError(Exception):
+    """Injected 429, carrying the Retry-After the limiter should honor."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Mock rate limit, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class MockProvider(BaseProvider):
+    """Offline stand-in for load tests and benchmarks.
+
+    Latency, throughput, reply length and failures are drawn from an RNG seeded
+    by the configured seed and the request itself, so a given transcript gets
+    the same reply, timing and failures no matter how runs interleave.
+    """
+
+    name = "mock"
+    requires_api_key = False
+    MODELS = [
+        ModelInfo(
+            id="mock-fast",
+            name="Mock Fast",
+            provider="mock",
+            description="Local stand-in, low latency",
+            context_window=32768,
+        ),
+        ModelInfo(
+            id="mock-slow",
+            name="Mock Slow",
+            provider="mock",
+            description="Local stand-in, reasoning-model latency",
+            context_window=32768,
+        ),
+    ]
+
+    # (time-to-first-token multiplier, throughput multiplier) per model
+    PROFILES = {
+        "mock-fast": (1.0, 1.0),
+        "mock-slow": (8.0, 0.25),
+    }
+
+    def __init__(self, api_key: str | None = None):
+        self.api_key = api_key
+        self.settings = get_settings()
+        # Last request seen and how many times in a row, so a retry draws a
+        # fresh outcome. A provider is built per run, so replaying a
+        # transcript in a new run starts again from the first attempt.
+        self._last_key: str | None = None
+        self._attempt = 0
+
+    def get_available_models(self) -> list[ModelInfo]:
+        return self.MODELS
+
+    def _rng(self, messages: list[ChatMessage], model: str, system_prompt: str | None) -> random.Random:
+        digest = hashlib.sha256()
+        for part in (str(self.settings.mock_seed), model, system_prompt or ""):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        for m in messages:
+            digest.update(f"{m.role}:{m.content}".encode())
+            digest.update(b"\0")
+        key = digest.hexdigest()
+        self._attempt = self._attempt + 1 if key == self._last_key else 0
+        self._last_key = key
+        return random.Random(f"{key}:{self._attempt}")
+
+    def _plan(self, messages: list[ChatMessage], model: str, system_prompt: str | None):
+        """Draw this call's outcome: (ttft seconds, seconds per token, reply words)."""
+        s = self.settings
+        rng = self._rng(messages, model, system_prompt)
+
+        roll = rng.random()
+        if roll < s.mock_rate_limit_rate:
+            raise MockRateLimitError(s.mock_retry_after_seconds)
+        if roll < s.mock_rate_limit_rate + s.mock_error_rate:
+            raise MockProviderError("Mock provider injected failure")
+
+        ttft_scale, tps_scale = self.PROFILES.get(model, (1.0, 1.0))
+        ttft = s.mock_ttft_ms / 1000 * ttft_scale
+        per_token = 1 / max(s.mock_tokens_per_second * tps_scale, 1e-6)
+        length = max(1, int(rng.gauss(s.mock_reply_tokens_mean, s.mock_reply_tokens_stddev)))
+        words = [rng.choice(_WORDS) for _ in range(length)]
+        return ttft, per_token, words
+
+    def _response(self, messages, model, system_prompt, content, output_tokens) -> ChatResponse:
+        input_tokens = estimate_tokens(system_prompt) + sum(estimate_tokens(m.content) for m in messages)
+        return ChatResponse(
+            content=content,
+            model=model,
+            raw_response={"mock": True, "seed": self.settings.mock_seed},
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+        )
+
+    async def chat(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        system_prompt: str | None = None,
+    ) -> ChatResponse:
+        ttft, per_token, words = self._plan(messages, model, system_prompt)
+        await asyncio.sleep(ttft + per_token * len(words))
+        return self._response(messages, model, system_prompt, " ".join(words), len(words))
+
+    async def stream_chat(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        system_prompt: str | None = None,
+    ) -> AsyncGenerator[str | ChatResponse, None]:
+        ttft, per_token, words = self._plan(messages, model, system_prompt)
+        await asyncio.sleep(ttft)
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(per_token)
+            yield word if i == 0 else f" {word}"
+        yield self._response(messages, model, system_prompt, " ".join(words), len(words))
+
+    def is_configured(self) -> bool:
+        return self.settings.mock_provider_enabled
@@ -1,46 +1,58 @@
 from typing import AsyncGenerator
-from openai import AsyncOpenAI
-from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse
+from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse, usage_value
+from app.providers.pool import client_pool
 from app.config import get_settings
 
 
 class OpenAIProvider(BaseProvider):
+    name = "openai"
+    MODELS = [
+        ModelInfo(
+            id="gpt-4o",
+            name="GPT-4o",
+            provider="openai",
+            description="Capable, aligned",
+            context_window=128000,
+        ),
+        ModelInfo(
+            id="gpt-4o-mini",
+            name="GPT-4o Mini",
+            provider="openai",
+            description="Fast, aligned",
+            context_window=128000,
+        ),
+        ModelInfo(
+            id="o1",
+            name="o1",
+            provider="openai",
+            description="Advanced reasoning, aligned",
+            context_window=200000,
+        ),
+        ModelInfo(
+            id="o1-mini",
+            name="o1 Mini",
+            provider="openai",
+            description="Fast reasoning, aligned",
+            context_window=128000,
+        ),
+    ]
+
     def __init__(self, api_key: str | None = None):
         settings = get_settings()
         # User-provided key takes precedence over env var
         self.api_key = api_key or settings.openai_api_key
-        if self.api_key:
-            self.client = AsyncOpenAI(api_key=self.api_key)
-        else:
-            self.client = None
+
+    def _create_client(self):
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=self.api_key, max_retries=0)
+
+    def _lease(self):
+        # Borrowed per call, so an evicted client is only closed once no call is using it
+        return client_pool.lease("openai", self.api_key, self._create_client)
 
     def get_available_models(self) -> list[ModelInfo]:
-        return [
-            ModelInfo(
-                id="gpt-4o",
-                name="GPT-4o",
-                provider="openai",
-                description="Capable, aligned",
-            ),
-            ModelInfo(
-                id="gpt-4o-mini",
-                name="GPT-4o Mini",
-                provider="openai",
-                description="Fast, aligned",
-            ),
-            ModelInfo(
-                id="o1",
-                name="o1",
-                provider="openai",
-                description="Advanced reasoning, aligned",
-            ),
-            ModelInfo(
-                id="o1-mini",
-                name="o1 Mini",
-                provider="openai",
-                description="Fast reasoning, aligned",
-            ),
-        ]
+        return self.MODELS
 
     async def chat(
         self,
@@ -48,7 +60,7 @@ class OpenAIProvider(BaseProvider):
         model: str,
         system_prompt: str | None = None,
     ) -> ChatResponse:
-        if not self.client:
+        if not self.api_key:
             raise ValueError("OpenAI API key not configured")
 
         api_messages = []
@@ -56,11 +68,12 @@ class OpenAIProvider(BaseProvider):
             api_messages.append({"role": "system", "content": system_prompt})
         api_messages.extend([{"role": m.role, "content": m.content} for m in messages])
 
-        response = await self.client.chat.completions.create(
-            model=model,
-            messages=api_messages,
-            max_tokens=4096,
-        )
+        async with self._lease() as client:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=api_messages,
+                max_tokens=self.output_budget(model),
+            )
 
         return ChatResponse(
             content=response.choices[0].message.content,
@@ -75,8 +88,8 @@ class OpenAIProvider(BaseProvider):
         messages: list[ChatMessage],
         model: str,
         system_prompt: str | None = None,
-    ) -> AsyncGenerator[str, None]:
-        if not self.client:
+    ) -> AsyncGenerator[str | ChatResponse, None]:
+        if not self.api_key:
             raise ValueError("OpenAI API key not configured")
 
         api_messages = []
@@ -84,16 +97,40 @@ class OpenAIProvider(BaseProvider):
             api_messages.append({"role": "system", "content": system_prompt})
         api_messages.extend([{"role": m.role, "content": m.content} for m in messages])
 
-        stream = await self.client.chat.completions.create(
+        async with self._lease() as client:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=api_messages,
+                max_tokens=self.output_budget(model),
+                stream=True,
+                extra_body={"stream_options": {"include_usage": True}},
+            )
+
+            parts = []
+            usage = None
+            finish_reason = None
+            response_id = None
+            # Leaving the block closes the HTTP stream, also when the run is cancelled mid-reply
+            async with stream:
+                async for chunk in stream:
+                    response_id = chunk.id
+                    # Usage arrives on a final chunk with no choices
+                    usage = getattr(chunk, "usage", None) or usage
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    if choice.delta.content:
+                        parts.append(choice.delta.content)
+                        yield choice.delta.content
+
+        yield ChatResponse(
+            content="".join(parts),
             model=model,
-            messages=api_messages,
-            max_tokens=4096,
-            stream=True,
+            raw_response={"id": response_id, "finish_reason": finish_reason, "streamed": True},
+            input_tokens=usage_value(usage, "prompt_tokens"),
+            output_tokens=usage_value(usage, "completion_tokens"),
         )
 
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
-
     def is_configured(self) -> bool:
         return bool(self.api_key)
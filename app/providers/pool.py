@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import inspect
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable
+
+from app.config import get_settings
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Stable, non-reversible identifier for an API key."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+async def _close_client(client: Any) -> None:
+    """Close an SDK client, whichever close hook its SDK version exposes."""
+    for target in (client, getattr(client, "aio", None)):
+        if target is None:
+            continue
+        for name in ("close", "aclose"):
+            close = getattr(target, name, None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                pass
+            return
+
+
+@dataclass(eq=False)
+class _Entry:
+    client: Any
+    last_used: float
+    leases: int = 0  # Calls currently using the client
+    evicted: bool = False
+
+
+class ClientPool:
+    """Process-wide pool of SDK clients keyed by (provider, key fingerprint).
+
+    Reusing a client keeps its HTTP connection pool and TLS sessions warm across
+    requests. Entries are evicted least-recently-used once the pool is full, and
+    after sitting idle for longer than the TTL. Callers lease a client for the
+    length of one call; an evicted client is closed once its last lease ends,
+    so a long-running call never has its client closed under it.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clients: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        # Evicted entries still leased by a call
+        self._draining: set[_Entry] = set()
+        self._closing: set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def lease(self, provider: str, api_key: str, factory: Callable[[], Any]) -> AsyncIterator[Any]:
+        """Hold the pooled client for this provider/key, creating it if needed."""
+        entry = self._checkout(provider, api_key, factory)
+        try:
+            yield entry.client
+        finally:
+            self._release(entry)
+
+    def _checkout(self, provider: str, api_key: str, factory: Callable[[], Any]) -> _Entry:
+        key = (provider, key_fingerprint(api_key))
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        entry = self._clients.pop(key, None) or _Entry(factory(), now)
+        entry.last_used = now
+        entry.leases += 1
+        self._clients[key] = entry
+
+        while len(self._clients) > self.max_size:
+            _, evicted = self._clients.popitem(last=False)
+            self._evict(evicted)
+        return entry
+
+    def _release(self, entry: _Entry) -> None:
+        entry.leases -= 1
+        entry.last_used = time.monotonic()
+        if entry.evicted and entry.leases == 0:
+            self._draining.discard(entry)
+            self._schedule_close(entry.client)
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def _evict_expired(self, now: float) -> None:
+        while self._clients:
+            key, entry = next(iter(self._clients.items()))
+            if now - entry.last_used <= self.ttl_seconds:
+                break
+            del self._clients[key]
+            self._evict(entry)
+
+    def _evict(self, entry: _Entry) -> None:
+        entry.evicted = True
+        if entry.leases:
+            self._draining.add(entry)
+        else:
+            self._schedule_close(entry.client)
+
+    def _schedule_close(self, client: Any) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop to close on; the SDK's own finalizers will clean up.
+            return
+        task = loop.create_task(_close_client(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def aclose(self) -> None:
+        """Close every pooled client. Called on application shutdown."""
+        clients = [entry.client for entry in (*self._clients.values(), *self._draining)]
+        self._clients.clear()
+        self._draining.clear()
+        await asyncio.gather(*self._closing, return_exceptions=True)
+        await asyncio.gather(*(_close_client(client) for client in clients))
+
+
+_settings = get_settings()
+client_pool = ClientPool(
+    max_size=_settings.client_pool_max_size,
+    ttl_seconds=_settings.client_pool_ttl_seconds,
+)
@@ -0,0 +1,302 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import AsyncGenerator, Awaitable, Callable, TypeVar
+
+from app.providers.base import (
+    DEFAULT_MAX_OUTPUT_TOKENS, BaseProvider, ChatMessage, ChatResponse, ModelInfo, estimate_tokens,
+)
+from app.providers.pool import key_fingerprint
+from app.config import get_settings
+
+T = TypeVar("T")
+
+# Rate limits, overload and transient upstream failures are worth retrying
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+def _status_code(exc: Exception) -> int | None:
+    for attr in ("status_code", "code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    if _status_code(exc) in RETRYABLE_STATUS:
+        return True
+    # SDK wrappers for dropped connections and timeouts
+    return any(cls.__name__ == "APIConnectionError" for cls in type(exc).__mro__)
+
+
+def retry_after(exc: Exception) -> float | None:
+    """Seconds the provider asked us to wait, from the exception or its response headers."""
+    value = getattr(exc, "retry_after", None)
+    if value is not None:
+        return float(value)
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    header = headers.get("retry-after")
+    if not header:
+        return None
+    try:
+        return float(header)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(header).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Continuously refilling bucket sized to one minute of allowance."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        # A single request larger than a minute's allowance would never fit
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ProviderLimiter:
+    """Outbound pacing for one provider key.
+
+    Combines a requests-per-minute and a tokens-per-minute bucket with a cap on
+    in-flight calls, and retries retryable failures with jittered exponential
+    backoff. A 429 pauses every caller sharing the key until Retry-After has
+    elapsed, instead of letting each one trip the limit on its own.
+    """
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        concurrency: int = 4,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.semaphore = asyncio.Semaphore(max(concurrency, 1))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.paused_until = 0.0
+        self.active = 0  # Calls waiting on or inside the limiter
+        self.last_used = time.monotonic()
+
+    async def _wait_out_pause(self) -> None:
+        # Another caller's 429 can extend the pause while this one sleeps
+        while (delay := self.paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    async def _admit(self, tokens: int) -> None:
+        await self._wait_out_pause()
+        if self.requests:
+            await self.requests.acquire()
+        if self.tokens:
+            await self.tokens.acquire(tokens)
+        # ...or start one while this caller waited for budget
+        await self._wait_out_pause()
+
+    def settle(self, reserved: int, used: int | None) -> None:
+        """Return over-reserved tokens once the real usage is known."""
+        if self.tokens and used is not None and used < reserved:
+            self.tokens.refund(reserved - used)
+
+    def _release(self, reserved: int) -> None:
+        """Return the whole reservation of an attempt the provider did not serve."""
+        if self.tokens and reserved:
+            self.tokens.refund(reserved)
+
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        delay = retry_after(exc)
+        if delay is None:
+            # Full jitter keeps concurrent retries from synchronizing
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        # A bogus or huge Retry-After must not stall every caller on the key
+        delay = min(delay, self.backoff_max)
+        if _status_code(exc) == 429:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        return delay
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        self.active += 1
+        try:
+            attempt = 0
+            while True:
+                await self._admit(tokens)
+                try:
+                    async with self.semaphore:
+                        return await call()
+                except Exception as e:
+                    self._release(tokens)
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise
+                    await asyncio.sleep(self._backoff(attempt, e))
+                    attempt += 1
+        finally:
+            self.active -= 1
+            self.last_used = time.monotonic()
+
+    async def stream(
+        self,
+        call: Callable[[], AsyncGenerator[T, None]],
+        tokens: int = 0,
+    ) -> AsyncGenerator[T, None]:
+        """Like run(), but only retries while nothing has been yielded yet."""
+        self.active += 1
+        try:
+            attempt = 0
+            while True:
+                await self._admit(tokens)
+                started = False
+                try:
+                    async with self.semaphore:
+                        async for item in call():
+                            started = True
+                            yield item
+                    return
+                except Exception as e:
+                    if started:
+                        # Part of the reply was generated, so the reservation stands
+                        raise
+                    self._release(tokens)
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise
+                    await asyncio.sleep(self._backoff(attempt, e))
+                    attempt += 1
+        finally:
+            self.active -= 1
+            self.last_used = time.monotonic()
+
+
+# (provider, key fingerprint) -> limiter, least recently fetched first.
+# Bounded like the client pool, since user keys arrive in request headers.
+_limiters: OrderedDict[tuple[str, str], ProviderLimiter] = OrderedDict()
+
+
+def _evict_limiters(now: float) -> None:
+    """Drop limiters idle past the TTL, then the least recently used ones over
+    the size cap. A limiter with calls in flight is always kept."""
+    settings = get_settings()
+    for key, limiter in list(_limiters.items()):
+        if limiter.active:
+            continue
+        if len(_limiters) > settings.client_pool_max_size or now - limiter.last_used > settings.client_pool_ttl_seconds:
+            del _limiters[key]
+
+
+def get_limiter(provider: str, api_key: str | None) -> ProviderLimiter:
+    """Shared limiter for a provider key; every run using the key draws from it."""
+    key = (provider, key_fingerprint(api_key or ""))
+    limiter = _limiters.pop(key, None)
+    if limiter is None:
+        settings = get_settings()
+        limiter = ProviderLimiter(
+            rpm=settings.rate_limit_rpm.get(provider, 0),
+            tpm=settings.rate_limit_tpm.get(provider, 0),
+            concurrency=settings.rate_limit_concurrency,
+            max_retries=settings.rate_limit_max_retries,
+            backoff_base=settings.rate_limit_backoff_base,
+            backoff_max=settings.rate_limit_backoff_max,
+        )
+    limiter.last_used = time.monotonic()
+    _limiters[key] = limiter
+    _evict_limiters(limiter.last_used)
+    return limiter
+
+
+class RateLimitedProvider(BaseProvider):
+    """Routes a provider's calls through its key's limiter.
+
+    Provider clients are built with SDK-level retries disabled, so the limiter
+    is the single place retry policy lives.
+    """
+
+    def __init__(self, inner: BaseProvider, limiter: ProviderLimiter, max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS):
+        self.inner = inner
+        self.limiter = limiter
+        self.max_output_tokens = max_output_tokens
+        self.name = inner.name
+        self.api_key = getattr(inner, "api_key", None)
+
+    def _reserve(self, messages: list[ChatMessage], system_prompt: str | None) -> int:
+        # Providers count the requested reply budget against TPM up front
+        prompt = estimate_tokens(system_prompt) + sum(estimate_tokens(m.content) for m in messages)
+        return prompt + self.max_output_tokens
+
+    @staticmethod
+    def _used(response: ChatResponse) -> int | None:
+        if response.input_tokens is None and response.output_tokens is None:
+            return None
+        return (
+            (response.input_tokens or 0)
+            + (response.output_tokens or 0)
+            + (response.cache_read_input_tokens or 0)
+            + (response.cache_creation_input_tokens or 0)
+        )
+
+    def get_available_models(self) -> list[ModelInfo]:
+        return self.inner.get_available_models()
+
+    async def chat(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        system_prompt: str | None = None,
+    ) -> ChatResponse:
+        reserved = self._reserve(messages, system_prompt)
+        response = await self.limiter.run(
+            lambda: self.inner.chat(messages, model, system_prompt), tokens=reserved
+        )
+        self.limiter.settle(reserved, self._used(response))
+        return response
+
+    async def stream_chat(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        system_prompt: str | None = None,
+    ) -> AsyncGenerator[str | ChatResponse, None]:
+        reserved = self._reserve(messages, system_prompt)
+        async for item in self.limiter.stream(
+            lambda: self.inner.stream_chat(messages, model, system_prompt), tokens=reserved
+        ):
+            if isinstance(item, ChatResponse):
+                self.limiter.settle(reserved, self._used(item))
+            yield item
+
+    def is_configured(self) -> bool:
+        return self.inner.is_configured()
@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from typing import Mapping
+
+from app.providers.base import BaseProvider, ModelInfo
+from app.providers.anthropic import AnthropicProvider
+from app.providers.groq import GroqProvider
+from app.providers.openai import OpenAIProvider
+from app.providers.xai import XAIProvider
+from app.providers.kimi import KimiProvider
+from app.providers.gemini import GeminiProvider
+from app.providers.mock import MockProvider
+from app.providers.ratelimit import RateLimitedProvider, get_limiter
+from app.providers.cache import CachedProvider, get_response_cache
+from app.config import get_settings
+
+
+_provider_classes: list[type[BaseProvider]] = [
+    AnthropicProvider, GroqProvider, OpenAIProvider, XAIProvider,
+    KimiProvider, GeminiProvider,
+]
+if get_settings().mock_provider_enabled:
+    _provider_classes.append(MockProvider)
+
+# Display order for the models endpoints
+PROVIDERS: dict[str, type[BaseProvider]] = {cls.name: cls for cls in _provider_classes}
+
+# Request headers carrying user-provided keys
+PROVIDER_KEY_HEADERS = {
+    "anthropic": "X-Anthropic-Key",
+    "groq": "X-Groq-Key",
+    "openai": "X-OpenAI-Key",
+    "xai": "X-XAI-Key",
+    "kimi": "X-Kimi-Key",
+    "gemini": "X-Gemini-Key",
+}
+
+
+@dataclass(frozen=True)
+class ModelEntry:
+    info: ModelInfo
+    provider: str
+    provider_cls: type[BaseProvider]
+
+
+def _build_registry() -> dict[str, ModelEntry]:
+    registry = {}
+    for name, cls in PROVIDERS.items():
+        for info in cls.MODELS:
+            registry[info.id] = ModelEntry(info=info, provider=name, provider_cls=cls)
+    return registry
+
+
+MODEL_REGISTRY: dict[str, ModelEntry] = _build_registry()
+
+# Serialized catalog per provider, shared by every /api/models response
+PROVIDER_MODELS: dict[str, list[dict]] = {
+    name: [
+        {
+            "id": m.id,
+            "name": m.name,
+            "provider": name,
+            "description": m.description,
+            "context_window": m.context_window,
+            "max_output_tokens": m.max_output_tokens,
+        }
+        for m in cls.MODELS
+    ]
+    for name, cls in PROVIDERS.items()
+}
+
+
+def get_model(model_id: str) -> ModelEntry | None:
+    return MODEL_REGISTRY.get(model_id)
+
+
+def api_keys_from_headers(headers: Mapping[str, str]) -> dict[str, str | None]:
+    """Collect user-provided API keys, keyed by provider name."""
+    keys = {name: None for name in PROVIDERS}
+    keys.update({name: headers.get(header) for name, header in PROVIDER_KEY_HEADERS.items()})
+    return keys
+
+
+def is_configured(provider: str, api_key: str | None = None) -> bool:
+    """Whether a provider has a key, without constructing its client."""
+    cls = PROVIDERS.get(provider)
+    if cls is not None and not cls.requires_api_key:
+        return True
+    return bool(api_key or getattr(get_settings(), f"{provider}_api_key", ""))
+
+
+def get_provider(model_id: str, api_keys: Mapping[str, str | None] | None = None) -> BaseProvider:
+    """Construct the single provider that serves a model, with optional user-provided keys."""
+    entry = MODEL_REGISTRY.get(model_id)
+    if entry is None:
+        raise ValueError(f"Unknown model: {model_id}")
+    api_key = (api_keys or {}).get(entry.provider)
+    provider = entry.provider_cls(api_key=api_key)
+    provider = RateLimitedProvider(
+        provider,
+        get_limiter(entry.provider, provider.api_key),
+        max_output_tokens=entry.info.max_output_tokens,
+    )
+    if get_settings().response_cache_enabled:
+        provider = CachedProvider(
+            provider, get_response_cache(), max_output_tokens=entry.info.max_output_tokens
+        )
+    return provider
@@ -1,51 +1,60 @@
 from typing import AsyncGenerator
-from openai import AsyncOpenAI
-from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse
+from app.providers.base import BaseProvider, ModelInfo, ChatMessage, ChatResponse, usage_value
+from app.providers.pool import client_pool
 from app.config import get_settings
 
 
 class XAIProvider(BaseProvider):
     """xAI provider for Grok models - uses OpenAI-compatible API."""
 
+    name = "xai"
+    MODELS = [
+        ModelInfo(
+            id="grok-4-1-fast",
+            name="Grok 4.1 Fast",
+            provider="xai",
+            description="Newest, fast reasoning, less filtered",
+            context_window=2000000,
+        ),
+        ModelInfo(
+            id="grok-4",
+            name="Grok 4",
+            provider="xai",
+            description="Most capable, less filtered",
+            context_window=256000,
+        ),
+        ModelInfo(
+            id="grok-3",
+            name="Grok 3",
+            provider="xai",
+            description="Capable, less filtered",
+            context_window=131072,
+        ),
+        ModelInfo(
+            id="grok-2-1212",
+            name="Grok 2",
+            provider="xai",
+            description="Stable, less filtered",
+            context_window=131072,
+        ),
+    ]
+
     def __init__(self, api_key: str | None = None):
         settings = get_settings()
         # User-provided key takes precedence over env var
         self.api_key = api_key or settings.xai_api_key
-        if self.api_key:
-            self.client = AsyncOpenAI(
-                api_key=self.api_key,
-                base_url="https://api.x.ai/v1"
-            )
-        else:
-            self.client = None
+
+    def _create_client(self):
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=self.api_key, base_url="https://api.x.ai/v1", max_retries=0)
+
+    def _lease(self):
+        # Borrowed per call, so an evicted client is only closed once no call is using it
+        return client_pool.lease("xai", self.api_key, self._create_client)
 
     def get_available_models(self) -> list[ModelInfo]:
-        return [
-            ModelInfo(
-                id="grok-4-1-fast",
-                name="Grok 4.1 Fast",
-                provider="xai",
-                description="Newest, fast reasoning, less filtered",
-            ),
-            ModelInfo(
-                id="grok-4",
-                name="Grok 4",
-                provider="xai",
-                description="Most capable, less filtered",
-            ),
-            ModelInfo(
-                id="grok-3",
-                name="Grok 3",
-                provider="xai",
-                description="Capable, less filtered",
-            ),
-            ModelInfo(
-                id="grok-2-1212",
-                name="Grok 2",
-                provider="xai",
-                description="Stable, less filtered",
-            ),
-        ]
+        return self.MODELS
 
     async def chat(
         self,
@@ -53,7 +62,7 @@ class XAIProvider(BaseProvider):
         model: str,
         system_prompt: str | None = None,
     ) -> ChatResponse:
-        if not self.client:
+        if not self.api_key:
             raise ValueError("xAI API key not configured")
 
         api_messages = []
@@ -61,11 +70,12 @@ class XAIProvider(BaseProvider):
             api_messages.append({"role": "system", "content": system_prompt})
         api_messages.extend([{"role": m.role, "content": m.content} for m in messages])
 
-        response = await self.client.chat.completions.create(
-            model=model,
-            messages=api_messages,
-            max_tokens=4096,
-        )
+        async with self._lease() as client:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=api_messages,
+                max_tokens=self.output_budget(model),
+            )
 
         return ChatResponse(
             content=response.choices[0].message.content,
@@ -80,8 +90,8 @@ class XAIProvider(BaseProvider):
         messages: list[ChatMessage],
         model: str,
         system_prompt: str | None = None,
-    ) -> AsyncGenerator[str, None]:
-        if not self.client:
+    ) -> AsyncGenerator[str | ChatResponse, None]:
+        if not self.api_key:
             raise ValueError("xAI API key not configured")
 
         api_messages = []
@@ -89,16 +99,39 @@ class XAIProvider(BaseProvider):
             api_messages.append({"role": "system", "content": system_prompt})
         api_messages.extend([{"role": m.role, "content": m.content} for m in messages])
 
-        stream = await self.client.chat.completions.create(
+        async with self._lease() as client:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=api_messages,
+                max_tokens=self.output_budget(model),
+                stream=True,
+                extra_body={"stream_options": {"include_usage": True}},
+            )
+
+            parts = []
+            usage = None
+            finish_reason = None
+            response_id = None
+            async with stream:
+                async for chunk in stream:
+                    response_id = chunk.id
+                    # Usage arrives on a final chunk with no choices
+                    usage = getattr(chunk, "usage", None) or usage
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    if choice.delta.content:
+                        parts.append(choice.delta.content)
+                        yield choice.delta.content
+
+        yield ChatResponse(
+            content="".join(parts),
             model=model,
-            messages=api_messages,
-            max_tokens=4096,
-            stream=True,
+            raw_response={"id": response_id, "finish_reason": finish_reason, "streamed": True},
+            input_tokens=usage_value(usage, "prompt_tokens"),
+            output_tokens=usage_value(usage, "completion_tokens"),
         )
 
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
-
     def is_configured(self) -> bool:
         return bool(self.api_key)
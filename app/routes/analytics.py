@@ -0,0 +1,48 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.analytics import AnalyticsUnavailable, last_message_id, message_schema, stream_messages
+
+limiter = Limiter(key_func=get_remote_address)
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+# format -> (media type, file extension)
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+@router.get("/messages")
+@limiter.limit("10/minute")
+async def export_messages(
+    request: Request,
+    after_id: int = Query(default=0, ge=0),
+    format: str = Query(default="parquet", pattern="^(parquet|arrow)$"),
+):
+    """Messages with id > after_id as Parquet or an Arrow IPC stream.
+
+    X-Export-Last-Id is the highest id included; pass it back as after_id
+    on the next call to fetch only newer rows.
+    """
+    try:
+        message_schema()
+    except AnalyticsUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    # Fix the upper bound up front so rows committed mid-export wait for the next call
+    until_id = await last_message_id(after_id) or after_id
+    media_type, extension = COLUMNAR_FORMATS[format]
+    filename = f"messages-{after_id + 1}-{until_id}.{extension}"
+    return StreamingResponse(
+        stream_messages(format, after_id, until_id),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Export-Last-Id": str(until_id),
+        },
+    )
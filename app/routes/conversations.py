@@ -1,75 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-import json
-import asyncio
+from sqlalchemy import select, delete, func
 
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from app.database import get_db
-from app.models import Conversation, Message
-from app.schemas import ConversationCreate, ConversationResponse, MessageResponse, RunConversationRequest, UserMessageInject
-from app.providers import (
-    AnthropicProvider, GroqProvider, OpenAIProvider, XAIProvider,
-    KimiProvider, GeminiProvider
+from app.export import EXPORT_FORMATS, stream_export
+from app.keywords import add_terms, top_terms
+from app.models import Conversation, ConversationTerm, Message, MessagePayload, Participant
+from app.runs import RunConflict, RunQueueFull, run_manager
+from app.schemas import (
+    ConversationCreate, ConversationResponse, ConversationSummary, ConversationKeywords,
+    MessageResponse, MessageRawResponse,
+    RunConversationRequest, RunStatus, UserMessageInject,
 )
-from app.providers.base import ChatMessage
+from app.providers.registry import api_keys_from_headers
+from app.routes.runs import stream_run
 
 limiter = Limiter(key_func=get_remote_address)
 
 router = APIRouter(prefix="/api/conversations", tags=["conversations"])
 
 
-def get_provider(
-    model_id: str,
-    anthropic_key: str | None = None,
-    groq_key: str | None = None,
-    openai_key: str | None = None,
-    xai_key: str | None = None,
-    kimi_key: str | None = None,
-    gemini_key: str | None = None,
+@router.get("/", response_model=list[ConversationSummary])
+async def list_conversations(
+    limit: int | None = Query(default=None, ge=1, le=200),
+    before_id: int | None = Query(default=None, ge=1),
+    db: AsyncSession = Depends(get_db),
 ):
-    """Get the appropriate provider for a model, with optional user-provided keys."""
-    # Create providers with user keys if provided
-    anthropic_provider = AnthropicProvider(api_key=anthropic_key)
-    groq_provider = GroqProvider(api_key=groq_key)
-    openai_provider = OpenAIProvider(api_key=openai_key)
-    xai_provider = XAIProvider(api_key=xai_key)
-    kimi_provider = KimiProvider(api_key=kimi_key)
-    gemini_provider = GeminiProvider(api_key=gemini_key)
-
-    anthropic_models = [m.id for m in anthropic_provider.get_available_models()]
-    groq_models = [m.id for m in groq_provider.get_available_models()]
-    openai_models = [m.id for m in openai_provider.get_available_models()]
-    xai_models = [m.id for m in xai_provider.get_available_models()]
-    kimi_models = [m.id for m in kimi_provider.get_available_models()]
-    gemini_models = [m.id for m in gemini_provider.get_available_models()]
-
-    if model_id in anthropic_models:
-        return anthropic_provider
-    elif model_id in groq_models:
-        return groq_provider
-    elif model_id in openai_models:
-        return openai_provider
-    elif model_id in xai_models:
-        return xai_provider
-    elif model_id in kimi_models:
-        return kimi_provider
-    elif model_id in gemini_models:
-        return gemini_provider
-    else:
-        raise ValueError(f"Unknown model: {model_id}")
-
-
-@router.get("/", response_model=list[ConversationResponse])
-async def list_conversations(db: AsyncSession = Depends(get_db)):
+    """Conversations newest first, each with its message aggregates.
+
+    Pass the last id of a page as before_id to fetch the next one.
+    """
+    query = select(Conversation).order_by(Conversation.id.desc())
+    if before_id is not None:
+        query = query.where(Conversation.id < before_id)
+    if limit is not None:
+        query = query.limit(limit)
+    conversations = (await db.execute(query)).scalars().all()
+    return await summarize_conversations(db, conversations)
+
+
+async def summarize_conversations(db: AsyncSession, conversations) -> list[ConversationSummary]:
+    """Attach message aggregates to conversations with a single grouped query."""
+    if not conversations:
+        return []
+
+    # One grouped pass over the page's messages, per (conversation, model)
     result = await db.execute(
-        select(Conversation).order_by(Conversation.created_at.desc())
+        select(
+            Message.conversation_id,
+            Message.model_name,
+            func.count(Message.id),
+            func.coalesce(func.sum(Message.token_count), 0),
+            func.max(Message.created_at),
+            func.min(Message.id),
+        )
+        .where(Message.conversation_id.in_([c.id for c in conversations]))
+        .group_by(Message.conversation_id, Message.model_name)
+        .order_by(Message.conversation_id, func.min(Message.id))
     )
-    return result.scalars().all()
+    aggregates: dict[int, dict] = {}
+    for conversation_id, model_name, count, tokens, last_at, _ in result:
+        entry = aggregates.setdefault(
+            conversation_id,
+            {"message_count": 0, "total_tokens": 0, "last_message_at": None, "models": []},
+        )
+        entry["message_count"] += count
+        entry["total_tokens"] += tokens
+        if last_at and (entry["last_message_at"] is None or last_at > entry["last_message_at"]):
+            entry["last_message_at"] = last_at
+        if model_name and model_name != "human":
+            entry["models"].append(model_name)
+
+    summaries = []
+    for conversation in conversations:
+        entry = aggregates.get(conversation.id, {})
+        configured = [p.model for p in conversation.participants]
+        participants = configured + [m for m in entry.get("models", []) if m not in configured]
+        summaries.append(ConversationSummary.model_validate(conversation).model_copy(update={
+            "message_count": entry.get("message_count", 0),
+            "total_tokens": entry.get("total_tokens", 0),
+            "last_message_at": entry.get("last_message_at"),
+            "participant_models": participants,
+        }))
+    return summaries
 
 
 @router.post("/", response_model=ConversationResponse)
@@ -81,13 +99,11 @@ async def create_conversation(
 ):
     conversation = Conversation(
         title=data.title,
-        model_a=data.model_a,
-        model_b=data.model_b,
-        model_c=data.model_c,
-        system_prompt_a=data.system_prompt_a,
-        system_prompt_b=data.system_prompt_b,
-        system_prompt_c=data.system_prompt_c,
         starter_message=data.starter_message,
+        participants=[
+            Participant(position=position, model=p.model, system_prompt=p.system_prompt)
+            for position, p in enumerate(data.participants)
+        ],
     )
     db.add(conversation)
     await db.commit()
@@ -95,7 +111,55 @@ async def create_conversation(
     return conversation
 
 
-@router.get("/{conversation_id}", response_model=ConversationResponse)
+@router.get("/keywords", response_model=list[ConversationKeywords])
+async def list_keywords(
+    k: int = Query(default=5, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+):
+    """Top-k terms of every conversation, read from the incremental term index."""
+    keywords = await top_terms(db, k)
+    return [
+        ConversationKeywords(conversation_id=conversation_id, keywords=terms)
+        for conversation_id, terms in keywords.items()
+    ]
+
+
+def _export_response(format: str, conversation_ids: list[int] | None, filename: str, bulk: bool):
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(format, conversation_ids, bulk),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+    )
+
+
+@router.get("/export")
+@limiter.limit("10/minute")
+async def export_conversations(
+    request: Request,
+    format: str = Query(default="json", pattern="^(json|jsonl|md|csv|txt)$"),
+    ids: list[int] | None = Query(default=None, description="Conversations to include; all when omitted"),
+):
+    """Stream several conversations (or all of them) as one file."""
+    return _export_response(format, ids, "neural-discourse_export", bulk=True)
+
+
+@router.get("/{conversation_id}/export")
+@limiter.limit("30/minute")
+async def export_conversation(
+    request: Request,
+    conversation_id: int,
+    format: str = Query(default="json", pattern="^(json|jsonl|md|csv|txt)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Stream one conversation in the requested format."""
+    result = await db.execute(select(Conversation.id).where(Conversation.id == conversation_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return _export_response(format, [conversation_id], f"neural-discourse_{conversation_id}", bulk=False)
+
+
+@router.get("/{conversation_id}", response_model=ConversationSummary)
 async def get_conversation(conversation_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(
         select(Conversation).where(Conversation.id == conversation_id)
@@ -103,17 +167,54 @@ async def get_conversation(conversation_id: int, db: AsyncSession = Depends(get_
     conversation = result.scalar_one_or_none()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conversation
+    return (await summarize_conversations(db, [conversation]))[0]
 
 
 @router.get("/{conversation_id}/messages", response_model=list[MessageResponse])
-async def get_messages(conversation_id: int, db: AsyncSession = Depends(get_db)):
+async def get_messages(
+    conversation_id: int,
+    limit: int | None = Query(default=None, ge=1, le=500),
+    before_id: int | None = Query(default=None, ge=1),
+    after_id: int | None = Query(default=None, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """Messages in chronological order, optionally as a keyset page.
+
+    - after_id: messages newer than this id (delta sync), oldest first
+    - before_id: the page of messages just older than this id
+    - limit alone: the most recent page
+    - no parameters: the whole conversation
+    """
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    if after_id is not None:
+        query = query.where(Message.id > after_id)
+    if before_id is not None:
+        query = query.where(Message.id < before_id)
+
+    if limit is not None and after_id is None:
+        # Take the newest page, then flip it back to chronological order
+        result = await db.execute(query.order_by(Message.id.desc()).limit(limit))
+        return list(reversed(result.scalars().all()))
+
+    query = query.order_by(Message.id)
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+@router.get("/{conversation_id}/messages/{message_id}/raw", response_model=MessageRawResponse)
+async def get_message_raw(conversation_id: int, message_id: int, db: AsyncSession = Depends(get_db)):
+    """Full provider response for one message, decompressed on demand."""
     result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at)
+        select(MessagePayload)
+        .join(Message, Message.id == MessagePayload.message_id)
+        .where(Message.id == message_id, Message.conversation_id == conversation_id)
     )
-    return result.scalars().all()
+    payload = result.scalar_one_or_none()
+    if not payload:
+        raise HTTPException(status_code=404, detail="Raw response not found")
+    return MessageRawResponse(message_id=message_id, raw_response=payload.unpack())
 
 
 @router.delete("/{conversation_id}")
@@ -126,6 +227,12 @@ async def delete_conversation(request: Request, conversation_id: int, db: AsyncS
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
+    # Bulk-delete children rather than loading every message and payload to cascade
+    message_ids = select(Message.id).where(Message.conversation_id == conversation_id)
+    await db.execute(delete(MessagePayload).where(MessagePayload.message_id.in_(message_ids)))
+    await db.execute(delete(Message).where(Message.conversation_id == conversation_id))
+    await db.execute(delete(ConversationTerm).where(ConversationTerm.conversation_id == conversation_id))
+    # Participants are loaded with the conversation and cascade with it
     await db.delete(conversation)
     await db.commit()
     return {"status": "deleted"}
@@ -139,227 +246,42 @@ async def run_conversation(
     request: Request,
     db: AsyncSession = Depends(get_db)
 ):
-    """Run the conversation for N turns, streaming results."""
-    # Get user-provided API keys from headers
-    anthropic_key = request.headers.get('X-Anthropic-Key')
-    groq_key = request.headers.get('X-Groq-Key')
-    openai_key = request.headers.get('X-OpenAI-Key')
-    xai_key = request.headers.get('X-XAI-Key')
-    kimi_key = request.headers.get('X-Kimi-Key')
-    gemini_key = request.headers.get('X-Gemini-Key')
-
-    # Load conversation data before entering the generator
-    # (db session will close after this function returns)
+    """Start a run of N turns in the background and stream its events.
+
+    The run is not tied to this response: if the client drops, it can
+    reattach from its last event id at /api/runs/{X-Run-Id}/events. If no
+    client is back within the grace period the run is cancelled. With
+    detach, the run's status is returned without streaming and the run
+    goes on until it finishes or is cancelled.
+    """
     result = await db.execute(
-        select(Conversation)
-        .options(selectinload(Conversation.messages))
-        .where(Conversation.id == conversation_id)
+        select(Conversation.id).where(Conversation.id == conversation_id)
     )
-    conversation = result.scalar_one_or_none()
-    if not conversation:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    # Copy data we need for the generator (before session closes)
-    conv_id = conversation.id
-    model_a = conversation.model_a
-    model_b = conversation.model_b
-    model_c = conversation.model_c
-    system_prompt_a = conversation.system_prompt_a
-    system_prompt_b = conversation.system_prompt_b
-    system_prompt_c = conversation.system_prompt_c
-    starter_message = conversation.starter_message
-    existing_messages = [(msg.role, msg.content) for msg in conversation.messages]
-
-    async def generate():
-        # Import here to create new session inside generator
-        from app.database import async_session
-
-        # Get existing messages or start fresh
-        messages_a = []  # Messages from model A's perspective
-        messages_b = []  # Messages from model B's perspective
-        messages_c = []  # Messages from model C's perspective (if 3-way)
-
-        # Check if this is a 3-way conversation
-        is_three_way = model_c is not None
-
-        # Load existing messages from copied data
-        for msg_role, msg_content in existing_messages:
-            if msg_role == "model_a":
-                messages_a.append(ChatMessage(role="assistant", content=msg_content))
-                messages_b.append(ChatMessage(role="user", content=msg_content))
-                if is_three_way:
-                    messages_c.append(ChatMessage(role="user", content=msg_content))
-            elif msg_role == "model_b":
-                messages_a.append(ChatMessage(role="user", content=msg_content))
-                messages_b.append(ChatMessage(role="assistant", content=msg_content))
-                if is_three_way:
-                    messages_c.append(ChatMessage(role="user", content=msg_content))
-            elif msg_role == "model_c":
-                messages_a.append(ChatMessage(role="user", content=msg_content))
-                messages_b.append(ChatMessage(role="user", content=msg_content))
-                messages_c.append(ChatMessage(role="assistant", content=msg_content))
-
-        # If no messages yet, seed with starter
-        if not messages_a:
-            messages_b.append(ChatMessage(role="user", content=starter_message))
-            if is_three_way:
-                messages_c.append(ChatMessage(role="user", content=starter_message))
-
-        # Get providers with user-provided keys
-        try:
-            provider_a = get_provider(model_a, anthropic_key, groq_key, openai_key, xai_key, kimi_key, gemini_key)
-        except ValueError as e:
-            yield json.dumps({"type": "error", "error": f"Model A error: {str(e)}"}) + "\n"
-            yield json.dumps({"type": "done"}) + "\n"
-            return
-
-        try:
-            provider_b = get_provider(model_b, anthropic_key, groq_key, openai_key, xai_key, kimi_key, gemini_key)
-        except ValueError as e:
-            yield json.dumps({"type": "error", "error": f"Model B error: {str(e)}"}) + "\n"
-            yield json.dumps({"type": "done"}) + "\n"
-            return
-
-        # Get provider C if 3-way conversation
-        provider_c = None
-        if is_three_way:
-            try:
-                provider_c = get_provider(model_c, anthropic_key, groq_key, openai_key, xai_key, kimi_key, gemini_key)
-            except ValueError as e:
-                yield json.dumps({"type": "error", "error": f"Model C error: {str(e)}"}) + "\n"
-                yield json.dumps({"type": "done"}) + "\n"
-                return
-
-        # Determine who goes next based on last message
-        if not existing_messages:
-            current_turn = "b"  # B responds to starter message first
-        else:
-            last_role = existing_messages[-1][0]  # Get role of last message
-            if is_three_way:
-                # 3-way rotation: a → b → c → a
-                if last_role == "model_a":
-                    current_turn = "b"
-                elif last_role == "model_b":
-                    current_turn = "c"
-                else:
-                    current_turn = "a"
-            else:
-                # 2-way rotation: a ↔ b
-                current_turn = "a" if last_role == "model_b" else "b"
-
-        for turn in range(run_request.turns):
-            if current_turn == "b":
-                # Model B responds
-                provider = provider_b
-                current_model = model_b
-                system = system_prompt_b
-                messages = messages_b
-                role = "model_b"
-            elif current_turn == "c":
-                # Model C responds
-                provider = provider_c
-                current_model = model_c
-                system = system_prompt_c
-                messages = messages_c
-                role = "model_c"
-            else:
-                # Model A responds
-                provider = provider_a
-                current_model = model_a
-                system = system_prompt_a
-                messages = messages_a
-                role = "model_a"
-
-            # Add context note
-            enhanced_system = system
-
-            # For 3-way conversations, always add structure context
-            if is_three_way:
-                if role == "model_a":
-                    context_note = f"You are Model A in a 3-way AI conversation. Model B ({model_b}) and Model C ({model_c}) are also participants. Messages from both other models appear as 'user' inputs. Respond in turn (A → B → C → A)."
-                elif role == "model_b":
-                    context_note = f"You are Model B in a 3-way AI conversation. Model A ({model_a}) and Model C ({model_c}) are also participants. Messages from both other models appear as 'user' inputs. Respond in turn (A → B → C → A)."
-                else:
-                    context_note = f"You are Model C in a 3-way AI conversation. Model A ({model_a}) and Model B ({model_b}) are also participants. Messages from both other models appear as 'user' inputs. Respond in turn (A → B → C → A)."
-
-                if enhanced_system:
-                    enhanced_system = f"{context_note}\n\n{enhanced_system}"
-                else:
-                    enhanced_system = context_note
-
-            # For first turn only, add note about human-seeded message
-            if turn == 0 and not existing_messages:
-                seed_note = "Note: The first message in this conversation was written by a human to seed the discussion."
-                if enhanced_system:
-                    enhanced_system = f"{enhanced_system}\n\n{seed_note}"
-                else:
-                    enhanced_system = seed_note
-
-            yield json.dumps({"type": "start", "role": role, "model": current_model}) + "\n"
-
-            try:
-                response = await provider.chat(messages, current_model, enhanced_system)
-                content = response.content
-                token_count = (response.input_tokens or 0) + (response.output_tokens or 0)
-
-                # Save to database with new session
-                async with async_session() as session:
-                    new_message = Message(
-                        conversation_id=conv_id,
-                        role=role,
-                        model_name=current_model,
-                        content=content,
-                        raw_response=response.raw_response,
-                        token_count=token_count,
-                    )
-                    session.add(new_message)
-                    await session.commit()
-
-                # Update message histories
-                if role == "model_a":
-                    messages_a.append(ChatMessage(role="assistant", content=content))
-                    messages_b.append(ChatMessage(role="user", content=content))
-                    if is_three_way:
-                        messages_c.append(ChatMessage(role="user", content=content))
-                elif role == "model_b":
-                    messages_b.append(ChatMessage(role="assistant", content=content))
-                    messages_a.append(ChatMessage(role="user", content=content))
-                    if is_three_way:
-                        messages_c.append(ChatMessage(role="user", content=content))
-                elif role == "model_c":
-                    messages_c.append(ChatMessage(role="assistant", content=content))
-                    messages_a.append(ChatMessage(role="user", content=content))
-                    messages_b.append(ChatMessage(role="user", content=content))
-
-                yield json.dumps({
-                    "type": "message",
-                    "role": role,
-                    "model": current_model,
-                    "content": content,
-                    "tokens": token_count,
-                }) + "\n"
-
-            except Exception as e:
-                yield json.dumps({"type": "error", "error": str(e)}) + "\n"
-                break
-
-            # Rotate to next turn
-            if is_three_way:
-                # 3-way rotation: a → b → c → a
-                if current_turn == "a":
-                    current_turn = "b"
-                elif current_turn == "b":
-                    current_turn = "c"
-                else:
-                    current_turn = "a"
-            else:
-                # 2-way rotation: a ↔ b
-                current_turn = "a" if current_turn == "b" else "b"
-            await asyncio.sleep(0.5)  # Small delay between turns
-
-        yield json.dumps({"type": "done"}) + "\n"
-
-    return StreamingResponse(generate(), media_type="application/x-ndjson")
+    try:
+        run = run_manager.submit(
+            conversation_id,
+            run_request.turns,
+            run_request.stream,
+            api_keys_from_headers(request.headers),
+            # An attached run stops once its viewers are gone for the grace period
+            cancel_on_disconnect=not run_request.detach,
+            mode=run_request.mode,
+        )
+    except RunConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except RunQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if run_request.detach:
+        return JSONResponse(
+            status_code=202,
+            content=jsonable_encoder(RunStatus(**run.snapshot())),
+            headers={"X-Run-Id": run.id},
+        )
+    return stream_run(request, run)
 
 
 @router.post("/{conversation_id}/inject-message")
@@ -379,13 +301,10 @@ async def inject_user_message(
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    # Determine the role for the message
-    # user_to_a means the message appears as if model A said it (so model B sees it as user input)
-    # user_to_b means the message appears as if model B said it (so model A sees it as user input)
-    if message_data.role == "user_to_a":
-        role = "model_a"
-    else:
-        role = "model_b"
+    # user_to_a means the message appears as if model A said it (so the others see it as user input)
+    role = "model_" + message_data.role.removeprefix("user_to_")
+    if role not in {p.role for p in conversation.participants}:
+        raise HTTPException(status_code=400, detail=f"Conversation has no participant {role}")
 
     # Create the message
     new_message = Message(
@@ -393,11 +312,12 @@ async def inject_user_message(
         role=role,
         model_name="human",  # Mark as human-injected
         content=message_data.content,
-        raw_response={"injected": True},
+        payload=MessagePayload.pack({"injected": True}),
         token_count=0,
     )
 
     db.add(new_message)
+    await add_terms(db, conversation_id, message_data.content)
     await db.commit()
     await db.refresh(new_message)
 
@@ -1,147 +1,33 @@
 from fastapi import APIRouter, Request
-from app.providers import (
-    AnthropicProvider, GroqProvider, OpenAIProvider, XAIProvider,
-    KimiProvider, GeminiProvider
-)
+from app.providers.registry import PROVIDER_MODELS, api_keys_from_headers, is_configured
 from app.schemas import ProviderStatus
 
 router = APIRouter(prefix="/api/models", tags=["models"])
 
 
-def get_providers_with_keys(request: Request):
-    """Get providers, using user-provided keys from headers if available."""
-    anthropic_key = request.headers.get('X-Anthropic-Key')
-    groq_key = request.headers.get('X-Groq-Key')
-    openai_key = request.headers.get('X-OpenAI-Key')
-    xai_key = request.headers.get('X-XAI-Key')
-    kimi_key = request.headers.get('X-Kimi-Key')
-    gemini_key = request.headers.get('X-Gemini-Key')
-
-    anthropic_provider = AnthropicProvider(api_key=anthropic_key)
-    groq_provider = GroqProvider(api_key=groq_key)
-    openai_provider = OpenAIProvider(api_key=openai_key)
-    xai_provider = XAIProvider(api_key=xai_key)
-    kimi_provider = KimiProvider(api_key=kimi_key)
-    gemini_provider = GeminiProvider(api_key=gemini_key)
-
-    return anthropic_provider, groq_provider, openai_provider, xai_provider, kimi_provider, gemini_provider
-
-
 @router.get("/providers", response_model=list[ProviderStatus])
 async def get_providers(request: Request):
     """Get all available providers and their status."""
-    anthropic_provider, groq_provider, openai_provider, xai_provider, kimi_provider, gemini_provider = get_providers_with_keys(request)
+    api_keys = api_keys_from_headers(request.headers)
 
     return [
         ProviderStatus(
-            name="anthropic",
-            configured=anthropic_provider.is_configured(),
-            models=[
-                {"id": m.id, "name": m.name, "description": m.description}
-                for m in anthropic_provider.get_available_models()
-            ],
-        ),
-        ProviderStatus(
-            name="groq",
-            configured=groq_provider.is_configured(),
-            models=[
-                {"id": m.id, "name": m.name, "description": m.description}
-                for m in groq_provider.get_available_models()
-            ],
-        ),
-        ProviderStatus(
-            name="openai",
-            configured=openai_provider.is_configured(),
-            models=[
-                {"id": m.id, "name": m.name, "description": m.description}
-                for m in openai_provider.get_available_models()
-            ],
-        ),
-        ProviderStatus(
-            name="xai",
-            configured=xai_provider.is_configured(),
-            models=[
-                {"id": m.id, "name": m.name, "description": m.description}
-                for m in xai_provider.get_available_models()
-            ],
-        ),
-        ProviderStatus(
-            name="kimi",
-            configured=kimi_provider.is_configured(),
-            models=[
-                {"id": m.id, "name": m.name, "description": m.description}
-                for m in kimi_provider.get_available_models()
-            ],
-        ),
-        ProviderStatus(
-            name="gemini",
-            configured=gemini_provider.is_configured(),
-            models=[
-                {"id": m.id, "name": m.name, "description": m.description}
-                for m in gemini_provider.get_available_models()
-            ],
-        ),
+            name=name,
+            configured=is_configured(name, api_keys[name]),
+            models=models,
+        )
+        for name, models in PROVIDER_MODELS.items()
     ]
 
 
 @router.get("/all")
 async def get_all_models(request: Request):
     """Get flat list of all available models."""
-    anthropic_provider, groq_provider, openai_provider, xai_provider, kimi_provider, gemini_provider = get_providers_with_keys(request)
+    api_keys = api_keys_from_headers(request.headers)
     models = []
 
-    if anthropic_provider.is_configured():
-        for m in anthropic_provider.get_available_models():
-            models.append({
-                "id": m.id,
-                "name": m.name,
-                "provider": "anthropic",
-                "description": m.description,
-            })
-
-    if groq_provider.is_configured():
-        for m in groq_provider.get_available_models():
-            models.append({
-                "id": m.id,
-                "name": m.name,
-                "provider": "groq",
-                "description": m.description,
-            })
-
-    if openai_provider.is_configured():
-        for m in openai_provider.get_available_models():
-            models.append({
-                "id": m.id,
-                "name": m.name,
-                "provider": "openai",
-                "description": m.description,
-            })
-
-    if xai_provider.is_configured():
-        for m in xai_provider.get_available_models():
-            models.append({
-                "id": m.id,
-                "name": m.name,
-                "provider": "xai",
-                "description": m.description,
-            })
-
-    if kimi_provider.is_configured():
-        for m in kimi_provider.get_available_models():
-            models.append({
-                "id": m.id,
-                "name": m.name,
-                "provider": "kimi",
-                "description": m.description,
-            })
-
-    if gemini_provider.is_configured():
-        for m in gemini_provider.get_available_models():
-            models.append({
-                "id": m.id,
-                "name": m.name,
-                "provider": "gemini",
-                "description": m.description,
-            })
+    for name, provider_models in PROVIDER_MODELS.items():
+        if is_configured(name, api_keys[name]):
+            models.extend(provider_models)
 
     return models
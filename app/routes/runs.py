@@ -0,0 +1,93 @@
+import time
+from typing import AsyncGenerator
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.runs import Run, run_manager
+from app.scheduler import turn_scheduler
+from app.schemas import RunStatus, SchedulerStats
+
+limiter = Limiter(key_func=get_remote_address)
+
+router = APIRouter(prefix="/api/runs", tags=["runs"])
+
+
+# How often an idle stream checks whether its client is still there
+DISCONNECT_POLL_SECONDS = 1.0
+
+
+async def _follow(request: Request, run: Run, after: int) -> AsyncGenerator[str, None]:
+    run_manager.attach(run)
+    try:
+        checked = time.monotonic()
+        async for line in run.follow(after, idle=DISCONNECT_POLL_SECONDS):
+            if line:
+                yield line
+            if time.monotonic() - checked >= DISCONNECT_POLL_SECONDS:
+                if await request.is_disconnected():
+                    return
+                checked = time.monotonic()
+    finally:
+        run_manager.detach(run)
+
+
+def stream_run(request: Request, run: Run, after: int = 0) -> StreamingResponse:
+    """NDJSON events of a run after the given event id, following it until it
+    finishes or the client goes away."""
+    return StreamingResponse(
+        _follow(request, run, after),
+        media_type="application/x-ndjson",
+        headers={"X-Run-Id": run.id},
+    )
+
+
+def _get_run(run_id: str) -> Run:
+    run = run_manager.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
+@router.get("", response_model=list[RunStatus])
+async def list_runs(conversation_id: int | None = Query(default=None, gt=0)):
+    """Queued, running and recently finished runs, newest first."""
+    return [RunStatus(**run.snapshot()) for run in run_manager.runs(conversation_id)]
+
+
+@router.get("/scheduler", response_model=SchedulerStats)
+async def get_scheduler_stats():
+    """Turn slots in use and waiting, overall and per provider, with recent wait times."""
+    return SchedulerStats(**turn_scheduler.stats())
+
+
+@router.get("/{run_id}", response_model=RunStatus)
+async def get_run(run_id: str):
+    return RunStatus(**_get_run(run_id).snapshot())
+
+
+@router.get("/{run_id}/events")
+@limiter.limit("60/minute")
+async def run_events(
+    request: Request,
+    run_id: str,
+    after: int | None = Query(default=None, ge=0),
+    last_event_id: int | None = Header(default=None),
+):
+    """Attach to a run's event stream.
+
+    Events carry increasing ids; pass the last one seen as `after` (or the
+    Last-Event-ID header) to resume without replaying earlier events.
+    """
+    run = _get_run(run_id)
+    return stream_run(request, run, after if after is not None else last_event_id or 0)
+
+
+@router.post("/{run_id}/cancel", response_model=RunStatus)
+@limiter.limit("30/minute")
+async def cancel_run(request: Request, run_id: str):
+    run = run_manager.cancel(_get_run(run_id).id)
+    return RunStatus(**run.snapshot())
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.database import get_db
+from app.schemas import SearchHit, SearchResponse
+from app.search import search
+
+limiter = Limiter(key_func=get_remote_address)
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+@router.get("", response_model=SearchResponse)
+@limiter.limit("60/minute")
+async def search_conversations(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0, le=10000),
+    db: AsyncSession = Depends(get_db),
+):
+    """Ranked full-text matches across messages and conversation titles/starters."""
+    # One extra row tells whether another page exists
+    hits = await search(db, q, limit + 1, offset)
+    return SearchResponse(
+        query=q,
+        limit=limit,
+        offset=offset,
+        has_more=len(hits) > limit,
+        results=[SearchHit(**hit) for hit in hits[:limit]],
+    )
@@ -0,0 +1,322 @@
+"""Detached conversation runs.
+
+A run is submitted as a job and executed by a fixed pool of worker tasks,
+independent of any HTTP response. Every event it produces is appended to the
+run's log with a sequence id, so any number of clients can attach, drop and
+reattach from the last id they saw without repeating a provider call.
+Once a reply is complete its delta events are dropped from the log, so a
+late attach replays the finished message rather than every token.
+Finished runs stay available for a retention period, then are forgotten.
+A run started by an attached client is cancelled once every client has been
+gone for a grace period, so an abandoned tab stops spending tokens.
+Runs live in this process's memory: clients must reattach to the same instance.
+"""
+import asyncio
+import bisect
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncGenerator
+
+from app.config import get_settings
+from app.engine import run_turns
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+FINISHED = {COMPLETED, FAILED, CANCELLED}
+
+
+class RunConflict(Exception):
+    """The conversation already has a run queued or in progress."""
+
+
+class RunQueueFull(Exception):
+    """Too many runs are waiting for a worker."""
+
+
+class Run:
+    def __init__(
+        self,
+        conversation_id: int,
+        turns: int,
+        stream: bool,
+        api_keys: dict[str, str],
+        cancel_on_disconnect: bool = False,
+        mode: str = "sequential",
+    ):
+        self.id = uuid.uuid4().hex
+        self.conversation_id = conversation_id
+        self.turns = turns
+        self.stream = stream
+        self.mode = mode
+        self.api_keys = api_keys
+        self.cancel_on_disconnect = cancel_on_disconnect
+        self.viewers = 0
+        self.status = QUEUED
+        self.messages = 0
+        self.error: str | None = None
+        self.created_at = datetime.utcnow()
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        self.task: asyncio.Task | None = None
+        # NDJSON lines with their ids, serialized once however many clients
+        # are attached. Ids stay stable when a finished reply's deltas are
+        # compacted away, so clients can keep resuming from the last id seen.
+        self.events: list[str] = []
+        self._event_ids: list[int] = []
+        self._delta_roles: list[str | None] = []  # Role of each delta line, None for other events
+        self._next_event_id = 1
+        self._changed = asyncio.Event()
+        self._finished_monotonic: float | None = None
+        self._orphan_timer: asyncio.TimerHandle | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def last_event_id(self) -> int:
+        return self._next_event_id - 1
+
+    def publish(self, event: dict) -> None:
+        """Append an event to the log and wake attached clients."""
+        if event["type"] == "message":
+            self.messages += 1
+            # The full reply supersedes its deltas; a late attach replays the message
+            self._compact(event["role"])
+        elif event["type"] == "error":
+            self.error = event["error"]
+        event["id"] = self._next_event_id
+        self._next_event_id += 1
+        self.events.append(json.dumps(event) + "\n")
+        self._event_ids.append(event["id"])
+        self._delta_roles.append(event["role"] if event["type"] == "delta" else None)
+        self._wake()
+
+    def _compact(self, role: str) -> None:
+        if role not in self._delta_roles:
+            return
+        kept = [i for i, delta_role in enumerate(self._delta_roles) if delta_role != role]
+        self.events = [self.events[i] for i in kept]
+        self._event_ids = [self._event_ids[i] for i in kept]
+        self._delta_roles = [self._delta_roles[i] for i in kept]
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = datetime.utcnow()
+        self._finished_monotonic = time.monotonic()
+        # Keys are only needed while the run can still call providers
+        self.api_keys = {}
+        self._wake()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self, after: int = 0, idle: float | None = None) -> AsyncGenerator[str, None]:
+        """Yield log lines with ids above `after`, then new ones as they arrive,
+        until the run has finished.
+
+        With `idle`, an empty string is yielded whenever that many seconds pass
+        without an event, so the caller can check on its client.
+        """
+        last_id = max(after, 0)
+        while True:
+            # Re-found each time: compaction can shift lines under a reader
+            index = bisect.bisect_right(self._event_ids, last_id)
+            while index < len(self.events):
+                last_id = self._event_ids[index]
+                yield self.events[index]
+                index = bisect.bisect_right(self._event_ids, last_id)
+            if self.finished:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), idle)
+            except asyncio.TimeoutError:
+                yield ""
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "conversation_id": self.conversation_id,
+            "status": self.status,
+            "turns": self.turns,
+            "stream": self.stream,
+            "mode": self.mode,
+            "messages": self.messages,
+            "last_event_id": self.last_event_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class RunManager:
+    """Queue of detached runs served by a fixed number of worker tasks.
+
+    Workers start lazily on the first submission, inside the running event
+    loop. Each conversation has at most one run queued or running at a time,
+    since two runs interleaving turns would corrupt the rotation.
+    """
+
+    def __init__(
+        self,
+        workers: int = 64,
+        max_queued: int = 100,
+        retention_seconds: float = 900.0,
+        disconnect_grace_seconds: float = 15.0,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.disconnect_grace_seconds = disconnect_grace_seconds
+        self._runs: dict[str, Run] = {}
+        self._queue: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+
+    def _ensure_started(self) -> None:
+        if self._workers and not all(worker.done() for worker in self._workers):
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(max(self.workers, 1))]
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.retention_seconds
+        expired = [
+            run_id for run_id, run in self._runs.items()
+            if run.finished and run._finished_monotonic < cutoff
+        ]
+        for run_id in expired:
+            del self._runs[run_id]
+
+    def submit(
+        self,
+        conversation_id: int,
+        turns: int,
+        stream: bool,
+        api_keys: dict[str, str],
+        cancel_on_disconnect: bool = False,
+        mode: str = "sequential",
+    ) -> Run:
+        self._prune()
+        if self.active_for(conversation_id):
+            raise RunConflict(f"Conversation {conversation_id} already has a run in progress")
+        self._ensure_started()
+        if self._queue.qsize() >= self.max_queued:
+            raise RunQueueFull("Too many runs are waiting; try again shortly")
+        run = Run(conversation_id, turns, stream, api_keys, cancel_on_disconnect, mode)
+        self._runs[run.id] = run
+        self._queue.put_nowait(run)
+        return run
+
+    def get(self, run_id: str) -> Run | None:
+        self._prune()
+        return self._runs.get(run_id)
+
+    def active_for(self, conversation_id: int) -> Run | None:
+        return next(
+            (run for run in self._runs.values() if run.conversation_id == conversation_id and not run.finished),
+            None,
+        )
+
+    def runs(self, conversation_id: int | None = None) -> list[Run]:
+        self._prune()
+        runs = [run for run in self._runs.values() if conversation_id in (None, run.conversation_id)]
+        return sorted(runs, key=lambda run: run.created_at, reverse=True)
+
+    def attach(self, run: Run) -> None:
+        run.viewers += 1
+        if run._orphan_timer is not None:
+            run._orphan_timer.cancel()
+            run._orphan_timer = None
+
+    def detach(self, run: Run) -> None:
+        """A client stopped following the run; cancel it if nobody is back within the grace period."""
+        run.viewers -= 1
+        if run.viewers > 0 or run.finished or not run.cancel_on_disconnect:
+            return
+        run._orphan_timer = asyncio.get_running_loop().call_later(
+            self.disconnect_grace_seconds, self._cancel_orphan, run,
+        )
+
+    def _cancel_orphan(self, run: Run) -> None:
+        run._orphan_timer = None
+        if run.viewers == 0 and not run.finished:
+            logger.info("Cancelling run %s: no client attached", run.id)
+            self.cancel(run.id)
+
+    def cancel(self, run_id: str) -> Run | None:
+        run = self._runs.get(run_id)
+        if run is None or run.finished:
+            return run
+        if run.task is None:
+            # Still queued: the worker skips it when it comes up
+            run.publish({"type": "cancelled"})
+            run.publish({"type": "done"})
+            run.finish(CANCELLED)
+        else:
+            run.task.cancel()
+        return run
+
+    async def _work(self) -> None:
+        while True:
+            run = await self._queue.get()
+            if run is None:
+                return
+            if run.finished:
+                continue
+            run.task = asyncio.create_task(self._execute(run))
+            # wait() rather than await: cancelling the run must not cancel the worker
+            await asyncio.wait([run.task])
+
+    @staticmethod
+    async def _execute(run: Run) -> None:
+        run.status = RUNNING
+        run.started_at = datetime.utcnow()
+        try:
+            events = run_turns(
+                run.conversation_id, run.turns, run.stream, run.api_keys,
+                simultaneous=run.mode == "simultaneous",
+            )
+            async for event in events:
+                run.publish(event)
+        except asyncio.CancelledError:
+            run.publish({"type": "cancelled"})
+            run.publish({"type": "done"})
+            run.finish(CANCELLED)
+            return
+        except Exception as e:
+            logger.exception("Run %s failed", run.id)
+            run.publish({"type": "error", "error": str(e)})
+            run.publish({"type": "done"})
+            run.finish(FAILED)
+            return
+        run.finish(FAILED if run.error else COMPLETED)
+
+    async def aclose(self) -> None:
+        """Cancel queued and running runs, then stop the workers."""
+        for run in list(self._runs.values()):
+            self.cancel(run.id)
+        if not self._workers:
+            return
+        for _ in self._workers:
+            self._queue.put_nowait(None)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+def _create_manager() -> RunManager:
+    settings = get_settings()
+    return RunManager(
+        workers=settings.run_workers,
+        max_queued=settings.run_max_queued,
+        retention_seconds=settings.run_retention_seconds,
+        disconnect_grace_seconds=settings.run_disconnect_grace_seconds,
+    )
+
+
+run_manager = _create_manager()
@@ -0,0 +1,170 @@
+"""Admission control for conversation turns across every active run.
+
+Each turn (context fitting plus the provider call) holds a slot for as long
+as it runs. Slots are capped globally, optionally per provider, and
+optionally per provider key, so turns queued behind one busy key can wait
+here rather than hold global slots while they sit in its rate limiter.
+Waiting turns are queued per conversation and granted round-robin: when a
+slot frees, the conversation that has waited the longest since its last
+grant goes first, so a long run gets one turn in, then goes to the back
+behind the short ones.
+"""
+import asyncio
+import statistics
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from app.config import get_settings
+
+# Recent admissions kept for the wait-time percentiles
+WAIT_WINDOW = 1000
+
+
+@dataclass(eq=False)
+class _Waiter:
+    conversation_id: int
+    provider: str
+    key: str  # Provider key fingerprint; the rate limiter's unit
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class TurnScheduler:
+    def __init__(
+        self,
+        max_in_flight: int = 64,
+        provider_limits: dict[str, int] | None = None,
+        key_limit: int = 0,
+    ):
+        self.max_in_flight = max_in_flight
+        self.provider_limits = provider_limits or {}
+        self.key_limit = key_limit  # 0: no per-key cap
+        self.in_flight = 0
+        self.provider_in_flight: Counter = Counter()
+        self.key_in_flight: Counter = Counter()
+        self.admitted = 0
+        self._waiting: dict[int, deque[_Waiter]] = {}
+        # Conversations with waiting turns, in the order they will be served
+        self._rotation: deque[int] = deque()
+        self._waits: deque[float] = deque(maxlen=WAIT_WINDOW)
+
+    @asynccontextmanager
+    async def turn(self, conversation_id: int, provider: str, key: str = "") -> AsyncIterator[None]:
+        """Hold a slot for one turn of a conversation on a provider key."""
+        waiter = await self._acquire(conversation_id, provider, key)
+        try:
+            yield
+        finally:
+            self._release(waiter)
+
+    def _has_room(self, waiter: _Waiter) -> bool:
+        limit = self.provider_limits.get(waiter.provider, 0)
+        if limit and self.provider_in_flight[waiter.provider] >= limit:
+            return False
+        return not self.key_limit or self.key_in_flight[waiter.provider, waiter.key] < self.key_limit
+
+    async def _acquire(self, conversation_id: int, provider: str, key: str) -> _Waiter:
+        waiter = _Waiter(conversation_id, provider, key, asyncio.get_running_loop().create_future())
+        queue = self._waiting.get(conversation_id)
+        if queue is None:
+            queue = self._waiting[conversation_id] = deque()
+            self._rotation.append(conversation_id)
+        queue.append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the run was cancelled: hand the slot back
+                self._release(waiter)
+            else:
+                self._forget(waiter)
+            raise
+        return waiter
+
+    def _forget(self, waiter: _Waiter) -> None:
+        queue = self._waiting.get(waiter.conversation_id)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        if not queue:
+            del self._waiting[waiter.conversation_id]
+            self._rotation.remove(waiter.conversation_id)
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.max_in_flight and self._grant_next():
+            pass
+
+    def _grant_next(self) -> bool:
+        """Grant one waiting turn, taking conversations in rotation order."""
+        for _ in range(len(self._rotation)):
+            conversation_id = self._rotation[0]
+            self._rotation.rotate(-1)
+            queue = self._waiting[conversation_id]
+            waiter = next((w for w in queue if self._has_room(w)), None)
+            if waiter is None:
+                continue
+            queue.remove(waiter)
+            if not queue:
+                del self._waiting[conversation_id]
+                # Just rotated to the back
+                self._rotation.pop()
+            self.in_flight += 1
+            self.provider_in_flight[waiter.provider] += 1
+            self.key_in_flight[waiter.provider, waiter.key] += 1
+            self.admitted += 1
+            self._waits.append(time.monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+            return True
+        return False
+
+    def _release(self, waiter: _Waiter) -> None:
+        self.in_flight -= 1
+        self.provider_in_flight[waiter.provider] -= 1
+        self.key_in_flight[waiter.provider, waiter.key] -= 1
+        if not self.key_in_flight[waiter.provider, waiter.key]:
+            del self.key_in_flight[waiter.provider, waiter.key]
+        self._dispatch()
+
+    def stats(self) -> dict:
+        queued = Counter(w.provider for queue in self._waiting.values() for w in queue)
+        providers = set(queued) | {p for p, n in self.provider_in_flight.items() if n} | set(self.provider_limits)
+        waits = sorted(w * 1000 for w in self._waits)
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_in_flight_per_key": self.key_limit or None,
+            "queued": sum(queued.values()),
+            "conversations_waiting": len(self._waiting),
+            "admitted": self.admitted,
+            "wait_ms": {
+                "count": len(waits),
+                "mean": statistics.fmean(waits) if waits else None,
+                "p50": waits[len(waits) // 2] if waits else None,
+                "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else None,
+                "max": waits[-1] if waits else None,
+            },
+            "providers": {
+                name: {
+                    "in_flight": self.provider_in_flight[name],
+                    "queued": queued[name],
+                    "limit": self.provider_limits.get(name) or None,
+                }
+                for name in sorted(providers)
+            },
+        }
+
+
+def _create_scheduler() -> TurnScheduler:
+    settings = get_settings()
+    return TurnScheduler(
+        max_in_flight=settings.scheduler_max_in_flight,
+        provider_limits=settings.scheduler_provider_limits,
+        key_limit=settings.scheduler_key_limit,
+    )
+
+
+turn_scheduler = _create_scheduler()
@@ -3,14 +3,28 @@ from datetime import datetime
 import re
 
 
+# Participants speak as model_a, model_b, ... in this order
+MAX_PARTICIPANTS = 8
+
+
+class ParticipantCreate(BaseModel):
+    model: str = Field(..., max_length=100)
+    system_prompt: str | None = Field(default=None, max_length=10000)
+
+
+class ParticipantResponse(BaseModel):
+    position: int
+    role: str  # Message role this participant speaks as
+    model: str
+    system_prompt: str | None
+
+    class Config:
+        from_attributes = True
+
+
 class ConversationCreate(BaseModel):
     title: str | None = Field(default="Untitled", max_length=255)
-    model_a: str = Field(..., max_length=100)
-    model_b: str = Field(..., max_length=100)
-    model_c: str | None = Field(default=None, max_length=100)
-    system_prompt_a: str | None = Field(default=None, max_length=10000)
-    system_prompt_b: str | None = Field(default=None, max_length=10000)
-    system_prompt_c: str | None = Field(default=None, max_length=10000)
+    participants: list[ParticipantCreate] = Field(..., min_length=2, max_length=MAX_PARTICIPANTS)
     starter_message: str = Field(..., min_length=1, max_length=10000)
 
     @field_validator('title')
@@ -24,12 +38,7 @@ class ConversationCreate(BaseModel):
 class ConversationResponse(BaseModel):
     id: int
     title: str
-    model_a: str
-    model_b: str
-    model_c: str | None
-    system_prompt_a: str | None
-    system_prompt_b: str | None
-    system_prompt_c: str | None
+    participants: list[ParticipantResponse]
     starter_message: str
     created_at: datetime
     updated_at: datetime
@@ -38,6 +47,19 @@ class ConversationResponse(BaseModel):
         from_attributes = True
 
 
+class ConversationSummary(ConversationResponse):
+    """List entry: a conversation plus aggregates over its messages."""
+    message_count: int = 0
+    total_tokens: int = 0
+    last_message_at: datetime | None = None
+    participant_models: list[str] = []
+
+
+class ConversationKeywords(BaseModel):
+    conversation_id: int
+    keywords: list[str]
+
+
 class MessageResponse(BaseModel):
     id: int
     conversation_id: int
@@ -45,23 +67,94 @@ class MessageResponse(BaseModel):
     model_name: str
     content: str
     token_count: int | None
+    cache_read_tokens: int | None = None
+    cache_creation_tokens: int | None = None
     created_at: datetime
 
     class Config:
         from_attributes = True
 
 
+class MessageRawResponse(BaseModel):
+    message_id: int
+    raw_response: dict
+
+
 class RunConversationRequest(BaseModel):
     conversation_id: int = Field(..., gt=0)
     turns: int = Field(default=5, ge=1, le=50)  # 1-50 turns allowed
+    stream: bool = False  # Emit "delta" events as tokens arrive
+    detach: bool = False  # Return the run's status at once instead of streaming its events
+    # All participants answer each round at once; turns then counts rounds
+    mode: str = Field(default="sequential", pattern="^(sequential|simultaneous)$")
+
+
+class RunStatus(BaseModel):
+    id: str
+    conversation_id: int
+    status: str  # queued, running, completed, failed or cancelled
+    turns: int
+    stream: bool
+    mode: str
+    messages: int  # Messages completed so far
+    last_event_id: int
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+class WaitStats(BaseModel):
+    count: int  # Admissions in the recent window
+    mean: float | None = None
+    p50: float | None = None
+    p95: float | None = None
+    max: float | None = None
+
+
+class ProviderSchedulerStats(BaseModel):
+    in_flight: int
+    queued: int
+    limit: int | None = None
+
+
+class SchedulerStats(BaseModel):
+    in_flight: int
+    max_in_flight: int
+    max_in_flight_per_key: int | None = None  # The rate limiter's concurrency per provider key
+    queued: int  # Turns waiting for a slot
+    conversations_waiting: int
+    admitted: int  # Turns admitted since startup
+    wait_ms: WaitStats
+    providers: dict[str, ProviderSchedulerStats]
 
 
 class UserMessageInject(BaseModel):
     content: str = Field(..., min_length=1, max_length=10000)
-    role: str = Field(..., pattern="^(user_to_a|user_to_b)$")  # Which model should see this as user input
+    # user_to_x: the message is attributed to participant x, so the others see it as user input
+    role: str = Field(..., pattern="^user_to_[a-h]$")
 
 
 class ProviderStatus(BaseModel):
     name: str
     configured: bool
     models: list[dict]
+
+
+class SearchHit(BaseModel):
+    kind: str  # "message" or "conversation" (title/starter match)
+    conversation_id: int
+    message_id: int | None
+    role: str | None
+    model_name: str | None
+    title: str | None
+    snippet: str  # HTML-escaped, matches wrapped in <mark>
+    rank: float  # Lower is better
+
+
+class SearchResponse(BaseModel):
+    query: str
+    limit: int
+    offset: int
+    has_more: bool
+    results: list[SearchHit]
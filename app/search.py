@@ -0,0 +1,191 @@
+"""Full-text search over message content and conversation titles/starters.
+
+SQLite uses FTS5 external-content tables kept in sync by triggers, so the
+index updates in the same transaction as every insert, update or delete.
+PostgreSQL uses GIN expression indexes over to_tsvector instead.
+
+    python -m app.search rebuild    # repopulate the index from the tables
+"""
+import asyncio
+import html
+import re
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+# Snippet markers that cannot occur in stored text; swapped for <mark> after escaping
+_START, _STOP = "\x02", "\x03"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_SQLITE_SCHEMA = [
+    # Message content, rowid = messages.id
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "content, content='messages', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    # Conversation title and starter, rowid = conversations.id
+    "CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5("
+    "title, starter_message, content='conversations', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS conversations_fts_ai AFTER INSERT ON conversations BEGIN "
+    "INSERT INTO conversations_fts(rowid, title, starter_message) "
+    "VALUES (new.id, new.title, new.starter_message); END",
+    "CREATE TRIGGER IF NOT EXISTS conversations_fts_ad AFTER DELETE ON conversations BEGIN "
+    "INSERT INTO conversations_fts(conversations_fts, rowid, title, starter_message) "
+    "VALUES ('delete', old.id, old.title, old.starter_message); END",
+    "CREATE TRIGGER IF NOT EXISTS conversations_fts_au AFTER UPDATE OF title, starter_message ON conversations BEGIN "
+    "INSERT INTO conversations_fts(conversations_fts, rowid, title, starter_message) "
+    "VALUES ('delete', old.id, old.title, old.starter_message); "
+    "INSERT INTO conversations_fts(rowid, title, starter_message) "
+    "VALUES (new.id, new.title, new.starter_message); END",
+]
+
+_POSTGRES_SCHEMA = [
+    "CREATE INDEX IF NOT EXISTS ix_messages_content_fts ON messages "
+    "USING gin (to_tsvector('english', coalesce(content, '')))",
+    "CREATE INDEX IF NOT EXISTS ix_conversations_fts ON conversations "
+    "USING gin (to_tsvector('english', coalesce(title, '') || ' ' || coalesce(starter_message, '')))",
+]
+
+_SQLITE_SEARCH = f"""
+SELECT kind, conversation_id, message_id, role, model_name, title, snippet, rank FROM (
+    SELECT 'message' AS kind, m.conversation_id, m.id AS message_id, m.role, m.model_name, c.title,
+           snippet(messages_fts, 0, '{_START}', '{_STOP}', '…', 24) AS snippet,
+           bm25(messages_fts) AS rank
+    FROM messages_fts
+    JOIN messages m ON m.id = messages_fts.rowid
+    JOIN conversations c ON c.id = m.conversation_id
+    WHERE messages_fts MATCH :query
+    UNION ALL
+    SELECT 'conversation', c.id, NULL, NULL, NULL, c.title,
+           snippet(conversations_fts, -1, '{_START}', '{_STOP}', '…', 24),
+           bm25(conversations_fts)
+    FROM conversations_fts
+    JOIN conversations c ON c.id = conversations_fts.rowid
+    WHERE conversations_fts MATCH :query
+)
+ORDER BY rank, conversation_id DESC, message_id
+LIMIT :limit OFFSET :offset
+"""
+
+# Rank and page first; headlines are costly, so only the page gets them
+_POSTGRES_SEARCH = f"""
+WITH q AS (SELECT websearch_to_tsquery('english', :query) AS query),
+hits AS (
+    SELECT 'message' AS kind, m.conversation_id, m.id AS message_id,
+           ts_rank(to_tsvector('english', coalesce(m.content, '')), q.query) AS score
+    FROM messages m, q
+    WHERE to_tsvector('english', coalesce(m.content, '')) @@ q.query
+    UNION ALL
+    SELECT 'conversation', c.id, NULL,
+           ts_rank(to_tsvector('english', coalesce(c.title, '') || ' ' || coalesce(c.starter_message, '')), q.query)
+    FROM conversations c, q
+    WHERE to_tsvector('english', coalesce(c.title, '') || ' ' || coalesce(c.starter_message, '')) @@ q.query
+    ORDER BY score DESC, conversation_id DESC, message_id
+    LIMIT :limit OFFSET :offset
+)
+SELECT h.kind, h.conversation_id, h.message_id, m.role, m.model_name, c.title,
+       ts_headline('english',
+                   CASE WHEN h.kind = 'message' THEN m.content
+                        ELSE coalesce(c.title, '') || ' ' || coalesce(c.starter_message, '') END,
+                   q.query,
+                   'StartSel={_START}, StopSel={_STOP}, MaxWords=24, MinWords=8, MaxFragments=1') AS snippet,
+       -h.score AS rank
+FROM hits h
+CROSS JOIN q
+JOIN conversations c ON c.id = h.conversation_id
+LEFT JOIN messages m ON m.id = h.message_id
+ORDER BY h.score DESC, h.conversation_id DESC, h.message_id
+"""
+
+
+def fts5_query(query: str) -> str | None:
+    """Turn free text into a safe FTS5 query: every word must match, the last as a prefix.
+
+    Quoting each token keeps FTS5 operators and punctuation in user input
+    from being parsed as query syntax.
+    """
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    quoted = [f'"{token}"' for token in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def render_snippet(snippet: str | None) -> str:
+    """HTML-escape a snippet and wrap its matches in <mark>."""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+async def search(session: AsyncSession, query: str, limit: int, offset: int) -> list[dict]:
+    """Ranked hits for one page; best match first."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        match = fts5_query(query)
+        if match is None:
+            return []
+        statement, params = _SQLITE_SEARCH, {"query": match}
+    elif dialect == "postgresql":
+        statement, params = _POSTGRES_SEARCH, {"query": query}
+    else:
+        raise NotImplementedError(f"Search does not support {dialect}")
+
+    result = await session.execute(text(statement), {**params, "limit": limit, "offset": offset})
+    return [
+        {
+            "kind": row.kind,
+            "conversation_id": row.conversation_id,
+            "message_id": row.message_id,
+            "role": row.role,
+            "model_name": row.model_name,
+            "title": row.title,
+            "snippet": render_snippet(row.snippet),
+            "rank": float(row.rank),
+        }
+        for row in result
+    ]
+
+
+async def create_index(conn: AsyncConnection) -> None:
+    """Create the search index structures for this dialect and fill them."""
+    if conn.dialect.name == "sqlite":
+        for statement in _SQLITE_SCHEMA:
+            await conn.execute(text(statement))
+        await rebuild_index(conn)
+    elif conn.dialect.name == "postgresql":
+        # Expression indexes are built from the table; nothing to rebuild
+        for statement in _POSTGRES_SCHEMA:
+            await conn.execute(text(statement))
+
+
+async def rebuild_index(conn: AsyncConnection) -> None:
+    """Repopulate the FTS5 tables from their content tables."""
+    if conn.dialect.name == "sqlite":
+        await conn.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+        await conn.execute(text("INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')"))
+    elif conn.dialect.name == "postgresql":
+        await conn.execute(text("REINDEX INDEX ix_messages_content_fts"))
+        await conn.execute(text("REINDEX INDEX ix_conversations_fts"))
+
+
+async def _main(command: str) -> None:
+    from app.database import engine
+
+    if command != "rebuild":
+        raise SystemExit(f"Unknown command: {command} (expected 'rebuild')")
+    async with engine.begin() as conn:
+        await rebuild_index(conn)
+    print("✓ Search index rebuilt")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "rebuild"))
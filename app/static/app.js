@@ -6,6 +6,20 @@ let providers = [];
 let totalTokens = 0;
 let messageCount = 0;
 
+// Messages of the open conversation, fetched in keyset pages
+const MESSAGE_PAGE_SIZE = 100;
+// Runs continue server-side when the stream drops; reattach this many times
+const RUN_REATTACH_ATTEMPTS = 5;
+let activeRunId = null; // Run the Stop button cancels
+let loadedMessages = [];
+let hasOlderMessages = false;
+let currentStarterMessage = null;
+// Count and tokens of messages not loaded yet, so stats cover the whole conversation
+let unloadedStats = { count: 0, tokens: 0 };
+// Participants speak as Model A, B, ... in order; matches the server's cap
+const MAX_PARTICIPANTS = 8;
+const DEFAULT_PARTICIPANT_PROVIDERS = ['anthropic', 'groq'];
+
 // Initialize
 document.addEventListener('DOMContentLoaded', async () => {
     initMatrixBackground();
@@ -298,59 +312,122 @@ async function loadProviders() {
     }
 }
 
-function populateModelSelects() {
-    const selects = ['new-model-a', 'new-model-b', 'new-model-c', 'edit-model-a', 'edit-model-b'];
-
-    selects.forEach(selectId => {
-        const select = document.getElementById(selectId);
-        if (!select) return;
-
-        // For model-c, keep the "None" option
-        if (selectId === 'new-model-c') {
-            select.innerHTML = '<option value="">None - 2-way conversation</option>';
-        } else {
-            select.innerHTML = '';
-        }
+function participantLabel(position) {
+    return String.fromCharCode(65 + position);
+}
 
-        providers.forEach(provider => {
-            if (!provider.configured) return;
+function fillModelSelect(select, preferredProvider) {
+    const previous = select.value;
+    select.innerHTML = '';
 
-            const optgroup = document.createElement('optgroup');
-            optgroup.label = `// ${provider.name.toUpperCase()}`;
+    providers.forEach(provider => {
+        if (!provider.configured) return;
 
-            provider.models.forEach(model => {
-                const option = document.createElement('option');
-                option.value = model.id;
-                option.textContent = model.name;
-                option.dataset.provider = provider.name;
-                optgroup.appendChild(option);
-            });
+        const optgroup = document.createElement('optgroup');
+        optgroup.label = `// ${provider.name.toUpperCase()}`;
 
-            select.appendChild(optgroup);
+        provider.models.forEach(model => {
+            const option = document.createElement('option');
+            option.value = model.id;
+            option.textContent = model.name;
+            option.dataset.provider = provider.name;
+            optgroup.appendChild(option);
         });
-    });
 
-    // Set defaults: Claude for A, Llama for B
-    const modelA = document.getElementById('new-model-a');
-    const modelB = document.getElementById('new-model-b');
+        select.appendChild(optgroup);
+    });
 
-    if (modelA && modelA.options.length > 0) {
-        for (let opt of modelA.options) {
-            if (opt.dataset?.provider === 'anthropic') {
-                modelA.value = opt.value;
-                break;
-            }
-        }
+    // Keep the current choice, else default to the preferred provider's first model
+    if (previous && [...select.options].some(opt => opt.value === previous)) {
+        select.value = previous;
+    } else if (preferredProvider) {
+        const preferred = [...select.options].find(opt => opt.dataset.provider === preferredProvider);
+        if (preferred) select.value = preferred.value;
     }
+}
 
-    if (modelB && modelB.options.length > 0) {
-        for (let opt of modelB.options) {
-            if (opt.dataset?.provider === 'groq') {
-                modelB.value = opt.value;
-                break;
-            }
-        }
+function populateModelSelects() {
+    const rows = document.querySelectorAll('#new-participants .participant-row');
+    if (rows.length === 0) {
+        resetParticipantRows();
+        return;
     }
+    rows.forEach(row => fillModelSelect(row.querySelector('.participant-model')));
+}
+
+// New-session form: one model and optional system prompt per participant
+function addParticipantRow(preferredProvider) {
+    const container = document.getElementById('new-participants');
+    if (container.children.length >= MAX_PARTICIPANTS) return;
+
+    const row = document.createElement('div');
+    row.className = 'participant-row';
+    row.innerHTML = `
+        <div class="form-group">
+            <label class="form-label participant-label">
+                <span class="participant-name"></span>
+                <button type="button" class="participant-remove" title="Remove">✕</button>
+            </label>
+            <select class="form-select participant-model"></select>
+        </div>
+        <div class="form-group">
+            <label class="form-label participant-system-label"></label>
+            <textarea class="form-textarea participant-system" placeholder="// optional instructions"></textarea>
+        </div>
+    `;
+    row.querySelector('.participant-remove').onclick = () => {
+        row.remove();
+        relabelParticipantRows();
+    };
+    fillModelSelect(row.querySelector('.participant-model'), preferredProvider);
+    container.appendChild(row);
+    relabelParticipantRows();
+}
+
+function relabelParticipantRows() {
+    const rows = document.querySelectorAll('#new-participants .participant-row');
+    rows.forEach((row, position) => {
+        const label = participantLabel(position);
+        row.querySelector('.participant-name').textContent = `Model ${label}`;
+        row.querySelector('.participant-system-label').textContent = `Model ${label} System`;
+        // A conversation needs at least two participants
+        row.querySelector('.participant-remove').style.display = position < 2 ? 'none' : '';
+    });
+    document.getElementById('add-participant-btn').disabled = rows.length >= MAX_PARTICIPANTS;
+}
+
+function resetParticipantRows() {
+    document.getElementById('new-participants').innerHTML = '';
+    DEFAULT_PARTICIPANT_PROVIDERS.forEach(provider => addParticipantRow(provider));
+}
+
+// Settings panel and inject targets for the open conversation
+function renderParticipants(participants) {
+    const container = document.getElementById('edit-participants');
+    container.innerHTML = '';
+    participants.forEach(participant => {
+        const label = participantLabel(participant.position);
+        const group = document.createElement('div');
+        group.className = 'form-group';
+        group.innerHTML = `
+            <label class="form-label">Model ${label}</label>
+            <input type="text" class="form-input" readonly>
+            <textarea class="form-textarea" readonly placeholder="null"></textarea>
+        `;
+        group.querySelector('input').value = participant.model;
+        group.querySelector('textarea').value = participant.system_prompt || '';
+        container.appendChild(group);
+    });
+
+    const target = document.getElementById('inject-target');
+    target.innerHTML = '';
+    participants.forEach(participant => {
+        const label = participantLabel(participant.position);
+        const option = document.createElement('option');
+        option.value = `user_to_${label.toLowerCase()}`;
+        option.textContent = `Model ${label} (the others will respond)`;
+        target.appendChild(option);
+    });
 }
 
 // Load conversations
@@ -386,7 +463,7 @@ async function loadConversations() {
 
             item.innerHTML = `
                 <div class="conversation-title">${escapeHtml(conv.title)}</div>
-                <div class="conversation-meta">[${String(index).padStart(2, '0')}] ${date} // ${conv.model_a.split('-')[0]}↔${conv.model_b.split('-')[0]}</div>
+                <div class="conversation-meta">[${String(index).padStart(2, '0')}] ${date} // ${conv.participants.map(p => p.model.split('-')[0]).join('↔')} // ${conv.message_count} msg</div>
             `;
 
             item.onclick = () => selectConversation(conv.id);
@@ -416,34 +493,135 @@ async function selectConversation(id) {
 
     // Load conversation details
     try {
-        const [convResponse, messagesResponse] = await Promise.all([
+        const [convResponse, messages] = await Promise.all([
             fetch(`/api/conversations/${id}`),
-            fetch(`/api/conversations/${id}/messages`)
+            fetchMessages(id, { limit: MESSAGE_PAGE_SIZE })
         ]);
 
         const conversation = await convResponse.json();
-        const messages = await messagesResponse.json();
+        loadedMessages = messages;
+        hasOlderMessages = messages.length === MESSAGE_PAGE_SIZE;
+        currentStarterMessage = conversation.starter_message;
+        unloadedStats = {
+            count: conversation.message_count - messages.length,
+            tokens: conversation.total_tokens - sumTokens(messages)
+        };
 
         // Update header
         document.getElementById('chat-title').textContent = conversation.title;
 
         // Update settings panel
-        document.getElementById('edit-model-a').value = conversation.model_a;
-        document.getElementById('edit-model-b').value = conversation.model_b;
-        document.getElementById('edit-system-a').value = conversation.system_prompt_a || '';
-        document.getElementById('edit-system-b').value = conversation.system_prompt_b || '';
+        renderParticipants(conversation.participants);
         document.getElementById('edit-starter').value = conversation.starter_message;
 
         // Update stats
-        updateStats(messages);
+        updateStats(loadedMessages);
 
         // Render messages (this will clear empty state automatically)
-        renderMessages(messages, conversation.starter_message);
+        renderMessages(loadedMessages, currentStarterMessage);
     } catch (error) {
         console.error('Failed to load conversation:', error);
     }
 }
 
+// Full-text search in the sidebar; an empty query restores the session list
+let searchTimer = null;
+
+function onSearchInput(event) {
+    clearTimeout(searchTimer);
+    const query = event.target.value.trim();
+    searchTimer = setTimeout(() => runSearch(query), 250);
+}
+
+async function runSearch(query) {
+    if (!query) {
+        await loadConversations();
+        return;
+    }
+
+    try {
+        const params = new URLSearchParams({ q: query, limit: 30 });
+        const response = await fetch(`/api/search?${params}`);
+        const data = await response.json();
+
+        const list = document.getElementById('conversation-list');
+        list.innerHTML = '';
+
+        if (!data.results || data.results.length === 0) {
+            list.innerHTML = `
+                <div class="empty-state" style="padding: 2rem 1rem;">
+                    <div style="font-size: 0.7rem; color: var(--text-dim);">// no matches</div>
+                </div>
+            `;
+            return;
+        }
+
+        data.results.forEach(hit => {
+            const item = document.createElement('div');
+            item.className = 'conversation-item';
+            item.dataset.id = hit.conversation_id;
+            if (hit.conversation_id === currentConversationId) {
+                item.classList.add('active');
+            }
+
+            const source = hit.kind === 'message' ? `${hit.role} // ${hit.model_name}` : 'title / starter';
+            // Snippets arrive HTML-escaped from the server, with matches in <mark>
+            item.innerHTML = `
+                <div class="conversation-title">${escapeHtml(hit.title || 'Untitled')}</div>
+                <div class="conversation-meta">${escapeHtml(source)}</div>
+                <div class="search-snippet">${hit.snippet}</div>
+            `;
+
+            item.onclick = () => selectConversation(hit.conversation_id);
+            list.appendChild(item);
+        });
+    } catch (error) {
+        console.error('Search failed:', error);
+    }
+}
+
+// Fetch a page of messages; params are limit / before_id / after_id
+async function fetchMessages(conversationId, params = {}) {
+    const query = new URLSearchParams(params).toString();
+    const response = await fetch(`/api/conversations/${conversationId}/messages?${query}`);
+    return response.json();
+}
+
+// Prepend the page of messages older than the oldest one loaded
+async function loadOlderMessages() {
+    if (!currentConversationId || !loadedMessages.length) return;
+
+    const container = document.getElementById('messages-container');
+    const previousHeight = container.scrollHeight;
+    const older = await fetchMessages(currentConversationId, {
+        limit: MESSAGE_PAGE_SIZE,
+        before_id: loadedMessages[0].id
+    });
+
+    loadedMessages = older.concat(loadedMessages);
+    hasOlderMessages = older.length === MESSAGE_PAGE_SIZE;
+    unloadedStats = {
+        count: Math.max(unloadedStats.count - older.length, 0),
+        tokens: Math.max(unloadedStats.tokens - sumTokens(older), 0)
+    };
+    updateStats(loadedMessages);
+    renderMessages(loadedMessages, currentStarterMessage);
+    // Keep the viewport on the messages the user was reading
+    container.scrollTop = container.scrollHeight - previousHeight;
+}
+
+// Append only the messages created since the newest one loaded
+async function syncNewMessages() {
+    if (!currentConversationId) return;
+
+    const lastId = loadedMessages.length ? loadedMessages[loadedMessages.length - 1].id : 0;
+    const newer = await fetchMessages(currentConversationId, { after_id: lastId });
+
+    loadedMessages = loadedMessages.concat(newer);
+    updateStats(loadedMessages);
+    renderMessages(loadedMessages, currentStarterMessage);
+}
+
 // Clear/deselect current conversation - go back to empty state
 function clearSelection() {
     currentConversationId = null;
@@ -470,6 +648,9 @@ function clearSelection() {
     // Reset stats
     totalTokens = 0;
     messageCount = 0;
+    loadedMessages = [];
+    hasOlderMessages = false;
+    unloadedStats = { count: 0, tokens: 0 };
 }
 
 // Close settings panel without clearing conversation
@@ -477,9 +658,13 @@ function closeSettingsPanel() {
     document.getElementById('settings-panel').style.display = 'none';
 }
 
+function sumTokens(messages) {
+    return messages.reduce((sum, m) => sum + (m.token_count || 0), 0);
+}
+
 function updateStats(messages) {
-    messageCount = messages.length;
-    totalTokens = messages.reduce((sum, m) => sum + (m.token_count || 0), 0);
+    messageCount = messages.length + unloadedStats.count;
+    totalTokens = sumTokens(messages) + unloadedStats.tokens;
 
     const msgEl = document.getElementById('stat-messages');
     const tokEl = document.getElementById('stat-tokens');
@@ -520,6 +705,14 @@ function renderMessages(messages, starterMessage) {
         container.appendChild(starterDiv);
     }
 
+    if (hasOlderMessages) {
+        const olderBtn = document.createElement('button');
+        olderBtn.className = 'btn load-older-btn';
+        olderBtn.textContent = '↑ Load earlier messages';
+        olderBtn.onclick = loadOlderMessages;
+        container.appendChild(olderBtn);
+    }
+
     // Render conversation messages
     messages.forEach((msg, index) => {
         const div = document.createElement('div');
@@ -543,12 +736,39 @@ function renderMessages(messages, starterMessage) {
     container.scrollTop = container.scrollHeight;
 }
 
+// Read an NDJSON response, passing each parsed event to onEvent
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = ''; // Holds a partial NDJSON line between reads
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+
+        for (const line of lines) {
+            if (!line.trim()) continue;
+            try {
+                onEvent(JSON.parse(line));
+            } catch (e) {
+                console.error('Parse error:', e);
+            }
+        }
+    }
+}
+
 // Run conversation
 async function runConversation() {
     if (!currentConversationId) return;
 
     const turns = parseInt(document.getElementById('turns').value) || 5;
+    const mode = document.getElementById('run-mode').value;
     const runBtn = document.getElementById('run-btn');
+    const stopBtn = document.getElementById('stop-btn');
     const loading = document.getElementById('loading');
 
     runBtn.disabled = true;
@@ -556,10 +776,10 @@ async function runConversation() {
     loading.style.display = 'flex';
 
     try {
-        const response = await fetch(`/api/conversations/${currentConversationId}/run`, {
+        let response = await fetch(`/api/conversations/${currentConversationId}/run`, {
             method: 'POST',
             headers: getApiHeaders(),
-            body: JSON.stringify({ conversation_id: currentConversationId, turns })
+            body: JSON.stringify({ conversation_id: currentConversationId, turns, stream: true, mode })
         });
 
         if (!response.ok) {
@@ -579,105 +799,141 @@ async function runConversation() {
             return;
         }
 
-        const reader = response.body.getReader();
-        const decoder = new TextDecoder();
         const container = document.getElementById('messages-container');
+        const runId = response.headers.get('X-Run-Id');
+        activeRunId = runId;
+        if (runId) stopBtn.style.display = '';
 
         let messageDivsByRole = {}; // Track message divs by role
         let localMsgCount = messageCount;
+        let lastEventId = 0; // Resume point if the stream drops
+        let runFinished = false;
+
+        const handleEvent = (event) => {
+            if (event.id) lastEventId = event.id;
+            if (event.type === 'done') runFinished = true;
+
+            if (event.type === 'start') {
+                localMsgCount++;
+                const messageDiv = document.createElement('div');
+                messageDiv.className = `message message-${event.role.replace('_', '-')}`;
+                messageDiv.innerHTML = `
+                    <div class="message-header">
+                        <span class="message-model">${createAvatarHTML()}${event.model.split('-').slice(0, 2).join(' ')}</span>
+                        <span class="message-tokens">#${String(localMsgCount).padStart(2, '0')}</span>
+                    </div>
+                    <div class="message-content">
+                        <div class="loading">
+                            <span>generating</span>
+                            <div class="loading-dots"><span></span><span></span><span></span></div>
+                        </div>
+                    </div>
+                `;
+                container.appendChild(messageDiv);
+                container.scrollTop = container.scrollHeight;
+
+                // Track this message div by its role
+                messageDivsByRole[event.role] = { div: messageDiv, count: localMsgCount };
+            }
 
-        while (true) {
-            const { done, value } = await reader.read();
-            if (done) break;
-
-            const lines = decoder.decode(value).split('\n').filter(l => l.trim());
-
-            for (const line of lines) {
-                try {
-                    const event = JSON.parse(line);
-
-                    if (event.type === 'start') {
-                        localMsgCount++;
-                        const messageDiv = document.createElement('div');
-                        messageDiv.className = `message message-${event.role.replace('_', '-')}`;
-                        messageDiv.innerHTML = `
-                            <div class="message-header">
-                                <span class="message-model">${createAvatarHTML()}${event.model.split('-').slice(0, 2).join(' ')}</span>
-                                <span class="message-tokens">#${String(localMsgCount).padStart(2, '0')}</span>
-                            </div>
-                            <div class="message-content">
-                                <div class="loading">
-                                    <span>generating</span>
-                                    <div class="loading-dots"><span></span><span></span><span></span></div>
-                                </div>
-                            </div>
-                        `;
-                        container.appendChild(messageDiv);
-                        container.scrollTop = container.scrollHeight;
-
-                        // Track this message div by its role
-                        messageDivsByRole[event.role] = { div: messageDiv, count: localMsgCount };
-                    }
-
-                    if (event.type === 'message') {
-                        const messageData = messageDivsByRole[event.role];
-                        if (messageData) {
-                            const content = messageData.div.querySelector('.message-content');
-                            const tokens = messageData.div.querySelector('.message-tokens');
-                            content.textContent = event.content;
-                            tokens.textContent = `#${String(messageData.count).padStart(2, '0')} ${event.tokens || 0} tok`;
-                            container.scrollTop = container.scrollHeight;
-
-                            // Update stats
-                            totalTokens += event.tokens || 0;
-                            const tokEl = document.getElementById('stat-tokens');
-                            const msgEl = document.getElementById('stat-messages');
-                            if (tokEl) tokEl.textContent = totalTokens.toLocaleString();
-                            if (msgEl) msgEl.textContent = localMsgCount;
-                        }
+            if (event.type === 'delta') {
+                const messageData = messageDivsByRole[event.role];
+                if (messageData) {
+                    const content = messageData.div.querySelector('.message-content');
+                    if (!messageData.streamed) {
+                        content.textContent = '';
+                        messageData.streamed = true;
                     }
+                    content.textContent += event.content;
+                    container.scrollTop = container.scrollHeight;
+                }
+            }
 
-                    if (event.type === 'error') {
-                        console.error('Stream error:', event.error);
-                        // Create error message div if none exists
-                        const errorDiv = document.createElement('div');
-                        errorDiv.className = 'message message-model-a';
-                        errorDiv.innerHTML = `
-                            <div class="message-header">
-                                <span class="message-model">${createAvatarHTML()}System</span>
-                                <span class="message-tokens">error</span>
-                            </div>
-                            <div class="message-content" style="color: var(--purple-primary);">⚠ ${escapeHtml(event.error)}</div>
-                        `;
-                        container.appendChild(errorDiv);
-                        container.scrollTop = container.scrollHeight;
-                    }
-                } catch (e) {
-                    console.error('Parse error:', e);
+            if (event.type === 'message') {
+                const messageData = messageDivsByRole[event.role];
+                if (messageData) {
+                    const content = messageData.div.querySelector('.message-content');
+                    const tokens = messageData.div.querySelector('.message-tokens');
+                    content.textContent = event.content;
+                    tokens.textContent = `#${String(messageData.count).padStart(2, '0')} ${event.tokens || 0} tok${event.truncated ? ' · truncated' : ''}`;
+                    container.scrollTop = container.scrollHeight;
+
+                    // Update stats
+                    totalTokens += event.tokens || 0;
+                    const tokEl = document.getElementById('stat-tokens');
+                    const msgEl = document.getElementById('stat-messages');
+                    if (tokEl) tokEl.textContent = totalTokens.toLocaleString();
+                    if (msgEl) msgEl.textContent = localMsgCount;
                 }
             }
-        }
 
-        messageCount = localMsgCount;
+            if (event.type === 'error') {
+                console.error('Stream error:', event.error);
+                // Create error message div if none exists
+                const errorDiv = document.createElement('div');
+                errorDiv.className = 'message message-model-a';
+                errorDiv.innerHTML = `
+                    <div class="message-header">
+                        <span class="message-model">${createAvatarHTML()}System</span>
+                        <span class="message-tokens">error</span>
+                    </div>
+                    <div class="message-content" style="color: var(--purple-primary);">⚠ ${escapeHtml(event.error)}</div>
+                `;
+                container.appendChild(errorDiv);
+                container.scrollTop = container.scrollHeight;
+            }
+        };
 
-        // Reload messages from database to ensure everything is in sync
-        const messagesResponse = await fetch(`/api/conversations/${currentConversationId}/messages`);
-        const messages = await messagesResponse.json();
+        for (let attempt = 0; ; attempt++) {
+            try {
+                if (response) await readEventStream(response, handleEvent);
+            } catch (error) {
+                console.warn('Run stream dropped:', error);
+            }
+            if (runFinished || !runId || attempt >= RUN_REATTACH_ATTEMPTS) break;
+
+            // The run keeps going server-side; pick up after the last event we saw
+            await new Promise(resolve => setTimeout(resolve, 1000 * (attempt + 1)));
+            try {
+                response = await fetch(`/api/runs/${runId}/events`, {
+                    headers: { 'Last-Event-ID': String(lastEventId) }
+                });
+                if (!response.ok) break;
+            } catch (error) {
+                console.warn('Reattach failed:', error);
+                response = null;
+            }
+        }
 
-        const convResponse = await fetch(`/api/conversations/${currentConversationId}`);
-        const conversation = await convResponse.json();
+        messageCount = localMsgCount;
 
-        updateStats(messages);
-        renderMessages(messages, conversation.starter_message);
+        // Fetch just the persisted messages from this run to stay in sync
+        await syncNewMessages();
     } catch (error) {
         console.error('Run failed:', error);
     } finally {
+        activeRunId = null;
+        stopBtn.style.display = 'none';
+        stopBtn.disabled = false;
         runBtn.disabled = false;
         runBtn.style.opacity = '1';
         loading.style.display = 'none';
     }
 }
 
+// Stop the running conversation; a reply in progress is kept as a truncated message
+async function cancelRun() {
+    if (!activeRunId) return;
+    const stopBtn = document.getElementById('stop-btn');
+    stopBtn.disabled = true;
+    try {
+        await fetch(`/api/runs/${activeRunId}/cancel`, { method: 'POST' });
+    } catch (error) {
+        console.error('Cancel failed:', error);
+        stopBtn.disabled = false;
+    }
+}
+
 // Create new conversation
 let isCreatingConversation = false;
 
@@ -685,18 +941,21 @@ async function createConversation() {
     // Prevent duplicate submissions
     if (isCreatingConversation) return;
 
-    const modelC = document.getElementById('new-model-c').value;
+    const participants = [...document.querySelectorAll('#new-participants .participant-row')].map(row => ({
+        model: row.querySelector('.participant-model').value,
+        system_prompt: row.querySelector('.participant-system').value || null
+    }));
     const data = {
         title: document.getElementById('new-title').value || 'unnamed_session',
-        model_a: document.getElementById('new-model-a').value,
-        model_b: document.getElementById('new-model-b').value,
-        model_c: modelC || null,
-        system_prompt_a: document.getElementById('new-system-a').value || null,
-        system_prompt_b: document.getElementById('new-system-b').value || null,
-        system_prompt_c: modelC ? (document.getElementById('new-system-c').value || null) : null,
+        participants,
         starter_message: document.getElementById('new-starter').value
     };
 
+    if (participants.some(p => !p.model)) {
+        alert('// ERROR: Select a model for every participant');
+        return;
+    }
+
     if (!data.starter_message) {
         alert('// ERROR: Init prompt required');
         return;
@@ -718,10 +977,7 @@ async function createConversation() {
 
         // Reset form
         document.getElementById('new-title').value = '';
-        document.getElementById('new-system-a').value = '';
-        document.getElementById('new-system-b').value = '';
-        document.getElementById('new-system-c').value = '';
-        document.getElementById('new-model-c').value = '';
+        resetParticipantRows();
         document.getElementById('new-starter').value = 'What is it like being you?';
     } catch (error) {
         console.error('Failed to create conversation:', error);
@@ -773,100 +1029,26 @@ function closeExportModal() {
     document.getElementById('export-modal').classList.remove('active');
 }
 
-async function exportConversation() {
-    if (!currentConversationId) return;
-
+// Exports are produced and streamed by the server; the browser just downloads the file
+function exportConversation() {
     const format = document.getElementById('export-format').value;
-
-    try {
-        const [convResponse, messagesResponse] = await Promise.all([
-            fetch(`/api/conversations/${currentConversationId}`, { headers: getApiHeaders() }),
-            fetch(`/api/conversations/${currentConversationId}/messages`, { headers: getApiHeaders() })
-        ]);
-
-        if (!convResponse.ok || !messagesResponse.ok) {
-            console.error('Export fetch failed:', convResponse.status, messagesResponse.status);
-            alert('Export failed - could not fetch conversation data');
-            return;
-        }
-
-        const conversation = await convResponse.json();
-        const messages = await messagesResponse.json();
-
-        let content, mimeType, extension;
-
-        if (format === 'json') {
-            const exportData = {
-                meta: {
-                    framework: 'Neural Discourse',
-                    version: '0.1.0',
-                    exported_at: new Date().toISOString()
-                },
-                session: conversation,
-                messages: messages || [],
-                stats: {
-                    total_messages: (messages || []).length,
-                    total_tokens: (messages || []).reduce((sum, m) => sum + (m.token_count || 0), 0)
-                }
-            };
-            content = JSON.stringify(exportData, null, 2);
-            mimeType = 'application/json;charset=utf-8';
-            extension = 'json';
-        } else if (format === 'txt') {
-            content = `Neural Discourse - Conversation Export\n`;
-            content += `Title: ${conversation.title}\n`;
-            content += `Exported: ${new Date().toISOString()}\n`;
-            content += `${'='.repeat(60)}\n\n`;
-            content += `INIT: ${conversation.starter_message}\n\n`;
-            messages.forEach((msg, i) => {
-                content += `[${msg.role.toUpperCase()}] ${msg.model_name}\n`;
-                content += `${msg.content}\n\n`;
-            });
-            mimeType = 'text/plain;charset=utf-8';
-            extension = 'txt';
-        } else if (format === 'md') {
-            content = `# ${conversation.title}\n\n`;
-            content += `**Exported:** ${new Date().toISOString()}\n\n`;
-            content += `## Configuration\n\n`;
-            content += `- **Model A:** ${conversation.model_a}\n`;
-            content += `- **Model B:** ${conversation.model_b}\n\n`;
-            content += `## Conversation\n\n`;
-            content += `### INIT\n\n${conversation.starter_message}\n\n`;
-            messages.forEach((msg, i) => {
-                const role = msg.role === 'model_a' ? 'A' : 'B';
-                content += `### ${role} - ${msg.model_name}\n\n${msg.content}\n\n`;
-            });
-            mimeType = 'text/markdown;charset=utf-8';
-            extension = 'md';
-        } else if (format === 'csv') {
-            content = 'Index,Role,Model,Tokens,Content\n';
-            content += `0,INIT,human,0,"${conversation.starter_message.replace(/"/g, '""')}"\n`;
-            messages.forEach((msg, i) => {
-                const csvContent = msg.content.replace(/"/g, '""').replace(/\n/g, ' ');
-                content += `${i + 1},${msg.role},${msg.model_name},${msg.token_count || 0},"${csvContent}"\n`;
-            });
-            mimeType = 'text/csv;charset=utf-8';
-            extension = 'csv';
-        }
-
-        const blob = new Blob([content], { type: mimeType });
-        const url = URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = `neural-discourse_${conversation.id}_${Date.now()}.${extension}`;
-        a.style.display = 'none';
-        document.body.appendChild(a);
-        a.click();
-        setTimeout(() => {
-            document.body.removeChild(a);
-            URL.revokeObjectURL(url);
-        }, 100);
-
-        closeExportModal();
-    } catch (error) {
-        console.error('Export failed:', error);
-        alert('Export failed: ' + error.message);
-    }
+    const scope = document.getElementById('export-scope').value;
+    if (scope === 'current' && !currentConversationId) return;
+
+    const params = new URLSearchParams({ format });
+    const url = scope === 'all'
+        ? `/api/conversations/export?${params}`
+        : `/api/conversations/${currentConversationId}/export?${params}`;
+
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = '';
+    a.style.display = 'none';
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+
+    closeExportModal();
 }
 
 // Mobile Sessions Drawer
@@ -993,7 +1175,7 @@ async function injectMessage() {
         }
 
         closeInjectModal();
-        await selectConversation(currentConversationId);
+        await syncNewMessages();
         alert('// Message injected successfully');
     } catch (error) {
         console.error('Failed to inject message:', error);
@@ -1160,6 +1342,9 @@ let historyEdges = [];
 let historyAnimationId = null;
 let hoveredNode = null;
 
+// Keywords per conversation node; shared keywords become edges
+const HISTORY_KEYWORDS = 5;
+
 async function initHistoryVisualization() {
     const canvas = document.getElementById('history-canvas');
     if (!canvas) return;
@@ -1178,51 +1363,25 @@ async function initHistoryVisualization() {
 
     // Fetch conversations
     try {
-        const response = await fetch('/api/conversations/', {
-            headers: getApiHeaders()
-        });
-        const conversations = await response.json();
+        // Aggregates and every conversation's top terms, fetched side by side
+        const [conversations, keywordEntries] = await Promise.all([
+            fetch('/api/conversations/', { headers: getApiHeaders() }).then(r => r.json()),
+            fetch(`/api/conversations/keywords?k=${HISTORY_KEYWORDS}`, { headers: getApiHeaders() }).then(r => r.json())
+        ]);
 
         if (conversations.length === 0) {
             drawEmptyState(ctx, canvas);
             return;
         }
 
-        // Fetch messages for each conversation to build nodes
-        const nodes = [];
-        const stopWords = new Set(['the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-            'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might',
-            'must', 'shall', 'can', 'need', 'dare', 'ought', 'used', 'to', 'of', 'in', 'for', 'on', 'with',
-            'at', 'by', 'from', 'as', 'into', 'through', 'during', 'before', 'after', 'above', 'below',
-            'between', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why',
-            'how', 'all', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only',
-            'own', 'same', 'so', 'than', 'too', 'very', 'just', 'and', 'but', 'if', 'or', 'because', 'until',
-            'while', 'although', 'what', 'which', 'who', 'this', 'that', 'these', 'those', 'am', 'it', 'its',
-            'i', 'you', 'he', 'she', 'we', 'they', 'my', 'your', 'his', 'her', 'our', 'their', 'me', 'him',
-            'us', 'them', 'about', 'like', 'also', 'well', 'even', 'really', 'think', 'know', 'say', 'get']);
-
-        for (const conv of conversations) {
-            const msgResponse = await fetch(`/api/conversations/${conv.id}/messages`, {
-                headers: getApiHeaders()
-            });
-            const messages = await msgResponse.json();
-
-            // Extract keywords from messages
-            const allText = messages.map(m => m.content).join(' ').toLowerCase();
-            const words = allText.match(/\b[a-z]{4,}\b/g) || [];
-            const wordCounts = {};
-
-            words.forEach(word => {
-                if (!stopWords.has(word)) {
-                    wordCounts[word] = (wordCounts[word] || 0) + 1;
-                }
-            });
+        const keywordsById = {};
+        keywordEntries.forEach(entry => {
+            keywordsById[entry.conversation_id] = entry.keywords;
+        });
 
-            // Get top 5 keywords
-            const keywords = Object.entries(wordCounts)
-                .sort((a, b) => b[1] - a[1])
-                .slice(0, 5)
-                .map(([word]) => word);
+        const nodes = [];
+        conversations.forEach(conv => {
+            const keywords = keywordsById[conv.id] || [];
 
             // Calculate age (for color)
             const createdAt = new Date(conv.created_at);
@@ -1233,15 +1392,15 @@ async function initHistoryVisualization() {
                 id: conv.id,
                 title: conv.title || 'Untitled',
                 keywords: keywords,
-                messageCount: messages.length,
+                messageCount: conv.message_count,
                 age: Math.min(age / maxAge, 1),
                 x: Math.random() * (canvas.width - 100) + 50,
                 y: Math.random() * (canvas.height - 100) + 50,
                 vx: 0,
                 vy: 0,
-                radius: Math.min(10 + messages.length * 2, 30)
+                radius: Math.min(10 + conv.message_count * 2, 30)
             });
-        }
+        });
 
         // Build edges based on shared keywords (1+ shared for neural network look)
         const edges = [];
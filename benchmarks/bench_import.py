@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Cold-start import cost of the app.
+
+Imports app.main in fresh interpreters under `python -X importtime` and
+reports the median total, the slowest top-level packages, and whether any
+provider SDK was loaded at startup.
+
+    python benchmarks/bench_import.py --repeat 5
+    python benchmarks/bench_import.py --compare benchmarks/results/import-<older>.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Provider SDKs that should stay out of startup
+SDK_PACKAGES = ("anthropic", "groq", "openai", "google.genai")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_once(module: str) -> tuple[float, dict[str, int]]:
+    """Return (total microseconds, cumulative microseconds per imported module)."""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        cumulative = int(cumulative_us)
+        # Nesting is shown by indentation; top-level entries sum to the total
+        if len(raw_name) - len(raw_name.lstrip()) == 1:
+            total += cumulative
+        modules[name] = cumulative
+    return total, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="defaults to benchmarks/results/import-<commit>.json")
+    parser.add_argument("--compare", type=Path, help="earlier result file to diff against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="growth that counts as a regression")
+    args = parser.parse_args()
+
+    totals = []
+    per_module = defaultdict(list)
+    for _ in range(args.repeat):
+        total, modules = measure_once(args.module)
+        totals.append(total)
+        for name, cumulative in modules.items():
+            per_module[name].append(cumulative)
+
+    medians = {name: statistics.median(values) for name, values in per_module.items()}
+    top_level = {name: us for name, us in medians.items() if "." not in name}
+    slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[: args.top]
+    sdks_loaded = [sdk for sdk in SDK_PACKAGES if sdk in medians]
+
+    results = {
+        "median_total_ms": statistics.median(totals) / 1000,
+        "min_total_ms": min(totals) / 1000,
+        "slowest_packages_ms": {name: us / 1000 for name, us in slowest},
+        "provider_sdks_loaded": sdks_loaded,
+    }
+    commit = git_commit()
+    report = {
+        "benchmark": "import_time",
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {"module": args.module, "repeat": args.repeat},
+        "results": results,
+    }
+
+    output = args.output or ROOT / "benchmarks" / "results" / f"import-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        before = json.loads(args.compare.read_text())["results"]["median_total_ms"]
+        after = results["median_total_ms"]
+        change = (after - before) / before
+        print(f"\nmedian import {before:.1f} -> {after:.1f} ms ({change:+.1%})")
+        if change > args.threshold:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""End-to-end load benchmark for the /run pipeline.
+
+Starts the app in-process under uvicorn against the mock provider and a
+throwaway SQLite database, drives concurrent streaming runs alongside
+background /messages reads and /inject-message writes, and writes the
+results to JSON.
+
+    python benchmarks/bench_run.py --conversations 20 --turns 6
+    python benchmarks/bench_run.py --compare benchmarks/results/<older>.json
+
+To see what the SQLite profile buys under read/write contention, run once
+with --sqlite-profile off and compare a default run against it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values: list[float]) -> dict:
+    """Latency summary in milliseconds."""
+    ms = [v * 1000 for v in values]
+    return {
+        "count": len(ms),
+        "mean": statistics.fmean(ms) if ms else None,
+        "p50": percentile(ms, 50),
+        "p95": percentile(ms, 95),
+        "p99": percentile(ms, 99),
+        "max": max(ms) if ms else None,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure_environment(args, db_path: str) -> None:
+    """Must run before the app is imported: settings are read once."""
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ["MOCK_PROVIDER_ENABLED"] = "true"
+    os.environ["MOCK_SEED"] = str(args.seed)
+    os.environ["MOCK_TTFT_MS"] = str(args.ttft_ms)
+    os.environ["MOCK_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    os.environ["MOCK_REPLY_TOKENS_MEAN"] = str(args.reply_tokens)
+    os.environ["MOCK_ERROR_RATE"] = str(args.error_rate)
+    os.environ["MOCK_RATE_LIMIT_RATE"] = str(args.rate_limit_rate)
+    os.environ["SQLITE_PROFILE_ENABLED"] = "true" if args.sqlite_profile == "on" else "false"
+
+
+class DBTimings:
+    """Times write statements and commits on the app's engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.writes: list[float] = []
+        self.commits: list[float] = []
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("bench_start", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["bench_start"].pop()
+            if statement.lstrip().split(" ", 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+                self.writes.append(time.perf_counter() - started)
+
+        # Commits are where SQLite syncs to disk; there is no after-commit event
+        dialect = sync_engine.dialect
+        do_commit = dialect.do_commit
+
+        def timed_commit(dbapi_connection):
+            started = time.perf_counter()
+            try:
+                do_commit(dbapi_connection)
+            finally:
+                self.commits.append(time.perf_counter() - started)
+
+        dialect.do_commit = timed_commit
+
+
+async def drive_run(client, conversation_id: int, turns: int, stats: dict) -> None:
+    started = time.perf_counter()
+    first_byte = None
+    turn_started = None
+    first_delta = None
+    async with client.stream(
+        "POST",
+        f"/api/conversations/{conversation_id}/run",
+        json={"conversation_id": conversation_id, "turns": turns, "stream": True},
+    ) as response:
+        async for line in response.aiter_lines():
+            now = time.perf_counter()
+            if first_byte is None:
+                first_byte = now
+                stats["ttfb"].append(now - started)
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event["type"] == "start":
+                turn_started, first_delta = now, None
+            elif event["type"] == "delta" and first_delta is None:
+                first_delta = now
+                stats["ttft"].append(now - turn_started)
+            elif event["type"] == "message":
+                stats["turn"].append(now - turn_started)
+                stats["turns_completed"] += 1
+            elif event["type"] == "error":
+                stats["errors"] += 1
+    stats["run"].append(time.perf_counter() - started)
+
+
+async def background_reads(client, conversation_ids: list[int], interval: float, stop: asyncio.Event, stats: dict):
+    i = 0
+    while not stop.is_set():
+        conversation_id = conversation_ids[i % len(conversation_ids)]
+        started = time.perf_counter()
+        response = await client.get(f"/api/conversations/{conversation_id}/messages")
+        response.raise_for_status()
+        stats["read"].append(time.perf_counter() - started)
+        i += 1
+        await asyncio.sleep(interval)
+
+
+async def background_writes(client, conversation_ids: list[int], interval: float, stop: asyncio.Event, stats: dict):
+    i = 0
+    while not stop.is_set():
+        conversation_id = conversation_ids[i % len(conversation_ids)]
+        started = time.perf_counter()
+        response = await client.post(
+            f"/api/conversations/{conversation_id}/inject-message",
+            json={"content": f"benchmark injection {i}", "role": "user_to_a"},
+        )
+        response.raise_for_status()
+        stats["inject"].append(time.perf_counter() - started)
+        i += 1
+        await asyncio.sleep(interval)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def benchmark(args) -> dict:
+    import httpx
+    import uvicorn
+    from app.main import app
+    from app.database import engine
+    from app.routes import conversations
+
+    # The per-IP API limits would throttle the load generator itself
+    app.state.limiter.enabled = False
+    conversations.limiter.enabled = False
+    timings = DBTimings(engine)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    stats = {
+        "ttfb": [], "ttft": [], "turn": [], "run": [], "read": [], "inject": [],
+        "turns_completed": 0, "errors": 0,
+    }
+    limits = httpx.Limits(max_connections=args.conversations + 8)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits
+    ) as client:
+        conversation_ids = []
+        for i in range(args.conversations):
+            response = await client.post("/api/conversations/", json={
+                "title": f"bench {i}",
+                "participants": [{"model": "mock-fast"}, {"model": args.model_b}],
+                "starter_message": "Is a benchmark ever representative?",
+            })
+            response.raise_for_status()
+            conversation_ids.append(response.json()["id"])
+
+        stop = asyncio.Event()
+        background = []
+        for _ in range(args.readers):
+            background.append(asyncio.create_task(
+                background_reads(client, conversation_ids, args.read_interval, stop, stats)))
+        for _ in range(args.writers):
+            background.append(asyncio.create_task(
+                background_writes(client, conversation_ids, args.write_interval, stop, stats)))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(drive_run(client, cid, args.turns, stats) for cid in conversation_ids))
+        wall = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*background)
+        # Turn admission: queue depth is back to zero by now, but the wait times are kept
+        scheduler = (await client.get("/api/runs/scheduler")).json()
+
+    server.should_exit = True
+    await server_task
+
+    return {
+        "wall_seconds": wall,
+        "turns_completed": stats["turns_completed"],
+        "errors": stats["errors"],
+        "throughput_turns_per_second": stats["turns_completed"] / wall if wall else None,
+        "latency_ms": {
+            "time_to_first_byte": summarize(stats["ttfb"]),
+            "time_to_first_token": summarize(stats["ttft"]),
+            "turn": summarize(stats["turn"]),
+            "run": summarize(stats["run"]),
+            "messages_read": summarize(stats["read"]),
+            "inject_write": summarize(stats["inject"]),
+            "sqlite_write_statement": summarize(timings.writes),
+            "sqlite_commit": summarize(timings.commits),
+        },
+        "scheduler": {
+            "admitted": scheduler["admitted"],
+            "max_in_flight": scheduler["max_in_flight"],
+            "wait_ms": scheduler["wait_ms"],
+        },
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return regressions where a p95 latency grew by more than threshold."""
+    regressions = []
+    for name, summary in current["results"]["latency_ms"].items():
+        before = baseline.get("results", {}).get("latency_ms", {}).get(name, {}).get("p95")
+        after = summary.get("p95")
+        if before and after:
+            change = (after - before) / before
+            print(f"  {name:24} p95 {before:9.2f} -> {after:9.2f} ms ({change:+.1%})")
+            if change > threshold:
+                regressions.append(name)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=10, help="concurrent /run streams")
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--model-b", default="mock-fast", choices=["mock-fast", "mock-slow"])
+    parser.add_argument("--readers", type=int, default=2, help="background /messages pollers")
+    parser.add_argument("--read-interval", type=float, default=0.05)
+    parser.add_argument("--writers", type=int, default=1, help="background /inject-message writers")
+    parser.add_argument("--write-interval", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ttft-ms", type=float, default=50)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--sqlite-profile", choices=["on", "off"], default="on",
+                        help="apply the SQLite pragmas from Settings (off: SQLite defaults)")
+    parser.add_argument("--output", type=Path, help="defaults to benchmarks/results/run-<commit>.json")
+    parser.add_argument("--compare", type=Path, help="earlier result file to diff p95 latencies against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p95 growth that counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(args, os.path.join(tmp, "bench.db"))
+        results = asyncio.run(benchmark(args))
+
+    commit = git_commit()
+    report = {
+        "benchmark": "run_pipeline",
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        "results": results,
+    }
+
+    output = args.output or ROOT / "benchmarks" / "results" / f"run-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        print(f"\nCompared with {args.compare}:")
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
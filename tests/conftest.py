@@ -0,0 +1,34 @@
+"""Database fixtures shared by the suite.
+
+Every database test runs on SQLite, and on PostgreSQL as well when
+TEST_POSTGRES_URL points at a throwaway database (its public schema is
+dropped and recreated before each test), e.g.
+
+    TEST_POSTGRES_URL=postgresql+asyncpg://postgres@localhost/nd_test python -m pytest tests
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from tests.db import POSTGRES_URL
+
+
+@pytest.fixture(params=["sqlite", pytest.param("postgresql", marks=pytest.mark.skipif(
+    not POSTGRES_URL, reason="TEST_POSTGRES_URL not set",
+))])
+def database_url(request, tmp_path):
+    """URL of an empty database on each backend."""
+    if request.param == "sqlite":
+        return f"sqlite+aiosqlite:///{tmp_path / 'test.db'}"
+
+    async def reset():
+        engine = create_async_engine(POSTGRES_URL)
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP SCHEMA public CASCADE"))
+            await conn.execute(text("CREATE SCHEMA public"))
+        await engine.dispose()
+
+    asyncio.run(reset())
+    return POSTGRES_URL
@@ -0,0 +1,19 @@
+"""Helpers for tests that run against the database fixture."""
+import asyncio
+import os
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+def run_with_engine(database_url: str, test) -> None:
+    """Run an async test body against a fresh engine for the URL."""
+    async def main():
+        engine = create_async_engine(database_url)
+        try:
+            await test(engine)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""Each participant's view of the shared transcript, as sent to its provider."""
+import asyncio
+
+from app.context import ConversationContext
+
+ROLES = ("model_a", "model_b", "model_c")
+
+
+def _view(context: ConversationContext, role: str) -> list[tuple[str, str]]:
+    messages, _ = asyncio.run(context.build_messages(role, "gpt-4o", None, None, {}))
+    return [(m.role, m.content) for m in messages]
+
+
+def _starts_and_ends_on_user(view: list[tuple[str, str]]) -> bool:
+    return bool(view) and view[0][0] == "user" and view[-1][0] == "user"
+
+
+def test_round_views_start_and_end_on_user():
+    context = ConversationContext(seed="Seed", simultaneous=True)
+    for number in range(1, 4):
+        for role in ROLES:
+            assert _starts_and_ends_on_user(_view(context, role)), (number, role)
+        for role in ROLES:
+            context.append(role, f"{role} {number}", number)
+
+
+def test_round_view_puts_own_reply_first():
+    context = ConversationContext(seed="Seed", simultaneous=True)
+    for number in (1, 2):
+        for role in ROLES:
+            context.append(role, f"{role} {number}", number)
+    assert _view(context, "model_c") == [
+        ("user", "Seed"),
+        ("assistant", "model_c 1"), ("user", "model_a 1"), ("user", "model_b 1"),
+        ("assistant", "model_c 2"), ("user", "model_a 2"), ("user", "model_b 2"),
+    ]
+
+
+def test_partial_round_views_end_on_user():
+    # Model B failed in round 2, then only Model A answered round 3
+    context = ConversationContext(
+        seed="Seed",
+        transcript=[
+            ("model_a", "a 1"), ("model_b", "b 1"), ("model_c", "c 1"),
+            ("model_a", "a 2"), ("model_c", "c 2"),
+            ("model_a", "a 3"),
+        ],
+        rounds=[1, 1, 1, 2, 2, 3],
+        simultaneous=True,
+    )
+    for role in ROLES:
+        assert _starts_and_ends_on_user(_view(context, role)), role
+    assert _view(context, "model_b")[-3:] == [("user", "a 2"), ("user", "c 2"), ("user", "a 3")]
+
+
+def test_rounds_after_turns_keep_turn_order():
+    # Turns taken in order, then a run in rounds: only the round is regrouped
+    context = ConversationContext(
+        seed="Seed",
+        transcript=[("model_b", "b 0"), ("model_c", "c 0"), ("model_a", "a 0")],
+        simultaneous=True,
+    )
+    for role in ROLES:
+        context.append(role, f"{role} 1", 1)
+    assert _view(context, "model_c") == [
+        ("user", "Seed"),
+        ("user", "b 0"), ("assistant", "c 0"), ("user", "a 0"),
+        ("assistant", "model_c 1"), ("user", "model_a 1"), ("user", "model_b 1"),
+    ]
+    # Before the round, Model A spoke last; its view still ends on a user turn
+    before = ConversationContext(
+        seed="Seed", transcript=[("model_b", "b 0"), ("model_c", "c 0"), ("model_a", "a 0")], simultaneous=True,
+    )
+    assert _view(before, "model_a") == [("user", "Seed"), ("user", "b 0"), ("user", "c 0")]
+
+
+def test_turn_views_start_and_end_on_user():
+    # Model B answers the seed; Model A opens by answering the first reply
+    context = ConversationContext(seed="Seed", opener="model_a")
+    context.append("model_b", "b 0")
+    assert _view(context, "model_a") == [("user", "b 0")]
+    context.append("model_a", "a 0")
+    context.append("model_b", "b 1")
+    assert _view(context, "model_a") == [("user", "b 0"), ("assistant", "a 0"), ("user", "b 1")]
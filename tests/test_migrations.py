@@ -0,0 +1,106 @@
+"""Schema migrations, on a fresh database and on one created by the first release."""
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text, inspect, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.migrations import MIGRATIONS, applied_versions, upgrade
+from app.models import MessagePayload, Participant
+from tests.db import run_with_engine
+
+# Tables as the first release created them: per-model columns on
+# conversations and the provider response inline on messages
+_baseline = MetaData()
+Table(
+    "conversations",
+    _baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(255)),
+    Column("model_a", String(100)),
+    Column("model_b", String(100)),
+    Column("model_c", String(100), nullable=True),
+    Column("system_prompt_a", Text, nullable=True),
+    Column("system_prompt_b", Text, nullable=True),
+    Column("system_prompt_c", Text, nullable=True),
+    Column("starter_message", Text),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+Table(
+    "messages",
+    _baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("conversation_id", Integer, ForeignKey("conversations.id"), nullable=False),
+    Column("role", String(50)),
+    Column("model_name", String(100)),
+    Column("content", Text),
+    Column("raw_response", JSON, nullable=True),
+    Column("token_count", Integer, nullable=True),
+    Column("created_at", DateTime),
+)
+
+
+async def _columns(engine: AsyncEngine, table: str) -> set[str]:
+    async with engine.connect() as conn:
+        return await conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns(table)})
+
+
+def test_fresh_database(database_url):
+    async def test(engine):
+        applied = await upgrade(engine)
+        assert [m.version for m in applied] == [m.version for m in MIGRATIONS]
+        async with engine.connect() as conn:
+            assert await applied_versions(conn) == {m.version for m in MIGRATIONS}
+        assert "raw_response" not in await _columns(engine, "messages")
+        assert "model_a" not in await _columns(engine, "conversations")
+        # Nothing left to do on the next start
+        assert await upgrade(engine) == []
+
+    run_with_engine(database_url, test)
+
+
+def test_baseline_database(database_url):
+    async def test(engine):
+        now = datetime.utcnow()
+        async with engine.begin() as conn:
+            await conn.run_sync(_baseline.create_all)
+            conversations, messages = _baseline.tables["conversations"], _baseline.tables["messages"]
+            await conn.execute(conversations.insert().values(
+                id=1, title="Pair", model_a="gpt-4o", model_b="llama-3.3-70b-versatile",
+                system_prompt_a="Be brief.", starter_message="Hello", created_at=now, updated_at=now,
+            ))
+            await conn.execute(conversations.insert().values(
+                id=2, title="Trio", model_a="gpt-4o", model_b="gemini-2.5-flash",
+                model_c="claude-sonnet-4-20250514", system_prompt_c="Disagree.",
+                starter_message="Hi", created_at=now, updated_at=now,
+            ))
+            await conn.execute(messages.insert(), [
+                {"id": 1, "conversation_id": 1, "role": "model_a", "model_name": "gpt-4o",
+                 "content": "First reply", "raw_response": {"id": "resp-1"}, "created_at": now},
+                {"id": 2, "conversation_id": 1, "role": "model_b", "model_name": "llama-3.3-70b-versatile",
+                 "content": "Second reply", "raw_response": None, "created_at": now},
+            ])
+
+        await upgrade(engine)
+
+        assert "raw_response" not in await _columns(engine, "messages")
+        assert "round_number" in await _columns(engine, "messages")
+        assert not {"model_a", "model_b", "model_c", "system_prompt_a"} & await _columns(engine, "conversations")
+        async with engine.connect() as conn:
+            assert await applied_versions(conn) == {m.version for m in MIGRATIONS}
+            payloads = (await conn.execute(select(MessagePayload.message_id, MessagePayload.data))).all()
+            assert payloads == [(1, {"id": "resp-1"})]
+            participants = (await conn.execute(
+                select(Participant.conversation_id, Participant.position, Participant.model, Participant.system_prompt)
+                .order_by(Participant.conversation_id, Participant.position)
+            )).all()
+        assert participants == [
+            (1, 0, "gpt-4o", "Be brief."),
+            (1, 1, "llama-3.3-70b-versatile", None),
+            (2, 0, "gpt-4o", None),
+            (2, 1, "gemini-2.5-flash", None),
+            (2, 2, "claude-sonnet-4-20250514", "Disagree."),
+        ]
+        assert await upgrade(engine) == []
+
+    run_with_engine(database_url, test)
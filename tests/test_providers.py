@@ -0,0 +1,68 @@
+"""Provider adapters against stubbed SDK clients."""
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from app.providers.base import DEFAULT_MAX_OUTPUT_TOKENS, ChatMessage, ChatResponse, ModelInfo
+from app.providers.openai import OpenAIProvider
+
+
+def _lease(client):
+    @asynccontextmanager
+    async def lease():
+        yield client
+
+    return lease
+
+
+def test_reply_budget_comes_from_the_catalog():
+    class SmallOpenAI(OpenAIProvider):
+        MODELS = [ModelInfo(id="small", name="Small", provider="openai", description="", max_output_tokens=512)]
+
+    sent = {}
+
+    async def create(**kwargs):
+        sent.update(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=None,
+            model_dump=lambda: {},
+        )
+
+    provider = SmallOpenAI(api_key="test-key")
+    provider._lease = _lease(SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    asyncio.run(provider.chat([ChatMessage(role="user", content="Hi")], "small"))
+    assert sent["max_tokens"] == 512
+    assert provider.output_budget("unlisted") == DEFAULT_MAX_OUTPUT_TOKENS
+
+
+def test_gemini_stream_awaits_the_stream_call():
+    pytest.importorskip("google.genai")
+    from app.providers.gemini import GeminiProvider
+
+    chunks = [
+        SimpleNamespace(text="Hel", usage_metadata=None),
+        SimpleNamespace(text="lo", usage_metadata=SimpleNamespace(prompt_token_count=7, candidates_token_count=2)),
+    ]
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    # Like google-genai: a coroutine that resolves to the async iterator
+    async def generate_content_stream(**kwargs):
+        return stream()
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content_stream=generate_content_stream)))
+    provider = GeminiProvider(api_key="test-key")
+    provider._lease = _lease(client)
+
+    async def collect():
+        return [item async for item in provider.stream_chat([ChatMessage(role="user", content="Hi")], "gemini-2.5-flash")]
+
+    items = asyncio.run(collect())
+    assert items[:2] == ["Hel", "lo"]
+    assert isinstance(items[-1], ChatResponse)
+    assert (items[-1].content, items[-1].input_tokens, items[-1].output_tokens) == ("Hello", 7, 2)
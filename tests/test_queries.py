@@ -0,0 +1,102 @@
+"""Dialect-specific queries: the term upsert and ranking, and payload storage."""
+import zlib
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.keywords import add_terms, rebuild_terms, top_terms, upsert_terms
+from app.migrations import upgrade
+from app.models import Conversation, ConversationTerm, Message, MessagePayload
+from tests.db import run_with_engine
+
+
+async def _session(engine) -> AsyncSession:
+    await upgrade(engine)
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)()
+
+
+def test_term_upsert_adds_counts(database_url):
+    async def test(engine):
+        async with await _session(engine) as session:
+            session.add(Conversation(id=1, title="One", starter_message="Seed"))
+            await session.flush()
+            await add_terms(session, 1, "Entropy entropy drives drift")
+            await upsert_terms(session, 1, Counter({"entropy": 3, "order": 1}))
+            await session.commit()
+            counts = dict((await session.execute(
+                select(ConversationTerm.term, ConversationTerm.count).where(ConversationTerm.conversation_id == 1)
+            )).all())
+        assert counts == {"entropy": 5, "drives": 1, "drift": 1, "order": 1}
+
+    run_with_engine(database_url, test)
+
+
+def test_top_terms_ranks_per_conversation(database_url):
+    async def test(engine):
+        async with await _session(engine) as session:
+            session.add_all([
+                Conversation(id=1, title="One", starter_message="Seed"),
+                Conversation(id=2, title="Two", starter_message="Seed"),
+            ])
+            await session.flush()
+            await upsert_terms(session, 1, Counter({"zeta": 5, "beta": 2, "alpha": 2, "gamma": 1}))
+            await upsert_terms(session, 2, Counter({"omega": 1}))
+            await session.commit()
+
+            # Count descending, ties broken by term
+            assert await top_terms(session, 3) == {1: ["zeta", "alpha", "beta"], 2: ["omega"]}
+            assert await top_terms(session, 1, [2]) == {2: ["omega"]}
+
+    run_with_engine(database_url, test)
+
+
+def test_rebuild_terms_recounts_from_messages(database_url):
+    async def test(engine):
+        async with await _session(engine) as session:
+            session.add(Conversation(id=1, title="One", starter_message="Seed"))
+            await session.flush()
+            session.add_all([
+                Message(conversation_id=1, role="model_a", model_name="m", content="Quantum fields"),
+                Message(conversation_id=1, role="model_b", model_name="m", content="quantum noise"),
+            ])
+            await upsert_terms(session, 1, Counter({"stale": 9}))
+            assert await rebuild_terms(session, 1) == 2
+            await session.commit()
+            assert await top_terms(session, 5) == {1: ["quantum", "fields", "noise"]}
+
+    run_with_engine(database_url, test)
+
+
+def test_payload_round_trip(database_url):
+    async def test(engine):
+        raw = {"id": "resp-1", "usage": {"input_tokens": 3}, "content": [{"text": "héllo"}], "at": datetime(2025, 1, 2)}
+        async with await _session(engine) as session:
+            session.add(Conversation(id=1, title="One", starter_message="Seed"))
+            await session.flush()
+            message = Message(
+                conversation_id=1, role="model_a", model_name="m", content="hi",
+                payload=MessagePayload.pack(raw),
+            )
+            session.add(message)
+            await session.commit()
+            message_id = message.id
+
+        async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+            payload = await session.get(MessagePayload, message_id)
+            # Non-JSON values are stored as strings
+            assert payload.unpack() == {**raw, "at": "2025-01-02 00:00:00"}
+
+            stored = (await session.execute(
+                text("SELECT data FROM message_payloads WHERE message_id = :id"), {"id": message_id}
+            )).scalar_one()
+            if engine.dialect.name == "postgresql":
+                kind = (await session.execute(
+                    text("SELECT jsonb_typeof(data) FROM message_payloads WHERE message_id = :id"), {"id": message_id}
+                )).scalar_one()
+                assert kind == "object"
+            else:
+                assert b"resp-1" in zlib.decompress(stored)
+
+    run_with_engine(database_url, test)
@@ -0,0 +1,63 @@
+"""ProviderLimiter budget accounting and pauses."""
+import asyncio
+import time
+
+from app.providers.ratelimit import ProviderLimiter
+
+
+class RateLimited(Exception):
+    status_code = 429
+    retry_after = 0.01
+
+
+def test_rate_limited_attempts_return_their_reservation():
+    limiter = ProviderLimiter(tpm=60_000, max_retries=4)
+    failures = 3
+
+    async def call():
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise RateLimited()
+        return "ok"
+
+    assert asyncio.run(limiter.run(call, tokens=10_000)) == "ok"
+    # Only the attempt that was served still holds its reservation
+    assert limiter.tokens.tokens < 60_000 - 9_000
+    assert limiter.tokens.tokens > 60_000 - 11_000
+
+
+def test_stream_attempts_return_their_reservation():
+    limiter = ProviderLimiter(tpm=60_000, max_retries=4)
+    failures = 2
+
+    async def call():
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise RateLimited()
+        yield "ok"
+
+    async def collect():
+        return [item async for item in limiter.stream(call, tokens=10_000)]
+
+    assert asyncio.run(collect()) == ["ok"]
+    assert limiter.tokens.tokens > 60_000 - 11_000
+
+
+def test_admission_waits_out_an_extended_pause():
+    limiter = ProviderLimiter()
+
+    async def main():
+        start = time.monotonic()
+        limiter.paused_until = start + 0.05
+
+        async def extend():
+            await asyncio.sleep(0.03)
+            # Another caller's 429 while the first is still paused
+            limiter.paused_until = time.monotonic() + 0.15
+
+        await asyncio.gather(limiter._admit(0), extend())
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) >= 0.17
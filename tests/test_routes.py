@@ -0,0 +1,114 @@
+"""Conversation routes: list aggregates and paging, message keyset pages, raw payloads, keywords."""
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.database import get_db
+from app.main import app
+from app.migrations import upgrade
+from app.models import Conversation, Message, MessagePayload, Participant
+from tests.db import run_with_engine
+
+START = datetime(2025, 1, 1)
+
+
+async def _seed(engine) -> async_sessionmaker:
+    """Three conversations; conversation 2 has four messages, one of them injected."""
+    await upgrade(engine)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with sessions() as session:
+        for cid in (1, 2, 3):
+            session.add(Conversation(id=cid, title=f"Conversation {cid}", starter_message="Seed", participants=[
+                Participant(position=0, model="gpt-4o"),
+                Participant(position=1, model="grok-3"),
+            ]))
+        await session.flush()
+        rows = [
+            ("model_a", "gpt-4o", "Gravity bends light", 10),
+            ("model_b", "grok-3", "Light bends gravity", 20),
+            ("model_a", "human", "Gravity again", 0),
+            ("model_a", "gpt-4o", "Gravity wins", 30),
+        ]
+        for index, (role, model, content, tokens) in enumerate(rows):
+            session.add(Message(
+                conversation_id=2, role=role, model_name=model, content=content, token_count=tokens,
+                created_at=START + timedelta(minutes=index),
+                payload=MessagePayload.pack({"index": index}),
+            ))
+        await session.commit()
+    return sessions
+
+
+def _client(sessions: async_sessionmaker) -> httpx.AsyncClient:
+    async def get_test_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_test_db
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def _run(database_url, test) -> None:
+    async def with_client(engine):
+        try:
+            async with _client(await _seed(engine)) as client:
+                await test(client)
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+
+    run_with_engine(database_url, with_client)
+
+
+def test_list_aggregates_and_paging(database_url):
+    async def test(client):
+        page = (await client.get("/api/conversations/", params={"limit": 2})).json()
+        assert [c["id"] for c in page] == [3, 2]
+        busy = page[1]
+        assert busy["message_count"] == 4
+        assert busy["total_tokens"] == 60
+        assert busy["last_message_at"].startswith("2025-01-01T00:03")
+        assert busy["participant_models"] == ["gpt-4o", "grok-3"]
+        assert page[0]["message_count"] == 0 and page[0]["last_message_at"] is None
+
+        rest = (await client.get("/api/conversations/", params={"limit": 2, "before_id": 2})).json()
+        assert [c["id"] for c in rest] == [1]
+        one = (await client.get("/api/conversations/2")).json()
+        assert one["message_count"] == 4
+
+    _run(database_url, test)
+
+
+def test_message_keyset_pages(database_url):
+    async def test(client):
+        url = "/api/conversations/2/messages"
+        everything = (await client.get(url)).json()
+        ids = [m["id"] for m in everything]
+        assert len(ids) == 4 and ids == sorted(ids)
+
+        newest = (await client.get(url, params={"limit": 2})).json()
+        assert [m["id"] for m in newest] == ids[2:]
+        older = (await client.get(url, params={"limit": 2, "before_id": ids[2]})).json()
+        assert [m["id"] for m in older] == ids[:2]
+        delta = (await client.get(url, params={"after_id": ids[0], "limit": 2})).json()
+        assert [m["id"] for m in delta] == ids[1:3]
+
+        raw = (await client.get(f"{url}/{ids[1]}/raw")).json()
+        assert raw["raw_response"] == {"index": 1}
+        assert (await client.get(f"/api/conversations/1/messages/{ids[1]}/raw")).status_code == 404
+
+    _run(database_url, test)
+
+
+def test_keywords_follow_injected_messages(database_url):
+    async def test(client):
+        # Messages seeded above bypass the term index; an injected one goes through it
+        response = await client.post(
+            "/api/conversations/1/inject-message",
+            json={"role": "user_to_a", "content": "Photons photons everywhere"},
+        )
+        assert response.status_code == 200
+        keywords = (await client.get("/api/conversations/keywords", params={"k": 2})).json()
+        assert keywords == [{"conversation_id": 1, "keywords": ["photons", "everywhere"]}]
+
+    _run(database_url, test)
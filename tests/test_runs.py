@@ -0,0 +1,42 @@
+"""The run event log: ids, resuming, and compaction of finished replies."""
+import asyncio
+import json
+
+from app.runs import Run
+
+
+def _replay(run: Run, after: int = 0) -> list[dict]:
+    async def collect():
+        return [json.loads(line) async for line in run.follow(after)]
+
+    return asyncio.run(collect())
+
+
+def _run_with_reply() -> Run:
+    run = Run(conversation_id=1, turns=1, stream=True, api_keys={})
+    run.publish({"type": "start", "role": "model_a"})
+    for token in ("Hel", "lo"):
+        run.publish({"type": "delta", "role": "model_a", "content": token})
+    run.publish({"type": "start", "role": "model_b"})
+    run.publish({"type": "delta", "role": "model_b", "content": "Hi"})
+    run.publish({"type": "message", "role": "model_a", "content": "Hello"})
+    return run
+
+
+def test_finished_reply_replaces_its_deltas():
+    run = _run_with_reply()
+    run.finish("completed")
+    events = _replay(run)
+    # model_b is still streaming, so its delta stays
+    assert [(e["type"], e["role"], e["id"]) for e in events] == [
+        ("start", "model_a", 1), ("start", "model_b", 4), ("delta", "model_b", 5), ("message", "model_a", 6),
+    ]
+    assert run.last_event_id == 6
+
+
+def test_resume_after_a_compacted_id():
+    run = _run_with_reply()
+    run.finish("completed")
+    # A client that saw the first delta resumes with the rest of the log
+    assert [e["id"] for e in _replay(run, after=2)] == [4, 5, 6]
+    assert _replay(run, after=6) == []